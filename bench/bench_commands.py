@@ -0,0 +1,87 @@
+"""Measures the throughput and latency of each Locations command, driven through the offline test harness.
+
+Usage: python bench/bench_commands.py [--locations 1000 10000] [--concurrency 1 16] [--requests 500]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from common import getPercentile
+from location import Location
+from tests.harness import openFakeBot
+
+commandTemplates = {
+    'add': '*add other Bench {i} overworld ({x}, {z}, 64)',
+    'view': '*view Location {j}',
+    'search': '*search Locaton {j}',
+    'nearest': '*nearest overworld ({x}, {z}, 64) 5',
+    'within': '*within overworld ({x}, {z}, 64) 500',
+    'remove': '*remove Bench {i}',
+}
+
+
+def seedLocations(cog, owner, count: int) -> None:
+    entries = [('homes', f'Location {i}', Location(overworld=(i * 37 % 20000, i * 91 % 20000, 64)))
+               for i in range(count)]
+    cog.validateOwner(owner)
+    cog.putLocations(owner, entries)
+
+
+async def benchmarkCommand(discordFake, users: list[dict], template: str, requests: int, concurrency: int,
+                           locationCount: int) -> tuple[float, list[float]]:
+    """Runs the command `requests` times from `concurrency` users at once, returning the throughput and latencies."""
+    latencies = []
+    counter = iter(range(requests))
+
+    async def runUser(user: dict) -> None:
+        for i in counter:
+            content = template.format(i=i, j=i * 7 % locationCount, x=i * 53 % 20000, z=i * 29 % 20000)
+            start = time.perf_counter()
+            await discordFake.invoke(user, content)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(runUser(user) for user in users[:concurrency]))
+    return requests / (time.perf_counter() - start), sorted(latencies)
+
+
+async def benchmark(locationCount: int, concurrency: int, requests: int) -> None:
+    async with openFakeBot() as (bot, discordFake):
+        cog = bot.get_cog('Locations')
+        users = [discordFake.makeUserPayload(f'User {i}') for i in range(concurrency)]
+        for user in users:
+            seedLocations(cog, discordFake.getDMChannel(user).recipient, locationCount)
+
+        for command, template in commandTemplates.items():
+            throughput, latencies = await benchmarkCommand(discordFake, users, template, requests, concurrency,
+                                                           locationCount)
+            print(f"{locationCount:>9} {concurrency:>11} {command:>8} {throughput:>10.0f}/s "
+                  f"{statistics.median(latencies) * 1000:>8.2f} ms {getPercentile(latencies, 0.99) * 1000:>8.2f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--locations', type=int, nargs='+', default=[100, 10000])
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 16])
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--backend', default='sqlite', choices=('yaml', 'sqlite', 'sharded'))
+    arguments = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix='bench-commands-'))
+    os.environ['location_backend'] = arguments.backend
+    if arguments.backend == 'yaml':
+        os.makedirs('data')
+        Path('data/locations.yaml').write_text('users: {}\n')
+
+    print(f"{'locations':>9} {'concurrency':>11} {'command':>8} {'throughput':>12} {'p50':>11} {'p99':>11}")
+    for locationCount in arguments.locations:
+        for concurrency in arguments.concurrency:
+            asyncio.run(benchmark(locationCount, concurrency, arguments.requests))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Compares parsing coordinates a user typed with parseUserCoords, in a single pass, against checking them with
+areValidCoords and then extracting them with extractCoords, as the Locations cog did before parseUserCoords.
+
+`valid` inputs are typed `(x, z, y)` coordinates, which both parsers accept, `invalid` inputs are rejected by both,
+and `F3` inputs are lines copied from the debug screen, which only parseUserCoords accepts.
+
+Usage: python bench/bench_coords.py [--inputs 100000] [--repeat 5]
+"""
+import argparse
+import random
+import re
+
+from common import formatSeconds, timeCalls
+from location import parseUserCoords
+
+coordsPattern = re.compile(r"^\(\s*(-?\d*)\s*,\s*(-?\d*)\s*,\s*(-?\d*)\s*\)$")
+
+
+def areValidCoords(coordinates: str) -> bool:
+    return bool(coordsPattern.search(coordinates))
+
+
+def extractCoords(coordinates: str) -> tuple[int, int, int]:
+    match = coordsPattern.search(coordinates)
+    return int(match.group(1)), int(match.group(2)), int(match.group(3))
+
+
+def parseWithDoubleRegex(coordinates: str):
+    """Parses coordinates the way the cog did before parseUserCoords, matching the pattern twice."""
+    if not areValidCoords(coordinates):
+        return None
+    return extractCoords(coordinates)
+
+
+def makeInputs(generator: random.Random, count: int) -> dict:
+    def coordinate() -> int:
+        return generator.randint(-30000000, 30000000)
+
+    return {
+        'valid': [f'({coordinate()}, {generator.randint(-64, 320)}, {coordinate()})' for _ in range(count)],
+        'invalid': [generator.choice([f'({coordinate()}, {coordinate()}', 'one two three', f'{coordinate()}'])
+                    for _ in range(count)],
+        'F3': [f'XYZ: {generator.uniform(-30000000, 30000000):.3f} / {generator.uniform(-64, 320):.5f} / '
+               f'{generator.uniform(-30000000, 30000000):.3f}' for _ in range(count)],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--inputs', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    arguments = parser.parse_args()
+
+    parsers = {'double regex': parseWithDoubleRegex, 'single pass': parseUserCoords}
+    print(f"{'inputs':>8} {'parser':>13} {'per input':>10} {'accepted':>9}")
+    for kind, inputs in makeInputs(random.Random(0), arguments.inputs).items():
+        for name, parse in parsers.items():
+            perInput = timeCalls(lambda: [parse(text) for text in inputs], arguments.repeat)[0] / len(inputs)
+            accepted = sum(parse(text) is not None for text in inputs) / len(inputs)
+            print(f"{kind:>8} {name:>13} {formatSeconds(perInput):>10} {accepted:>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
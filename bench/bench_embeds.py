@@ -0,0 +1,54 @@
+"""Compares the time and memory allocated per response between building a new embed for every message, as the
+Locations cog used to, and sending a registered template or filling one in.
+
+Each response is serialized the way it is sent to Discord, so the comparison covers the whole per-message cost.
+
+Usage: python bench/bench_embeds.py [--responses 100000]
+"""
+import argparse
+import tracemalloc
+
+from common import formatSeconds, timeCalls
+from embeds import EmbedTemplates, iconUrl, makeEmbed, promptFooter
+
+author = 'Add Location'
+description = 'Invalid input. Please try again.'
+
+
+def measureAllocations(respond, responses: int) -> float:
+    """Returns the bytes allocated per response, including memory freed again before the response completes."""
+    tracemalloc.start()
+    total = 0
+    for _ in range(responses):
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        respond()
+        total += tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return total / responses
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--responses', type=int, default=100000)
+    arguments = parser.parse_args()
+
+    embeds = EmbedTemplates(iconUrl)
+    embeds.register('invalidSelection', author, description, promptFooter)
+    embeds.register('prompt', author, footer=promptFooter)
+
+    approaches = {
+        'new embed': lambda: makeEmbed(iconUrl, author, description, promptFooter).to_dict(),
+        'template': lambda: embeds['invalidSelection'].to_dict(),
+        'filled': lambda: embeds.fill('prompt', description).to_dict(),
+    }
+
+    print(f"{'response':>12} {'time':>10} {'allocated':>12}")
+    for name, respond in approaches.items():
+        duration = sum(timeCalls(respond, arguments.responses)) / arguments.responses
+        allocated = measureAllocations(respond, min(arguments.responses, 10000))
+        print(f"{name:>12} {formatSeconds(duration):>10} {allocated:>10.0f} B")
+
+
+if __name__ == "__main__":
+    main()
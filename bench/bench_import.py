@@ -0,0 +1,103 @@
+"""Measures each stage of the import command on a large upload: parsing the file, validating and converting the rows,
+and storing the locations, in one batch or one location at a time as adding them individually would.
+
+Usage: python bench/bench_import.py [--rows 100000]
+"""
+import argparse
+import asyncio
+import csv
+import io
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+
+# Imported first, since it puts the repository on the import path.
+from common import formatSeconds, waitUntilDurable
+
+import importer
+from cogs.locations import Locations
+from storage import SqliteLocationStorage, YamlLocationStorage
+from yamlio import dumpYaml
+
+
+def makeRows(rowCount: int) -> list[dict]:
+    generator = random.Random(rowCount)
+    return [
+        {
+            'name': f'Imported {i}', 'type': ('home', 'farm', 'other')[i % 3],
+            'dimension': ('overworld', 'overworld', 'nether', 'end')[i % 4],
+            'x': generator.randint(-30000, 30000), 'z': generator.randint(-30000, 30000),
+            'y': generator.randint(-64, 320),
+        }
+        for i in range(rowCount)
+    ]
+
+
+def encodeRows(rows: list[dict]) -> dict[str, bytes]:
+    """Returns the rows as the content of an uploaded file, keyed by filename."""
+    csvText = io.StringIO()
+    writer = csv.DictWriter(csvText, importer.fieldNames)
+    writer.writeheader()
+    writer.writerows(rows)
+
+    yamlText = io.StringIO()
+    dumpYaml(rows, yamlText)
+    return {
+        'locations.csv': csvText.getvalue().encode(),
+        'locations.json': json.dumps(rows).encode(),
+        'locations.yaml': yamlText.getvalue().encode(),
+    }
+
+
+async def timeStoring(storage, entries: list, batched: bool) -> float:
+    """Returns how long storing the entries takes until they are written."""
+    start = time.perf_counter()
+    if batched:
+        storage.putLocations(1000, entries)
+    else:
+        for category, name, location in entries:
+            storage.putLocation(1000, category, name, location)
+    await waitUntilDurable(storage)
+    return time.perf_counter() - start
+
+
+async def benchmarkStoring(entries: list) -> None:
+    directory = Path(tempfile.mkdtemp(prefix='bench-import-'))
+    for batched in (True, False):
+        (directory / 'locations.yaml').write_text('users: {}\n')
+        storages = {
+            'yaml': YamlLocationStorage(str(directory / 'locations.yaml')),
+            'sqlite': SqliteLocationStorage(str(directory / f'locations-{batched}.db')),
+        }
+        for name, storage in storages.items():
+            storage.load()
+            duration = await timeStoring(storage, entries, batched)
+            print(f"{'store ' + ('batch' if batched else 'each'):>16} {name:>6} {formatSeconds(duration):>10}")
+            storage.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    arguments = parser.parse_args()
+
+    rows = makeRows(arguments.rows)
+    print(f"{arguments.rows} rows")
+    print(f"{'stage':>16} {'format':>6} {'duration':>10}")
+    for filename, content in encodeRows(rows).items():
+        start = time.perf_counter()
+        importer.readRows(filename, content)
+        print(f"{'read':>16} {Path(filename).suffix[1:]:>6} {formatSeconds(time.perf_counter() - start):>10}")
+
+    start = time.perf_counter()
+    entries, errors = importer.buildLocations(rows, Locations.locationTypeCategories, set())
+    assert not errors, errors[:5]
+    print(f"{'build':>16} {'-':>6} {formatSeconds(time.perf_counter() - start):>10}")
+
+    asyncio.run(benchmarkStoring(entries))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""Compares the peak memory and the event throughput of the bot under each gateway intents and member cache profile,
+replaying a synthetic gateway session with a few large guilds through the bot's connection state.
+
+Each profile runs in a fresh process, configured through the `bot_intents` and `member_cache` variables, and receives
+only the events the gateway sends for its intents: GUILD_CREATE, carrying the online members and their presences with
+the presences intent, GUILD_MEMBERS_CHUNK, answering the member requests the bot makes at startup with the members
+intent, PRESENCE_UPDATE with the presences intent and MESSAGE_CREATE with the guild messages intent. `all + auto` is
+the behaviour before intents were configurable.
+
+Usage: python bench/bench_intents.py [--guilds 5] [--members 20000] [--presences 20000] [--messages 20000]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import formatSeconds
+from tests.harness import FakeDiscord, openFakeBot
+
+profiles = {
+    'default': {},
+    'members': {'bot_intents': 'guilds,guild_messages,dm_messages,members', 'member_cache': 'joined'},
+    'all': {'bot_intents': 'all'},
+    'all + auto': {'bot_intents': 'all', 'member_cache': 'auto'},
+}
+chunkSize = 1000
+
+
+def makeGuildPayloads(discordFake: FakeDiscord, generator: random.Random, memberCount: int, presences: bool) -> tuple:
+    """Returns a GUILD_CREATE payload for a guild with the given number of members, along with its members."""
+    guildID = str(next(discordFake.ids))
+    members = [{'user': discordFake.makeUserPayload(f'Member {i}'), 'roles': [], 'joined_at': None, 'deaf': False,
+                'mute': False} for i in range(memberCount)]
+    members.append({'user': discordFake.botUser, 'roles': [], 'joined_at': None, 'deaf': False, 'mute': False})
+    statuses = [generator.choice(('online', 'idle', 'dnd', 'offline', 'offline')) for _ in members]
+    online = [member for member, status in zip(members, statuses) if status != 'offline']
+
+    data = {
+        'id': guildID, 'name': f'Guild {guildID}', 'owner_id': members[0]['user']['id'], 'member_count': len(members),
+        'large': len(members) > 250,
+        'roles': [{'id': guildID, 'name': '@everyone', 'permissions': '0'}],
+        'channels': [{'id': str(next(discordFake.ids)), 'type': 0, 'name': f'channel-{i}', 'position': i}
+                     for i in range(10)],
+        'members': online if presences else members[-1:],
+        'presences': [{'user': {'id': member['user']['id']}, 'status': status, 'activities': [],
+                       'client_status': {'desktop': status}}
+                      for member, status in zip(members, statuses) if presences and status != 'offline'],
+    }
+    return data, members
+
+
+def makeMessagePayload(discordFake: FakeDiscord, guild: dict, member: dict) -> dict:
+    data = discordFake.makeMessagePayload(int(guild['channels'][0]['id']), member['user'], 'Anyone up for the end?')
+    data['guild_id'] = guild['id']
+    data['member'] = {key: value for key, value in member.items() if key != 'user'}
+    return data
+
+
+async def replay(arguments: argparse.Namespace) -> dict:
+    """Replays the session through the bot's connection state and returns the event count and the time it took."""
+    generator = random.Random(0)
+    async with openFakeBot() as (bot, discordFake):
+        state = bot._connection
+        intents = state._intents
+        requests = []
+
+        async def requestChunks(guildID, query='', limit=0, presences=False, *, nonce=None):
+            requests.append((guildID, nonce))
+
+        state.chunker = requestChunks
+
+        guilds = [makeGuildPayloads(discordFake, generator, arguments.members, intents.presences)
+                  for _ in range(arguments.guilds)]
+        events = 0
+        start = time.perf_counter()
+        for data, members in guilds:
+            state.parse_guild_create(data)
+            events += 1
+            guild = bot.get_guild(int(data['id']))
+            while state._guild_needs_chunking(guild) and not requests:
+                await asyncio.sleep(0)
+
+            for guildID, nonce in requests:
+                chunkCount = (len(members) + chunkSize - 1) // chunkSize
+                for index in range(chunkCount):
+                    state.parse_guild_members_chunk({
+                        'guild_id': str(guildID), 'members': members[index * chunkSize:(index + 1) * chunkSize],
+                        'chunk_index': index, 'chunk_count': chunkCount, 'nonce': nonce,
+                    })
+                    events += 1
+            requests.clear()
+            await asyncio.sleep(0)
+
+        if intents.presences:
+            for _ in range(arguments.presences):
+                data, members = generator.choice(guilds)
+                member = generator.choice(members)
+                state.parse_presence_update({
+                    'guild_id': data['id'], 'user': {'id': member['user']['id']}, 'activities': [],
+                    'status': generator.choice(('online', 'idle', 'dnd', 'offline')), 'client_status': {},
+                })
+                events += 1
+
+        if intents.guild_messages:
+            for i in range(arguments.messages):
+                data, members = generator.choice(guilds)
+                state.parse_message_create(makeMessagePayload(discordFake, data, generator.choice(members)))
+                events += 1
+                if i % 100 == 0:
+                    await asyncio.sleep(0)
+            await asyncio.sleep(0)
+
+        duration = time.perf_counter() - start
+        cachedMembers = sum(len(guild.members) for guild in bot.guilds)
+
+    return {'events': events, 'seconds': duration, 'cachedMembers': cachedMembers}
+
+
+def replayInThisProcess(arguments: argparse.Namespace) -> None:
+    """Replays the session once and prints its result and the peak resident set size, in bytes, as JSON."""
+    os.chdir(tempfile.mkdtemp(prefix='bench-intents-'))
+    os.environ['location_backend'] = 'sqlite'
+    result = asyncio.run(replay(arguments))
+    result['peakBytes'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    print(json.dumps(result))
+
+
+def replayInSubprocess(profile: dict, arguments: argparse.Namespace) -> dict:
+    environment = {key: value for key, value in os.environ.items() if key not in ('bot_intents', 'member_cache')}
+    environment.update(profile)
+    command = [sys.executable, __file__, '--replay', '--guilds', str(arguments.guilds), '--members',
+               str(arguments.members), '--presences', str(arguments.presences), '--messages', str(arguments.messages)]
+    output = subprocess.run(command, env=environment, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--guilds', type=int, default=5)
+    parser.add_argument('--members', type=int, default=20000)
+    parser.add_argument('--presences', type=int, default=20000)
+    parser.add_argument('--messages', type=int, default=20000)
+    parser.add_argument('--replay', action='store_true', help=argparse.SUPPRESS)
+    arguments = parser.parse_args()
+
+    if arguments.replay:
+        replayInThisProcess(arguments)
+        return
+
+    print(f"{arguments.guilds} guilds of {arguments.members} members")
+    print(f"{'profile':>10} {'events':>8} {'replay':>10} {'events/s':>10} {'cached':>8} {'peak RSS':>12}")
+    for name, profile in profiles.items():
+        result = replayInSubprocess(profile, arguments)
+        print(f"{name:>10} {result['events']:>8} {formatSeconds(result['seconds']):>10} "
+              f"{result['events'] / result['seconds']:>10.0f} {result['cachedMembers']:>8} "
+              f"{result['peakBytes'] / 2 ** 20:>9.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
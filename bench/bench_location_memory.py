@@ -0,0 +1,55 @@
+"""Compares the memory held per location, and the cost of reading its coordinates, between the dicts of `(x, z, y)`
+strings locations used to be kept as and the immutable Location records that replaced them.
+
+Usage: python bench/bench_location_memory.py [--locations 1000000]
+"""
+import argparse
+import gc
+import random
+import tracemalloc
+
+from common import formatSeconds, makeLocation, timeCalls
+from location import Location, parseCoords
+
+
+def measureMemory(makeLocations) -> tuple[int, list]:
+    """Returns the bytes allocated by building the locations, along with the locations themselves."""
+    gc.collect()
+    tracemalloc.start()
+    locations = makeLocations()
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return allocated, locations
+
+
+def copyRecord(record: dict) -> dict:
+    """Copies a record along with its strings, as loading it from YAML would create them."""
+    return {dimension: ''.join(text) for dimension, text in record.items()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--locations', type=int, default=1000000)
+    arguments = parser.parse_args()
+
+    generator = random.Random(0)
+    records = [makeLocation(generator).toRecord() for _ in range(arguments.locations)]
+    representations = {
+        'record dicts': (lambda: [copyRecord(record) for record in records],
+                         lambda record: parseCoords(record['overworld'])),
+        'Location': (lambda: [Location.fromRecord(record) for record in records],
+                     lambda location: location.overworld),
+    }
+
+    print(f"{arguments.locations} locations")
+    print(f"{'representation':>14} {'per location':>14} {'total':>10} {'read coordinates':>18}")
+    for name, (makeLocations, readCoordinates) in representations.items():
+        allocated, locations = measureMemory(makeLocations)
+        sample = locations[:100000]
+        read = timeCalls(lambda: [readCoordinates(location) for location in sample], 3)[0] / len(sample)
+        print(f"{name:>14} {allocated / len(locations):>12.0f} B {allocated / 2 ** 20:>7.1f} MB "
+              f"{formatSeconds(read):>18}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Measures how long location writes stall the event loop, before and after persistence moved off the loop.
+
+`blocking` dumps the whole YAML file inside the coroutine, as every add, remove and edit used to. `worker thread`
+snapshots the data on the loop and dumps it on a worker thread. `journal` is the current YAML storage, which appends a
+journal record per change and compacts in the background. `compaction` also compacts the journal after every change,
+so it includes the snapshot the storage takes on the loop for each compaction.
+
+Usage: python bench/bench_loop_stall.py [--locations 1000 10000 100000] [--writes 50]
+"""
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from common import formatSeconds, getPercentile, makeData, makeLocation
+from persistence import AsyncYamlStore
+from storage import YamlLocationStorage, serializeData
+from yamlio import dumpYaml
+
+
+async def measureStalls(write, writes: int) -> list[float]:
+    """Performs the writes 10 ms apart while sampling how late the loop wakes from 1 ms sleeps."""
+    stalls = []
+    done = False
+
+    async def sample() -> None:
+        while not done:
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            stalls.append(time.perf_counter() - start - 0.001)
+
+    sampler = asyncio.create_task(sample())
+    for i in range(writes):
+        await write(i)
+        await asyncio.sleep(0.01)
+    done = True
+    await sampler
+    return sorted(stalls)
+
+
+async def benchmark(locationCount: int, writes: int, directory: Path) -> None:
+    generator = random.Random(1)
+
+    data = makeData(locationCount)
+    blockingFilepath = directory / f'blocking-{locationCount}.yaml'
+
+    async def writeBlocking(i: int) -> None:
+        data['users'][1000]['locations']['homes'][f'New {i}'] = makeLocation(generator)
+        with open(blockingFilepath, 'w') as f:
+            dumpYaml(serializeData(data), f)
+
+    store = AsyncYamlStore(str(directory / f'thread-{locationCount}.yaml'), serialize=serializeData)
+
+    async def writeOnWorkerThread(i: int) -> None:
+        data['users'][1000]['locations']['homes'][f'New {i}'] = makeLocation(generator)
+        await store.dumpAsync(data)
+
+    journalFilepath = directory / f'journal-{locationCount}.yaml'
+    AsyncYamlStore(str(journalFilepath), serialize=serializeData).dump(data)
+    storage = YamlLocationStorage(str(journalFilepath))
+    storageData = storage.load()
+
+    async def writeJournal(i: int) -> None:
+        location = makeLocation(generator)
+        storageData['users'][1000]['locations']['homes'][f'New {i}'] = location
+        storage.putLocation(1000, 'homes', f'New {i}', location)
+
+    async def writeAndCompact(i: int) -> None:
+        await writeJournal(i)
+        await storage.flush()
+
+    for name, write in (('blocking', writeBlocking), ('worker thread', writeOnWorkerThread),
+                        ('journal', writeJournal), ('compaction', writeAndCompact)):
+        stalls = await measureStalls(write, writes)
+        print(f"{locationCount:>9} {name:>14} {formatSeconds(getPercentile(stalls, 0.5)):>10} "
+              f"{formatSeconds(getPercentile(stalls, 0.99)):>10} {formatSeconds(stalls[-1]):>10}")
+
+    await storage.flush()
+    storage.close()
+    store.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--locations', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--writes', type=int, default=50)
+    arguments = parser.parse_args()
+
+    directory = Path(tempfile.mkdtemp(prefix='bench-loop-stall-'))
+    print(f"{'locations':>9} {'persistence':>14} {'p50 stall':>10} {'p99 stall':>10} {'max stall':>10}")
+    for locationCount in arguments.locations:
+        asyncio.run(benchmark(locationCount, arguments.writes, directory))
+
+
+if __name__ == "__main__":
+    main()
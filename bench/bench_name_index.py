@@ -0,0 +1,74 @@
+"""Compares looking up a location by name through the per-user name index against scanning every category, as the
+Locations cog did before the index was added. Each lookup checks that the name exists, then fetches its category and
+location, which is what the view, edit and remove commands do.
+
+Usage: python bench/bench_name_index.py [--locations 100 1000 10000] [--lookups 10000]
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+
+from common import formatSeconds, makeLocation, timeCalls
+from tests.harness import openFakeBot
+
+
+def scanCategories(userData: dict, locationName: str):
+    """Looks a location up the way the cog did before the name index, copying each category's names into a list."""
+    for locationCategory, locationData in userData.items():
+        names = list(locationData.keys())
+        if locationName in names:
+            break
+    else:
+        return None
+
+    for locationCategory, locationData in userData.items():
+        names = list(locationData.keys())
+        if locationName in names:
+            return locationCategory, locationData[locationName]
+
+
+async def benchmark(locationCount: int, lookups: int) -> None:
+    generator = random.Random(locationCount)
+    async with openFakeBot() as (bot, discordFake):
+        cog = bot.get_cog('Locations')
+        owner = discordFake.getDMChannel(discordFake.makeUserPayload('Collector')).recipient
+        cog.validateOwner(owner)
+        cog.putLocations(owner, [
+            (('homes', 'farms', 'other')[i % 3], f'Location {i}', makeLocation(generator)) for i in range(locationCount)
+        ])
+
+        userData = cog.data['users'][owner.id]['locations']
+        names = [f'Location {generator.randrange(locationCount * 2)}' for _ in range(lookups)]
+
+        def lookUpByScanning() -> None:
+            for name in names:
+                scanCategories(userData, name)
+
+        def lookUpThroughIndex() -> None:
+            for name in names:
+                if cog.locationExists(name, owner):
+                    cog.getLocationCategory(name, owner), cog.getLocationData(name, owner)
+
+        for approach, lookUp in (('scan', lookUpByScanning), ('index', lookUpThroughIndex)):
+            perLookup = timeCalls(lookUp, 3)[0] / lookups
+            print(f"{locationCount:>9} {approach:>8} {formatSeconds(perLookup):>12}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--locations', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--lookups', type=int, default=10000)
+    arguments = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix='bench-name-index-'))
+    os.environ['location_backend'] = 'sqlite'
+
+    print(f"{'locations':>9} {'lookup':>8} {'per lookup':>12}")
+    for locationCount in arguments.locations:
+        asyncio.run(benchmark(locationCount, arguments.lookups))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Compares nearest-neighbour and radius query latency of the spatial grid against scanning every location, as the
+nearest and within commands did before it.
+
+Points are spread over the usual ±30000 block world; queries use random points in the same area.
+
+Usage: python bench/bench_spatial.py [--points 10000 100000 1000000] [--queries 200]
+"""
+import argparse
+import random
+import time
+
+from common import formatSeconds, getPercentile, makeLocation
+from spatial import SpatialGrid, getDistance
+
+
+def scanNearest(points: dict, point: tuple, k: int) -> list:
+    return sorted((getDistance(point, other), key) for key, other in points.items())[:k]
+
+
+def scanWithinRadius(points: dict, point: tuple, radius: float) -> list:
+    return sorted(
+        (distance, key) for key, other in points.items() if (distance := getDistance(point, other)) <= radius
+    )
+
+
+def timeQueries(query, points: list) -> list[float]:
+    """Returns the sorted durations of running the query around each point."""
+    latencies = []
+    for point in points:
+        start = time.perf_counter()
+        query(point)
+        latencies.append(time.perf_counter() - start)
+    return sorted(latencies)
+
+
+def benchmark(pointCount: int, queryCount: int) -> None:
+    generator = random.Random(pointCount)
+    points = {f'Location {i}': makeLocation(generator).overworld for i in range(pointCount)}
+    grid = SpatialGrid()
+    for key, point in points.items():
+        grid.insert(key, point)
+
+    queries = [makeLocation(generator).overworld for _ in range(queryCount)]
+    # Scanning a million points takes around a second per query, so fewer scans are run on larger sets.
+    scanQueries = queries[:max(5, queryCount * 10000 // pointCount)]
+    approaches = {
+        ('nearest 5', 'scan'): (scanQueries, lambda point: scanNearest(points, point, 5)),
+        ('nearest 5', 'grid'): (queries, lambda point: grid.nearest(point, 5)),
+        ('within 500', 'scan'): (scanQueries, lambda point: scanWithinRadius(points, point, 500)),
+        ('within 500', 'grid'): (queries, lambda point: grid.withinRadius(point, 500)),
+    }
+    for (query, approach), (queryPoints, function) in approaches.items():
+        latencies = timeQueries(function, queryPoints)
+        print(f"{pointCount:>9} {query:>11} {approach:>6} {formatSeconds(getPercentile(latencies, 0.5)):>10} "
+              f"{formatSeconds(getPercentile(latencies, 0.99)):>10}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--points', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--queries', type=int, default=200)
+    arguments = parser.parse_args()
+
+    print(f"{'points':>9} {'query':>11} {'index':>6} {'p50':>10} {'p99':>10}")
+    for pointCount in arguments.points:
+        benchmark(pointCount, arguments.queries)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Compares how long loading the location data takes at startup, and the peak memory it needs, from the YAML file and
+from the binary snapshot written alongside it.
+
+Each load runs in a fresh process, so the peak resident set size only covers that load, on top of the `idle` process
+that imports the bot's modules and loads nothing.
+
+Usage: python bench/bench_startup.py [--locations 10000 100000 1000000]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from common import formatSeconds, makeData
+from persistence import AsyncYamlStore
+from storage import deserializeData, serializeData
+
+
+def loadInThisProcess(yamlFilepath: str, binaryFilepath: str) -> None:
+    """Loads the data once and prints the duration and the peak resident set size, in bytes, as JSON."""
+    if not yamlFilepath:
+        print(json.dumps({'seconds': 0, 'peakBytes': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024}))
+        return
+
+    store = AsyncYamlStore(yamlFilepath, binaryFilepath=binaryFilepath or None, deserialize=deserializeData)
+    start = time.perf_counter()
+    store.load()
+    duration = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({'seconds': duration, 'peakBytes': peak * 1024}))
+
+
+def loadInSubprocess(yamlFilepath: str, binaryFilepath: str) -> dict:
+    output = subprocess.run([sys.executable, __file__, '--load', yamlFilepath, binaryFilepath],
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output)
+
+
+def benchmark(locationCount: int, directory: Path) -> None:
+    yamlFilepath = directory / f'locations-{locationCount}.yaml'
+    binaryFilepath = directory / f'locations-{locationCount}.pickle'
+    AsyncYamlStore(str(yamlFilepath), binaryFilepath=str(binaryFilepath), serialize=serializeData).dump(
+        makeData(locationCount)
+    )
+
+    for name, binaryArgument in (('yaml', ''), ('pickle', str(binaryFilepath))):
+        result = loadInSubprocess(str(yamlFilepath), binaryArgument)
+        print(f"{locationCount:>9} {name:>8} {formatSeconds(result['seconds']):>10} "
+              f"{result['peakBytes'] / 2 ** 20:>9.1f} MB")
+
+
+def main() -> None:
+    if len(sys.argv) == 4 and sys.argv[1] == '--load':
+        loadInThisProcess(sys.argv[2], sys.argv[3])
+        return
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--locations', type=int, nargs='+', default=[10000, 100000, 1000000])
+    arguments = parser.parse_args()
+
+    directory = Path(tempfile.mkdtemp(prefix='bench-startup-'))
+    print(f"{'locations':>9} {'format':>8} {'load':>10} {'peak RSS':>12}")
+    idle = loadInSubprocess('', '')
+    print(f"{'-':>9} {'idle':>8} {'-':>10} {idle['peakBytes'] / 2 ** 20:>9.1f} MB")
+    for locationCount in arguments.locations:
+        benchmark(locationCount, directory)
+    for filepath in directory.iterdir():
+        os.remove(filepath)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Compares the cost of a single location write across storage backends as the number of stored locations grows.
+
+`rewrite` dumps the whole YAML file per write, as the bot did before storage backends were pluggable. For each
+backend, `on loop` is the time a write takes in the command, and `durable` is the time until it is on disk: its
+fsync'd journal record for YAML, its committed row for SQLite and its rewritten shard for sharded storage.
+
+Usage: python bench/bench_storage_writes.py [--locations 100 10000 1000000] [--writes 200]
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from common import formatSeconds, makeData, makeLocation, waitUntilDurable
+from persistence import AsyncYamlStore
+from storage import (ShardedLocationStorage, SqliteLocationStorage, YamlLocationStorage, migrateYamlToShards,
+                     migrateYamlToSqlite, serializeData)
+
+
+def createStorages(directory: Path, data: dict) -> dict:
+    """Seeds every backend with the data and returns them, keyed by name."""
+    yamlFilepath = directory / 'locations.yaml'
+    AsyncYamlStore(str(yamlFilepath), serialize=serializeData).dump(data)
+    migrateYamlToSqlite(str(yamlFilepath), str(directory / 'locations.db'))
+    migrateYamlToShards(str(yamlFilepath), str(directory / 'locations' / 'manifest.yaml'))
+
+    return {
+        'yaml': YamlLocationStorage(str(yamlFilepath)),
+        'sqlite': SqliteLocationStorage(str(directory / 'locations.db')),
+        'sharded': ShardedLocationStorage(str(directory / 'locations' / 'manifest.yaml')),
+    }
+
+
+async def measureWrites(storage, writes: int, generator: random.Random) -> tuple[float, float]:
+    """Returns the mean time a write takes on the loop and the mean time until a single write is durable."""
+    storageData = storage.load()
+    userID = next(iter(storageData['users'])) if not isinstance(storage, ShardedLocationStorage) else 1000
+
+    def write(i: int) -> None:
+        location = makeLocation(generator)
+        storageData['users'][userID]['locations']['homes'][f'New {i}'] = location
+        storage.putLocation(userID, 'homes', f'New {i}', location)
+
+    onLoop = []
+    for i in range(writes):
+        start = time.perf_counter()
+        write(i)
+        onLoop.append(time.perf_counter() - start)
+    await waitUntilDurable(storage)
+
+    durable = []
+    for i in range(writes, writes + 5):
+        start = time.perf_counter()
+        write(i)
+        await waitUntilDurable(storage)
+        durable.append(time.perf_counter() - start)
+
+    return statistics.mean(onLoop), statistics.mean(durable)
+
+
+async def benchmark(locationCount: int, writes: int) -> None:
+    generator = random.Random(1)
+    directory = Path(tempfile.mkdtemp(prefix=f'bench-storage-{locationCount}-'))
+    data = makeData(locationCount)
+
+    rewriteFilepath = directory / 'rewrite.yaml'
+    rewriteStore = AsyncYamlStore(str(rewriteFilepath), serialize=serializeData)
+    start = time.perf_counter()
+    rewriteStore.dump(data)
+    rewrite = time.perf_counter() - start
+    print(f"{locationCount:>9} {'rewrite':>8} {formatSeconds(rewrite):>10} {formatSeconds(rewrite):>10}")
+
+    for name, storage in createStorages(directory, data).items():
+        onLoop, durable = await measureWrites(storage, writes, generator)
+        print(f"{locationCount:>9} {name:>8} {formatSeconds(onLoop):>10} {formatSeconds(durable):>10}")
+        storage.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--locations', type=int, nargs='+', default=[100, 10000, 1000000])
+    parser.add_argument('--writes', type=int, default=200)
+    arguments = parser.parse_args()
+
+    print(f"{'locations':>9} {'backend':>8} {'on loop':>10} {'durable':>10}")
+    for locationCount in arguments.locations:
+        asyncio.run(benchmark(locationCount, arguments.writes))
+
+
+if __name__ == "__main__":
+    main()
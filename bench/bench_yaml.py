@@ -0,0 +1,40 @@
+"""Compares YAML load and dump throughput with the libyaml C loader and dumper against the pure Python ones.
+
+Usage: python bench/bench_yaml.py [--locations 100000] [--repeat 3]
+"""
+import argparse
+import io
+
+import yaml
+
+from common import formatSeconds, makeData, timeCalls
+from storage import serializeData
+
+implementations = {'pure Python': (yaml.SafeLoader, yaml.SafeDumper)}
+if yaml.__with_libyaml__:
+    implementations['libyaml'] = (yaml.CSafeLoader, yaml.CSafeDumper)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--locations', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    arguments = parser.parse_args()
+
+    data = serializeData(makeData(arguments.locations))
+    document = yaml.dump(data, Dumper=implementations.get('libyaml', implementations['pure Python'])[1])
+    megabytes = len(document.encode()) / 2 ** 20
+    print(f"{arguments.locations} locations, {megabytes:.1f} MB of YAML")
+    if 'libyaml' not in implementations:
+        print("libyaml is not available, so only the pure Python implementation is measured.")
+
+    print(f"{'implementation':>14} {'load':>10} {'dump':>10} {'load MB/s':>10} {'dump MB/s':>10}")
+    for name, (loader, dumper) in implementations.items():
+        load = timeCalls(lambda: yaml.load(document, Loader=loader), arguments.repeat)[0]
+        dump = timeCalls(lambda: yaml.dump(data, io.StringIO(), Dumper=dumper), arguments.repeat)[0]
+        print(f"{name:>14} {formatSeconds(load):>10} {formatSeconds(dump):>10} {megabytes / load:>10.1f} "
+              f"{megabytes / dump:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Helpers shared by the benchmark scripts, which are run directly, e.g. `python bench/bench_spatial.py`."""
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from location import Location
+from storage import ShardedLocationStorage, YamlLocationStorage, makeEmptyUserData
+
+
+def makeLocation(generator: random.Random) -> Location:
+    x, z, y = generator.randint(-30000, 30000), generator.randint(-30000, 30000), generator.randint(-64, 320)
+    return Location.inDimension('overworld', (x, z, y))
+
+
+def makeData(locationCount: int, locationsPerUser: int = 100, seed: int = 0) -> dict:
+    """Returns a data tree of synthetic users holding `locationCount` locations between them."""
+    generator = random.Random(seed)
+    data = {'users': {}}
+    for i in range(locationCount):
+        userData = data['users'].setdefault(1000 + i // locationsPerUser, makeEmptyUserData())
+        category = ('homes', 'farms', 'other')[i % 3]
+        userData['locations'][category][f'Location {i}'] = makeLocation(generator)
+    return data
+
+
+async def waitUntilDurable(storage) -> None:
+    """Waits for the writes queued so far, without compacting the YAML journal or checkpointing the SQLite WAL."""
+    if isinstance(storage, ShardedLocationStorage):
+        await storage.flush()
+        return
+
+    executor = storage.store.executor if isinstance(storage, YamlLocationStorage) else storage.executor
+    await asyncio.get_running_loop().run_in_executor(executor, lambda: None)
+
+
+def getPercentile(sortedValues: list[float], percentile: float) -> float:
+    return sortedValues[min(len(sortedValues) - 1, int(percentile * len(sortedValues)))]
+
+
+def timeCalls(function: Callable[[], object], repeat: int) -> list[float]:
+    """Returns the sorted durations of calling the function `repeat` times."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return sorted(durations)
+
+
+def formatSeconds(seconds: float) -> str:
+    if seconds < 1e-3:
+        return f'{seconds * 1e6:.1f} µs'
+    if seconds < 1:
+        return f'{seconds * 1e3:.2f} ms'
+    return f'{seconds:.2f} s'
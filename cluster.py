@@ -0,0 +1,98 @@
+import os
+import signal
+import subprocess
+import sys
+import time
+from logging import getLogger
+
+from main import createLogger, loadEnv
+
+logger = getLogger("main.cluster")
+
+
+def getWorkerCount() -> int:
+    """Returns the number of bot processes to run, one per core unless set with `cluster_workers`."""
+    return int(os.environ.get('cluster_workers', os.cpu_count() or 1))
+
+
+def getShardCount(workerCount: int) -> int:
+    """Returns the number of gateway shards to split the guilds across, one per worker unless set with `shard_count`."""
+    return int(os.environ.get('shard_count', workerCount))
+
+
+def getWorkerEnvironment(workerIndex: int, workerCount: int, shardCount: int) -> dict[str, str]:
+    """Returns the environment of a worker process, naming the shards it runs.
+
+    Only the first worker syncs the shared location data with AWS, and each worker serves its metrics on its own port.
+    """
+    environment = dict(os.environ)
+    environment['cluster_worker_index'] = str(workerIndex)
+    environment['shard_count'] = str(shardCount)
+    environment['shard_ids'] = ','.join(str(shardID) for shardID in range(workerIndex, shardCount, workerCount))
+    if 'metrics_port' in os.environ:
+        environment['metrics_port'] = str(int(os.environ['metrics_port']) + workerIndex)
+
+    return environment
+
+
+def startWorkers(workerCount: int, shardCount: int) -> list[subprocess.Popen]:
+    """Starts a bot process for each worker."""
+    workers = []
+    for workerIndex in range(workerCount):
+        environment = getWorkerEnvironment(workerIndex, workerCount, shardCount)
+        logger.info(f"Starting worker {workerIndex} with shards {environment['shard_ids']}.")
+        workers.append(subprocess.Popen([sys.executable, 'main.py'], env=environment))
+
+    return workers
+
+
+def superviseWorkers(workers: list[subprocess.Popen]) -> int:
+    """Waits until a worker exits or the launcher is asked to stop, then stops every worker and returns the exit code.
+
+    A worker that dies takes the whole cluster down with it, so the platform restarts all shards together.
+    """
+    stopping = False
+
+    def stop(signalNumber, frame):
+        nonlocal stopping
+        stopping = True
+
+    previousHandlers = {
+        signalNumber: signal.signal(signalNumber, stop) for signalNumber in (signal.SIGTERM, signal.SIGINT)
+    }
+
+    exitCode = 0
+    try:
+        while not stopping:
+            exitCodes = [worker.poll() for worker in workers]
+            if any(code is not None for code in exitCodes):
+                exitCode = next(code for code in exitCodes if code is not None)
+                logger.warning(f"Worker {exitCodes.index(exitCode)} exited with code {exitCode}, stopping the cluster.")
+                break
+            time.sleep(1)
+    finally:
+        for signalNumber, handler in previousHandlers.items():
+            signal.signal(signalNumber, handler)
+
+    for worker in workers:
+        if worker.poll() is None:
+            worker.terminate()
+    for worker in workers:
+        worker.wait()
+
+    return exitCode
+
+
+if __name__ == "__main__":
+    loadEnv()
+    createLogger()
+
+    if os.environ.get('location_backend') != 'sqlite':
+        sys.exit("Cluster mode shares the location data between processes and needs location_backend=sqlite.")
+
+    workerCount = getWorkerCount()
+    shardCount = getShardCount(workerCount)
+    if shardCount < workerCount:
+        sys.exit(f"Cannot split {shardCount} shards across {workerCount} workers.")
+
+    sys.exit(superviseWorkers(startWorkers(workerCount, shardCount)))
@@ -1,745 +1,985 @@
+import asyncio
+import itertools
+import math
+import os
 import re
 from logging import getLogger
 from pathlib import Path
-from typing import Optional
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Iterable, Optional, Union
 
 import discord
-import yaml
 from discord.ext import commands, tasks
 
-from aws import s3
+import exporter
+import importer
+from conversations import (ConversationCancelled, ConversationTimedOut, Conversations, Session, Step,
+                           makeChoiceParser)
+from embeds import EmbedTemplates, iconUrl, promptFooter
+from location import Coordinates, Location, parseUserCoords
+from s3sync import S3Sync
+from search import NameSearchIndex
+from spatial import SpatialGrid
+from storage import LocationStorage, createLocationStorage, makeEmptyUserData
 
 logger = getLogger("main.locations")
 
+Namespace = Union[discord.User, discord.Member, discord.Guild]
+
+spatialQueryPattern = re.compile(r"^(?:(overworld|nether|end)\s+)?(.+)$")
+addArgumentsPattern = re.compile(r"^(.+)\s+(overworld|nether|end)\s+(.+)$", re.IGNORECASE)
+
 
 class Locations(commands.Cog):
-    def __init__(self, bot):
+    def __init__(self, bot, storage: Optional[LocationStorage] = None, s3Sync: Optional[S3Sync] = None):
+        """Uses the storage backend and AWS client from the environment unless others, such as fakes, are given."""
         self.bot = bot
-        self.dataFilepath = str(Path.cwd() / 'data' / 'locations.yaml')
+        if storage is None:
+            storage = createLocationStorage(os.environ.get('location_backend', 'yaml'), Path.cwd() / 'data')
+        self.storage = storage
+        self.dataFilepath = self.storage.filepath
         self.data = self.getData()
+        self.nameIndexes: dict[int, dict[str, tuple[str, Location]]] = {}
+        self.spatialIndexes: dict[int, dict[str, SpatialGrid]] = {}
+        self.searchIndexes: dict[int, NameSearchIndex] = {}
+        self.sortedNames: dict[int, dict[str, list[str]]] = {}
+        self.namespaceLocks: dict[int, asyncio.Lock] = {}
+        self.versionCounter = itertools.count(1)
+        self.loadedVersion = next(self.versionCounter)
+        self.locationVersions: dict[int, dict[str, int]] = {}
+        if s3Sync is None:
+            # Imported here since the AWS client is built, from credentials in the environment, on import.
+            import aws
+            s3Sync = S3Sync(aws.s3, aws.BUCKET_NAME, str(Path(self.dataFilepath).with_name('s3sync.json')))
+        self.s3Sync = s3Sync
+        self.syncsWithAWS = os.environ.get('cluster_worker_index', '0') == '0'
+        self.embeds = self.makeEmbedTemplates()
+        self.conversations = Conversations(timeout=30)
+        self.steps = self.makeConversationSteps()
+
+    def cog_unload(self):
+        self.uploadData.cancel()
+        self.conversations.cancelAll()
+        self.storage.close()
+        self.s3Sync.close()
 
     images = {
-        'dirtBlock': 'https://cdn.pixabay.com/photo/2013/07/12/19/25/minecraft-154749__480.png',
+        'dirtBlock': iconUrl,
         'creeper': 'https://i.imgur.com/NipxpY1.jpg',
         'house': 'https://cdn.iconscout.com/icon/free/png-256/house-home-building-infrastructure-real-estate-resident-emoj-symbol-1-30743.png',
         'wheat': 'https://static.wikia.nocookie.net/minecraft_gamepedia/images/c/c0/Wonderful_Wheat_%28MCD%29.png/revision/latest?cb=20210111171738',
         'pearl': "https://static.wikia.nocookie.net/minecraft_gamepedia/images/f/f6/Ender_Pearl_JE3_BE2.png/revision/latest?cb=20200512195721",
     }
 
-    @commands.command()
-    async def add(self, ctx, locationType: str, *, name: str):
-        user = ctx.author
-        userID = user.id
-        self.validateUser(user)
-        locationData = self.data['users'][userID]['locations']
+    locationTypeCategories = {
+        'home': 'homes',
+        'farm': 'farms',
+        'other': 'other',
+    }
 
-        try:
-            assert locationType.lower() in ('farm', 'home', 'other')
-        except AssertionError:
-            await ctx.send(embed=self.makeAddInvalidLocationTypeEmbed())
-            return
+    categoryLocationTypes = {
+        'homes': 'home',
+        'farms': 'farm',
+        'other': 'other',
+    }
 
-        if locationType == 'home':
-            data = locationData['homes']
-        elif locationType == 'farm':
-            data = locationData['farms']
-        elif locationType == 'farm':
-            data = locationData['other']
-        else:
-            data = None
-
-        invalidNames = ('all', 'farms', 'homes', 'other')
-        while (nameExists := self.nameExists(name, user)) or (invalidName := name in invalidNames):
-            if nameExists:
-                message = "That location name already exists. Please enter a new name for this location."
-                embed = self.makeEditPromptEmbed(message)
-                await ctx.send(embed=embed)
-
-                try:
-                    msg = await self.bot.wait_for('message', check=lambda m: m.author == ctx.author, timeout=30)
-                except Exception as e:
-                    logger.error(e)
-                    await ctx.send(content=f"{ctx.author.mention}", embed=self.makeAddTimeoutEmbed())
-                    return
-                content = msg.content.lower()
-                if content == 'cancel':
-                    await ctx.send(embed=self.makeAddCancelledEmbed())
-                    return
-                else:
-                    name = msg.content
-            elif invalidName:
-                message = 'That location name is invalid. Please enter a new name for this location.'
-                embed = self.makeEditPromptEmbed(message)
-                await ctx.send(embed=embed)
-
-                try:
-                    msg = await self.bot.wait_for('message', check=lambda m: m.author == ctx.author, timeout=30)
-                except Exception as e:
-                    logger.error(e)
-                    await ctx.send(content=f"{ctx.author.mention}", embed=self.makeAddTimeoutEmbed())
-                    return
-                content = msg.content.lower()
-                if content == 'cancel':
-                    await ctx.send(embed=self.makeAddCancelledEmbed())
-                    return
-                else:
-                    name = msg.content
+    invalidNames = ('all', 'farms', 'homes', 'other')
 
-        coordinateTypeText = """What type of coordinates do you wish to enter?
-        
-        `1.` Overworld
-        `2.` Nether
-        `3.` End"""
-        embed = self.makeAddPromptEmbed(text=coordinateTypeText)
-        await ctx.send(embed=embed)
+    viewTitles = {
+        'homes': 'Homes',
+        'farms': 'Farms',
+        'other': 'Other Locations',
+    }
 
-        while True:
-            try:
-                msg = await self.bot.wait_for('message', check=lambda m: m.author == ctx.author, timeout=30)
-            except Exception as e:
-                logger.error(e)
-                await ctx.send(content=f"{ctx.author.mention}", embed=self.makeAddTimeoutEmbed())
-                return
+    namesPerPage = 15
+    maxDisplayedNameLength = 60
+    pageEmojis = ('◀️', '▶️')
+    pageTurnTimeout = 60
 
-            content = msg.content.lower()
-            if content == 'cancel':
-                await ctx.send(embed=self.makeAddCancelledEmbed())
-                return
-            elif content not in ('1', '2', '3'):
-                await ctx.send(embed=self.makeAddInvalidSelection())
-            else:
-                break
+    maxImportFileSize = 8 * 1024 * 1024
 
-        match content:
-            case '1':
-                coordType = 'overworld'
-            case '2':
-                coordType = 'nether'
-            case '3':
-                coordType = 'end'
-            case _:
-                coordType = None
+    actionAuthors = {
+        'add': 'Add Location',
+        'edit': 'Edit Location',
+    }
 
-        coordinateText = """Please enter your coordinates in parentheses. Example: `(-25, 300, 69)`"""
-        embed = self.makeAddPromptEmbed(text=coordinateText)
-        await ctx.send(embed=embed)
+    helpCommands = {
+        '!add `<location type>` `<name>` `[dimension]` `[coordinates]`\n\n\n\n': "Adds a new user location. Location type must be: `home`, `farm`, or `other`. Give the dimension and coordinates to skip the questions.\n\n",
+        '!remove `<location name>`\n\n': "Removes an existing location from a user.\n\n",
+        '!edit `<location name>`\n\n': "Edits an existing location's name or coordinates.\n\n",
+        '!view `<location>`\n\n\n': "Displays the coordinates of your location. Location can be: `all`, `farms`, `homes`, `others`, or a specific location name.\n\n",
+        '!nearest `[dimension]` `<coordinates>` `[count]`\n\n\n': "Lists your locations closest to the coordinates. Dimension defaults to `overworld`.\n\n",
+        '!within `[dimension]` `<coordinates>` `<radius>`\n\n\n': "Lists your locations within a radius of the coordinates.\n\n",
+        '!search `<text>`\n\n': "Finds your locations whose names start with or resemble the text.\n\n",
+        '!export `[format]`\n\n': "Sends all of your locations as a `csv`, `json` or `yaml` file.\n\n",
+        '!import\n\n\n': "Adds every location in an attached CSV, JSON or YAML file with the columns `name`, `type`, `dimension`, `x`, `z`, `y`.\n\n",
+        '!server `<command>`\n\n\n': "Runs any of the commands above on the locations shared by everyone in this server. Example: `*server view all`\n\n",
+    }
 
-        while True:
-            try:
-                msg = await self.bot.wait_for('message', check=lambda m: m.author == ctx.author, timeout=30)
-            except Exception as e:
-                logger.error(e)
-                await ctx.send(content=f"{ctx.author.mention}", embed=self.makeAddTimeoutEmbed())
-                return
+    @commands.command()
+    async def add(self, ctx, locationType: str, *, name: str):
+        await self.handleAdd(ctx, ctx.author, locationType, name)
 
-            content = msg.content.lower()
-            if content == 'cancel':
-                await ctx.send(embed=self.makeAddCancelledEmbed())
-                return
-            elif not self.areValidCoords(content):
-                await ctx.send(embed=self.makeAddInvalidSelection())
-            else:
-                break
+    @commands.command()
+    async def remove(self, ctx, *, locationName: str) -> None:
+        await self.handleRemove(ctx, ctx.author, locationName)
 
-        coordinates = self.extractCoords(content)
-
-        match coordType:
-            case 'overworld':
-                overworldCoords = coordinates
-                netherCoords = self.getNetherCoords(coordinates)
-                endCoords = None
-            case 'nether':
-                overworldCoords = self.getOverworldCoords(coordinates)
-                netherCoords = coordinates
-                endCoords = None
-            case 'end':
-                overworldCoords = None
-                netherCoords = None
-                endCoords = coordinates
-            case _:
-                overworldCoords = None
-                netherCoords = None
-                endCoords = None
-
-        data[name] = {
-            'overworld': str(overworldCoords),
-            'nether': str(netherCoords),
-            'end': str(endCoords)
-        }
-        self.saveData()
+    @commands.command()
+    async def edit(self, ctx, *, locationName: str) -> None:
+        await self.handleEdit(ctx, ctx.author, locationName)
 
-        await ctx.send(embed=self.makeAddSuccessfullyAddedEmbed())
+    @commands.command()
+    async def view(self, ctx, *, location: str):
+        """Command used to view user's own saved locations."""
+        await self.handleView(ctx, ctx.author, location)
 
     @commands.command()
-    async def remove(self, ctx, *, locationName: str) -> None:
-        user = ctx.author
-        userID = user.id
-        self.validateUser(user)
-        userData = self.data['users'][userID]['locations']
+    async def nearest(self, ctx, *, query: str):
+        """Command used to find the user's saved locations closest to a set of coordinates."""
+        await self.handleNearest(ctx, ctx.author, query)
 
-        if self.locationExists(locationName, user):
-            locationType = self.getLocationCategory(locationName, user)
-            userData[locationType].pop(locationName)
-            self.saveData()
+    @commands.command()
+    async def within(self, ctx, *, query: str):
+        """Command used to find the user's saved locations within a radius of a set of coordinates."""
+        await self.handleWithin(ctx, ctx.author, query)
 
-            await ctx.send(embed=self.makeRemoveSuccessEmbed())
-        else:
-            await ctx.send(embed=self.makeLocationDoesNotExistEmbed())
+    @commands.command(name='import')
+    async def importLocations(self, ctx):
+        """Command used to add many locations at once from an attached CSV, JSON or YAML file."""
+        await self.handleImport(ctx, ctx.author)
 
     @commands.command()
-    async def edit(self, ctx, *, locationName: str) -> None:
-        user = ctx.author
-        userID = user.id
-        self.validateUser(user)
-        userData = self.data['users'][userID]['locations']
-
-        if self.locationExists(locationName, user):
-            locationType = self.getLocationCategory(locationName, user)
-            locationData = userData[locationType][locationName]
-        else:
-            await ctx.send(embed=self.makeLocationDoesNotExistEmbed())
+    async def export(self, ctx, exportFormat: str = 'csv'):
+        """Command used to download all of the user's saved locations as a file."""
+        await self.handleExport(ctx, ctx.author, exportFormat)
 
-        changePrompt = """What would you like to change?
+    @commands.command()
+    async def search(self, ctx, *, query: str):
+        """Command used to find the user's saved locations by the start of their name, tolerating typos."""
+        await self.handleSearch(ctx, ctx.author, query)
 
-                `1.` Name
-                `2.` Coordinates"""
-        embed = self.makeAddPromptEmbed(text=changePrompt)
-        await ctx.send(embed=embed)
-        while True:
-            try:
-                msg = await self.bot.wait_for('message', check=lambda m: m.author == ctx.author, timeout=30)
-            except Exception as e:
-                logger.error(e)
-                await ctx.send(content=f"{ctx.author.mention}", embed=self.makeEditTimeoutEmbed())
-                return
+    @commands.group(invoke_without_command=True)
+    @commands.guild_only()
+    async def server(self, ctx):
+        """Command group used to work with the locations shared by everyone in a server."""
+        await ctx.send(embed=self.embeds['help'])
 
-            content = msg.content.lower()
-            if content == 'cancel':
-                await ctx.send(embed=self.makeEditCancelledEmbed())
-                return
-            elif content not in ('1', '2'):
-                await ctx.send(embed=self.makeEditInvalidSelection())
-            else:
-                break
+    @server.command(name='add')
+    async def serverAdd(self, ctx, locationType: str, *, name: str):
+        await self.handleAdd(ctx, ctx.guild, locationType, name)
 
-        if content == '1':
-            changePrompt = """Please enter the new name of this location."""
-            embed = self.makeEditPromptEmbed(text=changePrompt)
-            await ctx.send(embed=embed)
+    @server.command(name='remove')
+    async def serverRemove(self, ctx, *, locationName: str) -> None:
+        await self.handleRemove(ctx, ctx.guild, locationName)
 
-            try:
-                msg = await self.bot.wait_for('message', check=lambda m: m.author == ctx.author, timeout=30)
-            except Exception as e:
-                logger.error(e)
-                await ctx.send(content=f"{ctx.author.mention}", embed=self.makeEditTimeoutEmbed())
-                return
-            content = msg.content.lower()
-            if content == 'cancel':
-                await ctx.send(embed=self.makeEditCancelledEmbed())
-                return
-            else:
-                name = content
-
-            invalidNames = ('all', 'farms', 'homes', 'other')
-            while (nameExists := self.nameExists(name, user)) or (invalidName := name in invalidNames):
-                if nameExists:
-                    message = "That location name already exists. Please enter a new name for this location."
-                    embed = self.makeEditPromptEmbed(message)
-                    await ctx.send(embed=embed)
-
-                    try:
-                        msg = await self.bot.wait_for('message', check=lambda m: m.author == ctx.author, timeout=30)
-                    except Exception as e:
-                        logger.error(e)
-                        await ctx.send(content=f"{ctx.author.mention}", embed=self.makeAddTimeoutEmbed())
-                        return
-                    content = msg.content.lower()
-                    if content == 'cancel':
-                        await ctx.send(embed=self.makeAddCancelledEmbed())
-                        return
-                    else:
-                        name = msg.content
-                elif invalidName:
-                    message = 'That location name is invalid. Please enter a new name for this location.'
-                    embed = self.makeEditPromptEmbed(message)
-                    await ctx.send(embed=embed)
-
-                    try:
-                        msg = await self.bot.wait_for('message', check=lambda m: m.author == ctx.author, timeout=30)
-                    except Exception as e:
-                        logger.error(e)
-                        await ctx.send(content=f"{ctx.author.mention}", embed=self.makeAddTimeoutEmbed())
-                        return
-                    content = msg.content.lower()
-                    if content == 'cancel':
-                        await ctx.send(embed=self.makeAddCancelledEmbed())
-                        return
-                    else:
-                        name = msg.content
-
-            newName = msg.content
-            userData[locationType].pop(locationName)
-            userData[locationType][newName] = locationData
-            self.saveData()
-
-            await ctx.send(embed=self.makeEditNameSuccessEmbed())
-        elif content == '2':
-            coordinateTypeText = """What type of coordinates do you wish to enter?
-
-                        `1.` Overworld
-                        `2.` Nether
-                        `3.` End"""
-            embed = self.makeEditPromptEmbed(text=coordinateTypeText)
-            await ctx.send(embed=embed)
-
-            while True:
-                try:
-                    msg = await self.bot.wait_for('message', check=lambda m: m.author == ctx.author, timeout=30)
-                except Exception as e:
-                    logger.error(e)
-                    await ctx.send(content=f"{ctx.author.mention}", embed=self.makeEditTimeoutEmbed())
-                    return
+    @server.command(name='edit')
+    async def serverEdit(self, ctx, *, locationName: str) -> None:
+        await self.handleEdit(ctx, ctx.guild, locationName)
 
-                content = msg.content.lower()
-                if content == 'cancel':
-                    await ctx.send(embed=self.makeEditCancelledEmbed())
-                    return
-                elif content not in ('1', '2', '3'):
-                    await ctx.send(embed=self.makeEditInvalidSelection())
-                else:
-                    break
-
-            if content == '1':
-                coordType = 'overworld'
-            elif content == '2':
-                coordType = 'nether'
-            elif content == '3':
-                coordType = 'end'
-            else:
-                coordType = None
-
-            changePrompt = """Please enter the new coordinates for this location. Example: `(-25, 300, 69)`"""
-            embed = self.makeAddPromptEmbed(text=changePrompt)
-            await ctx.send(embed=embed)
-            while True:
-                try:
-                    msg = await self.bot.wait_for('message', check=lambda m: m.author == ctx.author, timeout=30)
-                except Exception as e:
-                    logger.error(e)
-                    await ctx.send(content=f"{ctx.author.mention}", embed=self.makeEditTimeoutEmbed())
-                    return
+    @server.command(name='view')
+    async def serverView(self, ctx, *, location: str):
+        await self.handleView(ctx, ctx.guild, location)
+
+    @server.command(name='nearest')
+    async def serverNearest(self, ctx, *, query: str):
+        await self.handleNearest(ctx, ctx.guild, query)
+
+    @server.command(name='within')
+    async def serverWithin(self, ctx, *, query: str):
+        await self.handleWithin(ctx, ctx.guild, query)
+
+    @server.command(name='import')
+    async def serverImport(self, ctx):
+        await self.handleImport(ctx, ctx.guild)
+
+    @server.command(name='export')
+    async def serverExport(self, ctx, exportFormat: str = 'csv'):
+        await self.handleExport(ctx, ctx.guild, exportFormat)
+
+    @server.command(name='search')
+    async def serverSearch(self, ctx, *, query: str):
+        await self.handleSearch(ctx, ctx.guild, query)
+
+    async def handleAdd(self, ctx, owner: Namespace, locationType: str, name: str) -> None:
+        self.validateOwner(owner)
 
-                content = msg.content.lower()
-                if content == 'cancel':
-                    await ctx.send(embed=self.makeEditCancelledEmbed())
+        try:
+            category = self.locationTypeCategories[locationType.lower()]
+        except KeyError:
+            await ctx.send(embed=self.makeAddInvalidLocationTypeEmbed())
+            return
+
+        name, dimension, coordinates = self.parseAddArguments(name)
+
+        async with self.converse(ctx, 'add') as session:
+            name = await session.ask(self.steps['add', 'name'], owner, answer=name)
+            if coordinates is None:
+                dimension = await session.ask(self.steps['add', 'dimension'])
+                coordinates = await session.ask(self.steps['add', 'coordinates'])
+
+            async with self.getNamespaceLock(owner):
+                if self.nameExists(name, owner):
+                    await ctx.send(embed=self.makeNameTakenEmbed('add'))
                     return
-                elif not self.areValidCoords(content):
-                    await ctx.send(embed=self.makeEditInvalidSelection())
-                else:
-                    break
-
-            coordinates = self.extractCoords(content)
-
-            if coordType == 'overworld':
-                overworldCoords = coordinates
-                netherCoords = self.getNetherCoords(coordinates)
-                endCoords = None
-            elif coordType == 'nether':
-                overworldCoords = self.getOverworldCoords(coordinates)
-                netherCoords = coordinates
-                endCoords = None
-            elif coordType == 'end':
-                overworldCoords = None
-                netherCoords = None
-                endCoords = coordinates
+                self.putLocation(owner, category, name, Location.inDimension(dimension, coordinates))
+
+            await ctx.send(embed=self.makeAddSuccessfullyAddedEmbed())
+
+    async def handleRemove(self, ctx, owner: Namespace, locationName: str) -> None:
+        self.validateOwner(owner)
+
+        async with self.getNamespaceLock(owner):
+            if self.locationExists(locationName, owner):
+                locationType = self.getLocationCategory(locationName, owner)
+                self.deleteLocation(owner, locationType, locationName)
+
+                await ctx.send(embed=self.makeRemoveSuccessEmbed())
             else:
-                overworldCoords = None
-                netherCoords = None
-                endCoords = None
+                await ctx.send(embed=self.makeLocationDoesNotExistEmbed(owner, locationName))
 
-            locationData['overworld'] = str(overworldCoords)
-            locationData['nether'] = str(netherCoords)
-            locationData['end'] = str(endCoords)
+    async def handleEdit(self, ctx, owner: Namespace, locationName: str) -> None:
+        self.validateOwner(owner)
 
-            self.saveData()
+        version = self.getLocationVersion(owner, locationName)
+        if version is None:
+            await ctx.send(embed=self.makeLocationDoesNotExistEmbed(owner, locationName))
+            return
 
-            await ctx.send(embed=self.makeEditCoordinatesSuccessEmbed())
+        async with self.converse(ctx, 'edit') as session:
+            change = await session.ask(self.steps['edit', 'change'])
 
-    @commands.command()
-    async def view(self, ctx, *, location: str):
-        """Command used to view user's own saved locations."""
-        user = ctx.author
-        self.validateUser(user)
+            if change == 'name':
+                newName = await session.ask(self.steps['edit', 'name'], owner)
+                async with self.getNamespaceLock(owner):
+                    if self.getLocationVersion(owner, locationName) != version:
+                        await ctx.send(embed=self.makeEditConflictEmbed())
+                        return
+                    if self.nameExists(newName, owner):
+                        await ctx.send(embed=self.makeNameTakenEmbed('edit'))
+                        return
+                    locationType = self.getLocationCategory(locationName, owner)
+                    self.renameLocation(owner, locationType, locationName, newName)
+
+                await ctx.send(embed=self.makeEditNameSuccessEmbed())
+            else:
+                dimension = await session.ask(self.steps['edit', 'dimension'])
+                coordinates = await session.ask(self.steps['edit', 'coordinates'])
+                async with self.getNamespaceLock(owner):
+                    if self.getLocationVersion(owner, locationName) != version:
+                        await ctx.send(embed=self.makeEditConflictEmbed())
+                        return
+                    locationType = self.getLocationCategory(locationName, owner)
+                    self.putLocation(owner, locationType, locationName, Location.inDimension(dimension, coordinates))
+
+                await ctx.send(embed=self.makeEditCoordinatesSuccessEmbed())
+
+    async def handleView(self, ctx, owner: Namespace, location: str) -> None:
+        self.validateOwner(owner)
 
         if location == 'all':
-            await ctx.send(embed=self.makeViewAllEmbed(user))
-        elif location == 'farms':
-            await ctx.send(embed=self.makeViewFarmsEmbed(user))
-        elif location == 'homes':
-            await ctx.send(embed=self.makeViewHomesEmbed(user))
-        elif location == 'other':
-            await ctx.send(embed=self.makeViewOtherEmbed(user))
+            pageCount = self.getPageCount(owner, self.viewTitles.keys())
+            await self.sendPaginated(ctx, lambda page: self.makeViewAllEmbed(owner, page), pageCount)
+        elif location in self.viewTitles:
+            pageCount = self.getPageCount(owner, [location])
+            await self.sendPaginated(ctx, lambda page: self.makeViewCategoryEmbed(owner, location, page), pageCount)
         else:
             try:
-                await ctx.send(embed=self.makeViewEmbed(user, location))
+                await ctx.send(embed=self.makeViewEmbed(owner, location))
             except ValueError:
-                await ctx.send(embed=self.makeLocationDoesNotExistEmbed())
+                await ctx.send(embed=self.makeLocationDoesNotExistEmbed(owner, location))
 
-    @commands.command()
-    async def help(self, ctx):
-        availableCommands = {
-            '!add `<location type>` `<name>`\n\n\n': "Adds a new user location. Location type must be: `home`, `farm`, or `other`.\n\n",
-            '!remove `<location name>`\n\n': "Removes an existing location from a user.\n\n",
-            '!edit `<location name>`\n\n': "Edits an existing location's name or coordinates.\n\n",
-            '!view `<location>`\n\n\n': "Displays the coordinates of your location. Location can be: `all`, `farms`, `homes`, `others`, or a specific location name.\n\n",
-        }
+    async def handleSearch(self, ctx, owner: Namespace, query: str) -> None:
+        self.validateOwner(owner)
 
-        commandsText = ''.join(list(availableCommands.keys()))
-        commandDescriptionsText = ''.join(list(availableCommands.values()))
+        names = self.getSearchIndex(owner).search(query, self.namesPerPage)
+        await ctx.send(embed=self.makeSearchResultsEmbed(owner, query, names))
 
-        embed = discord.Embed(color=0x52A435)
-        embed.set_author(name='Available Commands', icon_url=self.images['dirtBlock'])
-        embed.add_field(name='Command', value=commandsText)
-        embed.add_field(name='Description', value=commandDescriptionsText)
+    async def handleNearest(self, ctx, owner: Namespace, query: str) -> None:
+        self.validateOwner(owner)
+
+        try:
+            dimension, coordinates, count = self.parseSpatialQuery(query)
+        except ValueError:
+            await ctx.send(embed=self.makeInvalidSpatialQueryEmbed('`*nearest (-25, 300, 69) 3`'))
+            return
+
+        results = self.getSpatialIndex(owner, dimension).nearest(coordinates, min(count or 1, 25))
+        await ctx.send(embed=self.makeSpatialResultsEmbed(owner, dimension, f'Nearest to {coordinates}', results))
 
-        await ctx.send(embed=embed)
+    async def handleWithin(self, ctx, owner: Namespace, query: str) -> None:
+        self.validateOwner(owner)
+
+        try:
+            dimension, coordinates, radius = self.parseSpatialQuery(query)
+            assert radius is not None
+        except (ValueError, AssertionError):
+            await ctx.send(embed=self.makeInvalidSpatialQueryEmbed('`*within (-25, 300, 69) 500`'))
+            return
+
+        results = self.getSpatialIndex(owner, dimension).withinRadius(coordinates, radius)[:25]
+        title = f'Within {radius} blocks of {coordinates}'
+        await ctx.send(embed=self.makeSpatialResultsEmbed(owner, dimension, title, results))
+
+    async def handleImport(self, ctx, owner: Namespace) -> None:
+        self.validateOwner(owner)
+
+        if not ctx.message.attachments:
+            await ctx.send(embed=self.makeImportFailedEmbed(['Please attach a file of locations to import.']))
+            return
+
+        attachment = ctx.message.attachments[0]
+        if attachment.size > self.maxImportFileSize:
+            await ctx.send(embed=self.makeImportFailedEmbed(['That file is too large.']))
+            return
+
+        content = await attachment.read()
+        loop = asyncio.get_running_loop()
+        async with self.getNamespaceLock(owner):
+            takenNames = set(self.getNameIndex(owner)) | set(self.invalidNames)
+            try:
+                rows = await loop.run_in_executor(None, importer.readRows, attachment.filename, content)
+                entries, errors = await loop.run_in_executor(
+                    None, importer.buildLocations, rows, self.locationTypeCategories, takenNames
+                )
+            except ValueError as e:
+                await ctx.send(embed=self.makeImportFailedEmbed([str(e)]))
+                return
+
+            if errors:
+                await ctx.send(embed=self.makeImportFailedEmbed(errors))
+                return
+
+            self.putLocations(owner, entries)
+
+        await ctx.send(embed=self.makeImportSuccessEmbed(len(entries)))
+
+    async def handleExport(self, ctx, owner: Namespace, exportFormat: str) -> None:
+        self.validateOwner(owner)
+
+        exportFormat = exportFormat.lower()
+        if exportFormat not in exporter.exportFormats:
+            await ctx.send(embed=self.makeInvalidExportFormatEmbed())
+            return
+
+        # Serialized on a worker thread from a snapshot, since commands may change the locations meanwhile. Locations are
+        # immutable, so copying each category's dict is enough.
+        userData = {
+            category: dict(categoryData) for category, categoryData in self.data['users'][owner.id]['locations'].items()
+        }
+        loop = asyncio.get_running_loop()
+        buffer = await loop.run_in_executor(
+            None, exporter.exportLocations, userData, self.categoryLocationTypes, exportFormat
+        )
+        await ctx.send(file=discord.File(buffer, filename=f'locations.{exportFormat}'))
+
+    @commands.command()
+    async def help(self, ctx):
+        await ctx.send(embed=self.embeds['help'])
 
     @commands.command()
     @commands.is_owner()
     async def save(self, ctx):
-        self.saveData()
-        self.uploadToAWS()
+        await self.uploadToAWS()
+        await ctx.send(embed=self.embeds['saved'])
 
-        embed = discord.Embed(color=0x52A435, description='Location data has been save and uploaded!')
-        embed.set_author(name='Manual Save', icon_url=self.images['dirtBlock'])
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message):
+        self.conversations.route(message)
 
-        await ctx.send(embed=embed)
+    async def cog_before_invoke(self, ctx):
+        """Picks up locations changed by other processes sharing the storage, such as other cluster workers."""
+        changes = await self.storage.loadExternalChanges()
+        if changes is None:
+            return
+
+        if changes['replaced']:
+            # Commands waiting on a namespace lock may have validated owners that have no saved locations yet.
+            for userID in self.data['users']:
+                changes['users'].setdefault(userID, makeEmptyUserData())
+            self.replaceData({'users': changes['users']})
+        else:
+            for userID, userData in changes['users'].items():
+                self.replaceUserData(userID, userData)
 
     @commands.Cog.listener()
     async def on_ready(self):
-        self.downloadFromAWS()
+        if not self.syncsWithAWS or self.uploadData.is_running():
+            return
+
+        await self.downloadFromAWS()
 
         self.uploadData.start()
 
     @tasks.loop(hours=1)
     async def uploadData(self):
-        self.uploadToAWS()
+        await self.uploadToAWS()
 
-    def makeAddPromptEmbed(self, text: str) -> discord.Embed:
-        """Generates an embed containing specified text and title."""
-        embed = discord.Embed(color=0x52A435, description=text)
-        embed.set_author(name='Add Location', icon_url=self.images['dirtBlock'])
-        embed.set_footer(text='Please enter a response within 30 seconds. Type "cancel" to cancel at any time.')
+    def makeConversationSteps(self) -> dict[tuple[str, str], Step]:
+        """Declares the questions the add and edit dialogs are made of."""
+        dimensionPrompt = """What type of coordinates do you wish to enter?
 
-        return embed
+        `1.` Overworld
+        `2.` Nether
+        `3.` End"""
+        coordinatesPrompts = {
+            'add': 'Please enter your coordinates, or paste them from the F3 screen. Example: `(-25, 300, 69)`',
+            'edit': 'Please enter the new coordinates for this location, or paste them from the F3 screen. '
+                    'Example: `(-25, 300, 69)`',
+        }
+        namePrompts = {
+            'add': 'Please enter a name for this location.',
+            'edit': 'Please enter the new name of this location.',
+        }
+        changePrompt = """What would you like to change?
 
-    def makeAddInvalidLocationTypeEmbed(self) -> discord.Embed:
-        """Generates an embed notifying the user of an invalid location type."""
-        embed = discord.Embed(color=0x52A435,
-                              description='Invalid location type. Please try again.'
-                                          '\n\n Examples: `*add farm Slime Farm`, `*add home Main`, '
-                                          '`*add other Stronghold`')
-        embed.set_author(name='Add Location', icon_url=self.images['dirtBlock'])
+        `1.` Name
+        `2.` Coordinates"""
+
+        steps = {}
+        for action in self.actionAuthors:
+            steps[action, 'name'] = Step(self.makePromptEmbed(action, namePrompts[action]), self.parseNewName)
+            steps[action, 'dimension'] = Step(self.makePromptEmbed(action, dimensionPrompt),
+                                              makeChoiceParser({'1': 'overworld', '2': 'nether', '3': 'end'}))
+            steps[action, 'coordinates'] = Step(self.makePromptEmbed(action, coordinatesPrompts[action]),
+                                                self.parseCoordinatesReply)
+        steps['edit', 'change'] = Step(self.makePromptEmbed('edit', changePrompt),
+                                       makeChoiceParser({'1': 'name', '2': 'coordinates'}))
+
+        return steps
+
+    @asynccontextmanager
+    async def converse(self, ctx, action: str) -> AsyncIterator[Session]:
+        """Opens a dialog with the command's author, replying the same way whenever they time out or cancel."""
+        makeErrorEmbed = lambda reason: self.makeInvalidSelectionEmbed(action, reason)
+        with self.conversations.open(ctx.message, makeErrorEmbed) as session:
+            try:
+                yield session
+            except ConversationTimedOut:
+                await ctx.send(content=f"{ctx.author.mention}", embed=self.makeTimeoutEmbed(action))
+            except ConversationCancelled:
+                await ctx.send(embed=self.makeCancelledEmbed(action))
 
-        return embed
+    @staticmethod
+    def parseAddArguments(text: str) -> tuple[str, Optional[str], Optional[Coordinates]]:
+        """Splits the rest of an add command into the name and, when they are given too, the dimension and coordinates.
+
+        `Base overworld (-25, 300, 69)` adds the location in one message; anything else is taken as just the name.
+        """
+        match = addArgumentsPattern.match(text)
+        if match and (coordinates := parseUserCoords(match.group(3))) is not None:
+            return match.group(1), match.group(2).lower(), coordinates
+        return text, None, None
+
+    def parseNewName(self, name: str, owner: Namespace) -> str:
+        """Returns the name if the owner can give it to a location, and raises ValueError explaining why otherwise."""
+        if name in self.invalidNames:
+            raise ValueError('That location name is invalid. Please enter a new name for this location.')
+        if self.nameExists(name, owner):
+            raise ValueError('That location name already exists. Please enter a new name for this location.')
+        return name
 
-    def makeAddTimeoutEmbed(self) -> discord.Embed:
+    @staticmethod
+    def parseCoordinatesReply(content: str) -> Coordinates:
+        if (coordinates := parseUserCoords(content)) is None:
+            raise ValueError
+        return coordinates
+
+    def makeEmbedTemplates(self) -> EmbedTemplates:
+        """Builds the embeds for every static response, and the templates that dynamic responses are copied from."""
+        embeds = EmbedTemplates(self.images['dirtBlock'])
+
+        for action, author in self.actionAuthors.items():
+            embeds.register((action, 'prompt'), author, footer=promptFooter)
+            embeds.register((action, 'invalidSelection'), author, 'Invalid input. Please try again.', promptFooter)
+            embeds.register((action, 'timeout'), author, 'You were timed out. Please try again.')
+            embeds.register((action, 'cancelled'), author, 'Cancelled. Have a nice day!')
+            embeds.register((action, 'nameTaken'), author,
+                            'A location with that name was saved in the meantime. Please try again with a new name.')
+
+        embeds.register('invalidLocationType', 'Add Location',
+                        'Invalid location type. Please try again.'
+                        '\n\n Examples: `*add farm Slime Farm`, `*add home Main overworld (-25, 300, 69)`, '
+                        '`*add other Stronghold`')
+        embeds.register('added', 'Add Location', 'Location added!')
+        embeds.register('removed', 'Add Location', 'Location has been removed!')
+        embeds.register('locationDoesNotExist', 'Add Location',
+                        'That location does not exist. Please try again and ensure that the capitalization is correct.')
+        embeds.register('renamed', 'Edit Location', 'The name for this location has been changed!')
+        embeds.register('editConflict', 'Edit Location',
+                        'This location was changed or removed while you were editing it, so your edit was not saved. '
+                        'Please try again.')
+        embeds.register('coordinatesChanged', 'Edit Location', 'The coordinates for this location has been changed!')
+        embeds.register('invalidSpatialQuery', 'Find Locations')
+        embeds.register('importFailed', 'Import Locations')
+        embeds.register('imported', 'Import Locations')
+        embeds.register('invalidExportFormat', 'Export Locations',
+                        'Invalid format. Please try again.\n\n Examples: `*export csv`, `*export json`, `*export yaml`')
+        embeds.register('saved', 'Manual Save', 'Location data has been save and uploaded!')
+
+        helpEmbed = embeds.register('help', 'Available Commands')
+        helpEmbed.add_field(name='Command', value=''.join(self.helpCommands.keys()))
+        helpEmbed.add_field(name='Description', value=''.join(self.helpCommands.values()))
+
+        return embeds
+
+    def makePromptEmbed(self, action: str, text: str) -> discord.Embed:
+        """Generates an embed asking the user for the next step of an add or edit."""
+        return self.embeds.fill((action, 'prompt'), description=text)
+
+    def makeInvalidSelectionEmbed(self, action: str, reason: str = '') -> discord.Embed:
+        """Generates an embed notifying the user of invalid input, along with why if a reason is given."""
+        if not reason:
+            return self.embeds[action, 'invalidSelection']
+        return self.embeds.fill((action, 'invalidSelection'), reason)
+
+    def makeTimeoutEmbed(self, action: str) -> discord.Embed:
         """Generates an embed notifying the user they were timed out."""
-        embed = discord.Embed(color=0x52A435, description='You were timed out. Please try again.')
-        embed.set_author(name='Add Location', icon_url=self.images['dirtBlock'])
+        return self.embeds[action, 'timeout']
 
-        return embed
-
-    def makeAddCancelledEmbed(self) -> discord.Embed:
+    def makeCancelledEmbed(self, action: str) -> discord.Embed:
         """Generates an embed notifying the user that their command was successfully cancelled."""
-        embed = discord.Embed(color=0x52A435, description='Cancelled. Have a nice day!')
-        embed.set_author(name='Add Location', icon_url=self.images['dirtBlock'])
-
-        return embed
+        return self.embeds[action, 'cancelled']
 
-    def makeAddInvalidSelection(self) -> discord.Embed:
-        """Generates an embed notifying the user of invalid input."""
-        embed = discord.Embed(color=0x52A435, description='Invalid input. Please try again.')
-        embed.set_author(name='Add Location', icon_url=self.images['dirtBlock'])
-        embed.set_footer(text='Please enter a response within 30 seconds. Type "cancel" to cancel at any time.')
-
-        return embed
+    def makeAddInvalidLocationTypeEmbed(self) -> discord.Embed:
+        """Generates an embed notifying the user of an invalid location type."""
+        return self.embeds['invalidLocationType']
 
     def makeAddSuccessfullyAddedEmbed(self) -> discord.Embed:
         """Generates an embed notifying the user that the location was successfully added."""
-        embed = discord.Embed(color=0x52A435, description='Location added!')
-        embed.set_author(name='Add Location', icon_url=self.images['dirtBlock'])
+        return self.embeds['added']
 
-        return embed
-
-    def makeViewFarmsEmbed(self, user: discord.User) -> discord.Embed:
-        farmData = self.data['users'][user.id]['locations']['farms']
-
-        if farmData == {}:
-            farmNames = 'None'
-        else:
-            farmNames = ''
-            for name, _ in farmData.items():
-                farmNames += name + '\n'
+    def makeViewCategoryEmbed(self, owner: Namespace, category: str, page: int = 0) -> discord.Embed:
+        """Generates an embed displaying a page of the owner's saved locations in a category."""
+        pageCount = self.getPageCount(owner, [category])
 
         embed = discord.Embed(color=0x52A435)
-        embed.set_author(name=f"{user.name}'s Farms", icon_url=self.images['dirtBlock'])
-        embed.add_field(name='Name', value=farmNames)
-        embed.set_footer(text='To view coordinates, please use: !view <name>')
+        embed.set_author(name=f"{owner.name}'s {self.viewTitles[category]}", icon_url=self.images['dirtBlock'])
+        embed.add_field(name='Name', value=self.formatNamesPage(owner, category, page))
+        embed.set_footer(text=f'Page {page + 1}/{pageCount} · To view coordinates, please use: !view <name>')
 
         return embed
 
-    def makeViewHomesEmbed(self, user: discord.User) -> discord.Embed:
-        homeData = self.data['users'][user.id]['locations']['homes']
-
-        if homeData == {}:
-            homeNames = 'None'
-        else:
-            homeNames = ''
-            for name, _ in homeData.items():
-                homeNames += name + '\n'
+    def makeViewAllEmbed(self, owner: Namespace, page: int = 0) -> discord.Embed:
+        """Generates an embed displaying a page of all of an owner's saved locations."""
+        pageCount = self.getPageCount(owner, self.viewTitles.keys())
 
         embed = discord.Embed(color=0x52A435)
-        embed.set_author(name=f"{user.name}'s Homes", icon_url=self.images['dirtBlock'])
-        embed.add_field(name='Name', value=homeNames)
-        embed.set_footer(text='To view coordinates, please use: !view <name>')
+        embed.set_author(name=f"{owner.name}'s Locations", icon_url=self.images['dirtBlock'])
+        embed.add_field(name='Homes', value=self.formatNamesPage(owner, 'homes', page))
+        embed.add_field(name='Farms', value=self.formatNamesPage(owner, 'farms', page))
+        embed.add_field(name='Other', value=self.formatNamesPage(owner, 'other', page))
+        embed.set_footer(text=f'Page {page + 1}/{pageCount} · To view coordinates, please use: !view <name>')
 
         return embed
 
-    def makeViewOtherEmbed(self, user: discord.User) -> discord.Embed:
-        otherData = self.data['users'][user.id]['locations']['other']
-
-        if otherData == {}:
-            otherNames = 'None'
-        else:
-            otherNames = ''
-            for name, _ in otherData.items():
-                otherNames += name + '\n'
+    def makeViewEmbed(self, owner: Namespace, locationName: str) -> discord.Embed:
+        location = self.getLocationData(locationName, owner)
+        overworldCoords = str(location.overworld)
+        netherCoords = str(location.nether)
+        endCoords = str(location.end)
 
         embed = discord.Embed(color=0x52A435)
-        embed.set_author(name=f"{user.name}'s Other Locations", icon_url=self.images['dirtBlock'])
-        embed.add_field(name='Name', value=otherNames)
-        embed.set_footer(text='To view coordinates, please use: !view <name>')
+        embed.set_author(name=f"Coordinates for {locationName}", icon_url=self.images['dirtBlock'])
+        embed.add_field(name='Overworld', value=overworldCoords)
+        embed.add_field(name='Nether', value=netherCoords)
+        embed.add_field(name='End', value=endCoords)
 
         return embed
 
-    def makeViewAllEmbed(self, user: discord.User) -> discord.Embed:
-        """Generates an embed displaying all of a user's saved locations."""
-        homeData = self.data['users'][user.id]['locations']['homes']
-        farmsData = self.data['users'][user.id]['locations']['farms']
-        otherData = self.data['users'][user.id]['locations']['other']
-
-        if otherData == {}:
-            otherNames = 'None'
+    def makeSpatialResultsEmbed(self, owner: Namespace, dimension: str, title: str,
+                                results: list[tuple[float, str]]) -> discord.Embed:
+        """Generates an embed listing locations along with their distance from a set of coordinates."""
+        if results:
+            names = '\n'.join(name for _, name in results)
+            distances = '\n'.join(f'{distance:.0f}' for distance, _ in results)
         else:
-            otherNames = ''
-            for name, _ in otherData.items():
-                otherNames += name + '\n'
+            names = 'None'
+            distances = '-'
 
-        if homeData == {}:
-            homeNames = 'None'
-        else:
-            homeNames = ''
-            for name, _ in homeData.items():
-                homeNames += name + '\n'
+        embed = discord.Embed(color=0x52A435, description=f'{title} in the {dimension.capitalize()}')
+        embed.set_author(name=f"{owner.name}'s Locations", icon_url=self.images['dirtBlock'])
+        embed.add_field(name='Name', value=names)
+        embed.add_field(name='Distance', value=distances)
+        embed.set_footer(text='To view coordinates, please use: !view <name>')
 
-        if farmsData == {}:
-            farmNames = 'None'
+        return embed
+
+    def makeSearchResultsEmbed(self, owner: Namespace, query: str, names: list[str]) -> discord.Embed:
+        """Generates an embed listing the locations found by a search along with their type."""
+        nameIndex = self.getNameIndex(owner)
+        if names:
+            namesText = '\n'.join(self.shortenName(name) for name in names)
+            typesText = '\n'.join(self.categoryLocationTypes[nameIndex[name][0]].capitalize() for name in names)
         else:
-            farmNames = ''
-            for name, _ in farmsData.items():
-                farmNames += name + '\n'
+            namesText = 'None'
+            typesText = '-'
 
-        embed = discord.Embed(color=0x52A435)
-        embed.set_author(name=f"{user.name}'s Locations", icon_url=self.images['dirtBlock'])
-        embed.add_field(name='Homes', value=homeNames)
-        embed.add_field(name='Farms', value=farmNames)
-        embed.add_field(name='Other', value=otherNames)
+        embed = discord.Embed(color=0x52A435, description=f'Locations matching `{query}`')
+        embed.set_author(name=f"{owner.name}'s Locations", icon_url=self.images['dirtBlock'])
+        embed.add_field(name='Name', value=namesText)
+        embed.add_field(name='Type', value=typesText)
         embed.set_footer(text='To view coordinates, please use: !view <name>')
 
         return embed
 
-    def makeViewEmbed(self, user: discord.User, locationName: str) -> discord.Embed:
-        locationData = self.getLocationData(locationName, user)
-        overworldCoords = locationData['overworld']
-        netherCoords = locationData['nether']
-        endCoords = locationData['end']
+    def makeInvalidSpatialQueryEmbed(self, example: str) -> discord.Embed:
+        """Generates an embed notifying the user of an invalid location search."""
+        return self.embeds.fill('invalidSpatialQuery', f'Invalid search. Please try again.\n\n Example: {example}')
 
-        embed = discord.Embed(color=0x52A435)
-        embed.set_author(name=f"Coordinates for {locationName}", icon_url=self.images['dirtBlock'])
-        embed.add_field(name='Overworld', value=overworldCoords)
-        embed.add_field(name='Nether', value=netherCoords)
-        embed.add_field(name='End', value=endCoords)
+    def makeImportFailedEmbed(self, errors: list[str]) -> discord.Embed:
+        """Generates an embed notifying the user why their locations could not be imported."""
+        description = '\n'.join(errors[:10])
+        if len(errors) > 10:
+            description += f'\n...and {len(errors) - 10} more.'
 
-        return embed
+        return self.embeds.fill('importFailed', f'Nothing was imported.\n\n{description}')
+
+    def makeInvalidExportFormatEmbed(self) -> discord.Embed:
+        """Generates an embed notifying the user of an invalid export format."""
+        return self.embeds['invalidExportFormat']
+
+    def makeImportSuccessEmbed(self, count: int) -> discord.Embed:
+        """Generates an embed notifying the user that their locations were successfully imported."""
+        return self.embeds.fill('imported', f'{count} locations imported!')
 
     def makeRemoveSuccessEmbed(self) -> discord.Embed:
         """Generates an embed notifying the user that the location was successfully removed."""
-        embed = discord.Embed(color=0x52A435, description='Location has been removed!')
-        embed.set_author(name='Add Location', icon_url=self.images['dirtBlock'])
+        return self.embeds['removed']
 
-        return embed
+    def makeLocationDoesNotExistEmbed(self, owner: Optional[Namespace] = None,
+                                      locationName: Optional[str] = None) -> discord.Embed:
+        """Generates an embed notifying the user of a non-existent location, suggesting similarly named ones."""
+        if owner is None or locationName is None:
+            return self.embeds['locationDoesNotExist']
 
-    def makeEditInvalidSelection(self) -> discord.Embed:
-        """Generates an embed notifying the user of invalid input."""
-        embed = discord.Embed(color=0x52A435, description='Invalid input. Please try again.')
-        embed.set_author(name='Edit Location', icon_url=self.images['dirtBlock'])
-        embed.set_footer(text='Please enter a response within 30 seconds. Type "cancel" to cancel at any time.')
+        suggestions = self.getSearchIndex(owner).search(locationName, 3)
+        if not suggestions:
+            return self.embeds['locationDoesNotExist']
 
-        return embed
+        names = ', '.join(f'`{self.shortenName(name)}`' for name in suggestions)
+        return self.embeds.fill('locationDoesNotExist', f'That location does not exist. Did you mean {names}?')
 
-    def makeEditCancelledEmbed(self) -> discord.Embed:
-        """Generates an embed notifying the user that their command was successfully cancelled."""
-        embed = discord.Embed(color=0x52A435, description='Cancelled. Have a nice day!')
-        embed.set_author(name='Edit Location', icon_url=self.images['dirtBlock'])
+    def makeNameTakenEmbed(self, action: str) -> discord.Embed:
+        """Generates an embed notifying the user that the name was taken while they were answering."""
+        return self.embeds[action, 'nameTaken']
 
-        return embed
+    def makeEditConflictEmbed(self) -> discord.Embed:
+        """Generates an embed notifying the user that the location changed while they were editing it."""
+        return self.embeds['editConflict']
 
-    def makeEditTimeoutEmbed(self) -> discord.Embed:
-        """Generates an embed notifying the user they were timed out."""
-        embed = discord.Embed(color=0x52A435, description='You were timed out. Please try again.')
-        embed.set_author(name='Edit Location', icon_url=self.images['dirtBlock'])
-
-        return embed
+    def makeEditNameSuccessEmbed(self) -> discord.Embed:
+        """Generates an embed notifying the user that the location's name was successfully changed."""
+        return self.embeds['renamed']
 
-    def makeEditPromptEmbed(self, text: str) -> discord.Embed:
-        """Generates an embed containing specified text and title."""
-        embed = discord.Embed(color=0x52A435, description=text)
-        embed.set_author(name='Edit Location', icon_url=self.images['dirtBlock'])
-        embed.set_footer(text='Please enter a response within 30 seconds. Type "cancel" to cancel at any time.')
+    def makeEditCoordinatesSuccessEmbed(self) -> discord.Embed:
+        """Generates an embed notifying the user that the location's coordinates were successfully changed."""
+        return self.embeds['coordinatesChanged']
 
-        return embed
+    async def sendPaginated(self, ctx, makeEmbed: Callable[[int], discord.Embed], pageCount: int) -> None:
+        """Sends the first page of a listing and lets the author flip through the rest with reactions."""
+        message = await ctx.send(embed=makeEmbed(0))
+        if pageCount <= 1:
+            return
 
-    def makeLocationDoesNotExistEmbed(self) -> discord.Embed:
-        """Generates an embed notifying the user of a non-existent location."""
-        embed = discord.Embed(color=0x52A435,
-                              description='That location does not exist. Please try again and ensure that the '
-                                          'capitalization '
-                                          'is correct.')
-        embed.set_author(name='Add Location', icon_url=self.images['dirtBlock'])
+        for emoji in self.pageEmojis:
+            await message.add_reaction(emoji)
 
-        return embed
+        def isPageTurn(reaction: discord.Reaction, reactingUser: discord.User) -> bool:
+            return (reaction.message.id == message.id and reactingUser == ctx.author
+                    and str(reaction.emoji) in self.pageEmojis)
 
-    def makeEditNameSuccessEmbed(self) -> discord.Embed:
-        """Generates an embed notifying the user that the location's name was successfully changed."""
-        embed = discord.Embed(color=0x52A435, description="The name for this location has been changed!")
-        embed.set_author(name='Edit Location', icon_url=self.images['dirtBlock'])
+        page = 0
+        while True:
+            try:
+                reaction, reactingUser = await self.bot.wait_for('reaction_add', check=isPageTurn,
+                                                                 timeout=self.pageTurnTimeout)
+            except asyncio.TimeoutError:
+                break
 
-        return embed
+            step = -1 if str(reaction.emoji) == self.pageEmojis[0] else 1
+            page = (page + step) % pageCount
+            await message.edit(embed=makeEmbed(page))
+            try:
+                await message.remove_reaction(reaction.emoji, reactingUser)
+            except discord.HTTPException:
+                pass
 
-    def makeEditCoordinatesSuccessEmbed(self) -> discord.Embed:
-        """Generates an embed notifying the user that the location's coordinates were successfully changed."""
-        embed = discord.Embed(color=0x52A435, description="The coordinates for this location has been changed!")
-        embed.set_author(name='Edit Location', icon_url=self.images['dirtBlock'])
+        try:
+            await message.clear_reactions()
+        except discord.HTTPException:
+            pass
 
-        return embed
+    def getSortedNames(self, owner: Namespace, category: str) -> list[str]:
+        """Returns the owner's location names in a category in alphabetical order, sorting them only once per change."""
+        userSortedNames = self.sortedNames.setdefault(owner.id, {})
+        try:
+            return userSortedNames[category]
+        except KeyError:
+            names = sorted(self.data['users'][owner.id]['locations'][category], key=str.lower)
+            userSortedNames[category] = names
+            return names
+
+    def getPageCount(self, owner: Namespace, categories: Iterable[str]) -> int:
+        """Returns the number of pages needed to list the owner's locations in the given categories."""
+        longestCategory = max(len(self.getSortedNames(owner, category)) for category in categories)
+        return max(1, math.ceil(longestCategory / self.namesPerPage))
+
+    def formatNamesPage(self, owner: Namespace, category: str, page: int) -> str:
+        """Returns a page of the owner's location names in a category, one per line, within an embed field's limit."""
+        start = page * self.namesPerPage
+        names = self.getSortedNames(owner, category)[start:start + self.namesPerPage]
+        if not names:
+            return 'None'
+
+        return '\n'.join(self.shortenName(name) for name in names)
+
+    @classmethod
+    def shortenName(cls, name: str) -> str:
+        """Truncates a location name so that a page of names fits within an embed field."""
+        if len(name) <= cls.maxDisplayedNameLength:
+            return name
+        return name[:cls.maxDisplayedNameLength - 1] + '…'
 
     @staticmethod
-    def areValidCoords(coordinates: str) -> bool:
-        """Determines if the given coordinates are in the proper format."""
-        validCoordRegex = re.compile(r"^\(\s*(-?\d*)\s*,\s*(-?\d*)\s*,\s*(-?\d*)\s*\)$")
-        match = re.search(validCoordRegex, coordinates)
-        if match:
-            return True
-        else:
-            return False
+    def parseSpatialQuery(query: str) -> tuple[str, Coordinates, Optional[int]]:
+        """Splits a location search into its dimension, coordinates, and trailing number (if any)."""
+        match = spatialQueryPattern.search(query.strip().lower())
+        if not match:
+            raise ValueError
+
+        dimension = match.group(1) or 'overworld'
+        text = match.group(2)
+        number = None
+        if (coordinates := parseUserCoords(text)) is None:
+            text, _, numberText = text.rpartition(' ')
+            if not numberText.isdigit() or (coordinates := parseUserCoords(text)) is None:
+                raise ValueError
+            number = int(numberText)
+
+        return dimension, coordinates, number
+
+    def validateOwner(self, owner: Namespace):
+        try:
+            assert owner.id in self.data['users']
+        except AssertionError:
+            self.data['users'][owner.id] = makeEmptyUserData()
 
-    @staticmethod
-    def extractCoords(coordinates: str) -> tuple[int, int, int]:
-        """Extracts and returns a location's coordinates from a string."""
-        validCoordRegex = re.compile(r"^\(\s*(-?\d*)\s*,\s*(-?\d*)\s*,\s*(-?\d*)\s*\)$")
-        match = re.search(validCoordRegex, coordinates)
-        x = int(match.group(1))
-        z = int(match.group(2))
-        y = int(match.group(3))
+    def getNamespaceLock(self, owner: Namespace) -> asyncio.Lock:
+        """Returns the lock that serializes changes to the owner's locations."""
+        return self.namespaceLocks.setdefault(owner.id, asyncio.Lock())
 
-        return x, z, y
+    def getLocationVersion(self, owner: Namespace, locationName: str) -> Optional[int]:
+        """Returns a version of the owner's location that changes whenever it does, or None if it does not exist.
 
-    @staticmethod
-    def getOverworldCoords(netherCoordinates: tuple) -> tuple:
-        """Converts a set of nether coordinates to overworld coordinates."""
-        x, z, y = (coord * 8 for coord in netherCoordinates)
-        return x, z, y
+        Locations that have not changed since the data was loaded share the version of the load.
+        """
+        if not self.locationExists(locationName, owner):
+            return None
+        return self.locationVersions.get(owner.id, {}).get(locationName, self.loadedVersion)
 
-    @staticmethod
-    def getNetherCoords(overworldCoordinates: tuple) -> tuple:
-        """Converts a set of overworld coordinates to nether coordinates."""
-        x, z, y = (round(coord / 8) for coord in overworldCoordinates)
-        return x, z, y
+    def updateLocationVersion(self, owner: Namespace, locationName: str) -> None:
+        self.locationVersions.setdefault(owner.id, {})[locationName] = next(self.versionCounter)
 
-    def validateUser(self, user: discord.User):
+    def getNameIndex(self, owner: Namespace) -> dict[str, tuple[str, Location]]:
+        """Returns the index mapping an owner's location names to their category and location, building it if needed."""
         try:
-            assert user.id in self.data['users']
-        except AssertionError:
-            self.data['users'][user.id] = {
-                'locations': {
-                    'homes': {},
-                    'farms': {},
-                    'other': {}
-                }
+            return self.nameIndexes[owner.id]
+        except KeyError:
+            userData = self.data['users'][owner.id]['locations']
+            nameIndex = {
+                name: (category, location)
+                for category, categoryData in userData.items()
+                for name, location in categoryData.items()
             }
+            self.nameIndexes[owner.id] = nameIndex
+            return nameIndex
 
-    def nameExists(self, locationName: str, user: discord.User) -> bool:
+    def nameExists(self, locationName: str, owner: Namespace) -> bool:
         """Determines if the location name already exists in a location data set."""
-        userLocationData = self.data['users'][user.id]['locations']
-
-        for locationCategory, categoryData in userLocationData.items():
-            names = categoryData.keys()
-            if locationName in names:
-                return True
-        return False
-
-    def locationExists(self, locationName: str, user: discord.User) -> bool:
-        userData = self.data['users'][user.id]['locations']
-        for locationCategory, locationData in userData.items():
-            names = list(locationData.keys())
-            if locationName in names:
-                return True
-        return False
-
-    def getLocationCategory(self, locationName: str, user: discord.User) -> Optional[str]:
-        userData = self.data['users'][user.id]['locations']
-        for locationCategory, locationData in userData.items():
-            names = list(locationData.keys())
-            if locationName in names:
-                return locationCategory
-        return None
-
-    def getLocationData(self, locationName: str, user: discord.User) -> dict:
-        userData = self.data['users'][user.id]['locations']
-
-        homeData = userData['homes']
-        if locationName in list(homeData.keys()):
-            return homeData[locationName]
-
-        farmData = userData['farms']
-        if locationName in list(farmData.keys()):
-            return farmData[locationName]
-
-        otherData = userData['other']
-        if locationName in list(otherData.keys()):
-            return otherData[locationName]
-
-        raise ValueError
+        return locationName in self.getNameIndex(owner)
+
+    def locationExists(self, locationName: str, owner: Namespace) -> bool:
+        return locationName in self.getNameIndex(owner)
+
+    def getLocationCategory(self, locationName: str, owner: Namespace) -> Optional[str]:
+        try:
+            return self.getNameIndex(owner)[locationName][0]
+        except KeyError:
+            return None
+
+    def getLocationData(self, locationName: str, owner: Namespace) -> Location:
+        try:
+            return self.getNameIndex(owner)[locationName][1]
+        except KeyError:
+            raise ValueError
+
+    def getSearchIndex(self, owner: Namespace) -> NameSearchIndex:
+        """Returns the index for searching an owner's location names, building it if needed."""
+        try:
+            return self.searchIndexes[owner.id]
+        except KeyError:
+            searchIndex = NameSearchIndex(self.getNameIndex(owner))
+            self.searchIndexes[owner.id] = searchIndex
+            return searchIndex
+
+    def getSpatialIndex(self, owner: Namespace, dimension: str) -> SpatialGrid:
+        """Returns the index of an owner's location coordinates in a dimension, building it if needed."""
+        try:
+            return self.spatialIndexes[owner.id][dimension]
+        except KeyError:
+            spatialIndexes = {indexDimension: SpatialGrid() for indexDimension in Location.dimensions}
+            for name, (_, location) in self.getNameIndex(owner).items():
+                self.indexCoordinates(spatialIndexes, name, location)
+
+            self.spatialIndexes[owner.id] = spatialIndexes
+            return spatialIndexes[dimension]
+
+    @staticmethod
+    def indexCoordinates(spatialIndexes: dict[str, SpatialGrid], name: str, location: Location) -> None:
+        """Adds a location's coordinates to the spatial index of each dimension they are known in."""
+        for dimension, spatialIndex in spatialIndexes.items():
+            coordinates = getattr(location, dimension)
+            if coordinates is None:
+                spatialIndex.remove(name)
+            else:
+                spatialIndex.insert(name, coordinates)
+
+    def putLocation(self, owner: Namespace, category: str, name: str, location: Location) -> None:
+        """Adds or replaces an owner's location and persists the change."""
+        self.sortedNames.pop(owner.id, None)
+        self.data['users'][owner.id]['locations'][category][name] = location
+        self.getNameIndex(owner)[name] = (category, location)
+        self.updateLocationVersion(owner, name)
+        if owner.id in self.searchIndexes:
+            self.searchIndexes[owner.id].add(name)
+        if owner.id in self.spatialIndexes:
+            self.indexCoordinates(self.spatialIndexes[owner.id], name, location)
+        self.storage.putLocation(owner.id, category, name, location)
+
+    def putLocations(self, owner: Namespace, entries: list[tuple[str, str, Location]]) -> None:
+        """Adds many (category, name, location) entries to an owner's locations and persists them together."""
+        self.sortedNames.pop(owner.id, None)
+        userData = self.data['users'][owner.id]['locations']
+        nameIndex = self.getNameIndex(owner)
+        spatialIndexes = self.spatialIndexes.get(owner.id)
+        searchIndex = self.searchIndexes.get(owner.id)
+        for category, name, location in entries:
+            userData[category][name] = location
+            nameIndex[name] = (category, location)
+            self.updateLocationVersion(owner, name)
+            if searchIndex is not None:
+                searchIndex.add(name)
+            if spatialIndexes is not None:
+                self.indexCoordinates(spatialIndexes, name, location)
+        self.storage.putLocations(owner.id, entries)
+
+    def deleteLocation(self, owner: Namespace, category: str, name: str) -> None:
+        """Removes an owner's location and persists the change."""
+        self.sortedNames.pop(owner.id, None)
+        self.data['users'][owner.id]['locations'][category].pop(name)
+        self.getNameIndex(owner).pop(name)
+        self.locationVersions.get(owner.id, {}).pop(name, None)
+        if owner.id in self.searchIndexes:
+            self.searchIndexes[owner.id].remove(name)
+        for spatialIndex in self.spatialIndexes.get(owner.id, {}).values():
+            spatialIndex.remove(name)
+        self.storage.deleteLocation(owner.id, category, name)
+
+    def renameLocation(self, owner: Namespace, category: str, name: str, newName: str) -> None:
+        """Renames an owner's location and persists the change."""
+        self.sortedNames.pop(owner.id, None)
+        categoryData = self.data['users'][owner.id]['locations'][category]
+        categoryData[newName] = categoryData.pop(name)
+        nameIndex = self.getNameIndex(owner)
+        nameIndex[newName] = nameIndex.pop(name)
+        self.locationVersions.get(owner.id, {}).pop(name, None)
+        self.updateLocationVersion(owner, newName)
+        if owner.id in self.searchIndexes:
+            self.searchIndexes[owner.id].remove(name)
+            self.searchIndexes[owner.id].add(newName)
+        for spatialIndex in self.spatialIndexes.get(owner.id, {}).values():
+            if name in spatialIndex.points:
+                spatialIndex.insert(newName, spatialIndex.points[name])
+                spatialIndex.remove(name)
+        self.storage.renameLocation(owner.id, category, name, newName)
 
     def getData(self) -> dict:
         """Returns the saved location data for all users."""
-        with open(self.dataFilepath, 'r') as f:
-            config = yaml.safe_load(f)
-        return config
-
-    def saveData(self) -> None:
-        """Saves the data to the location data file."""
-        with open(self.dataFilepath, 'w') as f:
-            yaml.dump(self.data, f)
-
-    def downloadFromAWS(self) -> None:
-        """Downloads and saves the location data from AWS."""
-        s3.download_file('minecraft-bot', 'locations.yaml', self.dataFilepath)
-
-    def uploadToAWS(self) -> None:
-        """Uploads the saved location data to AWS."""
-        s3.upload_file(self.dataFilepath, 'minecraft-bot', 'locations.yaml')
+        return self.storage.load()
+
+    async def downloadFromAWS(self) -> None:
+        """Downloads the location data from AWS and loads it in place of the local data.
+
+        The local data is kept instead if AWS still holds what was last uploaded from or downloaded to it, since it is
+        then at least as new, and its changes since are uploaded next.
+        """
+        objectKey = self.storage.objectKey
+        if await self.s3Sync.isUnchangedSinceLastTransferAsync(objectKey):
+            logger.info("Keeping the local location data, since AWS has no newer copy.")
+            return
+
+        downloads = await self.downloadObjects([objectKey])
+        if objectKey in downloads:
+            downloads |= await self.downloadObjects(self.storage.getDependentObjectKeys(downloads[objectKey]))
+        elif self.storage.legacyObjectKey is not None:
+            downloads = await self.downloadObjects([self.storage.legacyObjectKey])
+
+        if downloads:
+            loop = asyncio.get_running_loop()
+            self.replaceData(await loop.run_in_executor(None, self.storage.restoreSnapshot, downloads))
+            await loop.run_in_executor(None, self.s3Sync.saveETags)
+
+    def replaceData(self, data: dict) -> None:
+        """Loads newly read location data in place of the current data, dropping everything derived from it.
+
+        Edits started on the previous data are rejected as conflicting, since it may have changed underneath them.
+        """
+        self.data = data
+        self.nameIndexes.clear()
+        self.spatialIndexes.clear()
+        self.searchIndexes.clear()
+        self.sortedNames.clear()
+        self.locationVersions.clear()
+        self.loadedVersion = next(self.versionCounter)
+
+    def replaceUserData(self, userID: int, userData: dict) -> None:
+        """Loads a user's newly read locations in place of their current ones, dropping the indexes built from them.
+
+        Only edits started on locations that were changed, added or removed are rejected as conflicting.
+        """
+        previous = self.data['users'].get(userID)
+        previousLocations = {
+            name: (category, location)
+            for category, categoryData in (previous or makeEmptyUserData())['locations'].items()
+            for name, location in categoryData.items()
+        }
+        locationVersions = self.locationVersions.setdefault(userID, {})
+        for category, categoryData in userData['locations'].items():
+            for name, location in categoryData.items():
+                if previousLocations.pop(name, None) != (category, location):
+                    locationVersions[name] = next(self.versionCounter)
+        for name in previousLocations:
+            locationVersions.pop(name, None)
+
+        self.data['users'][userID] = userData
+        self.nameIndexes.pop(userID, None)
+        self.spatialIndexes.pop(userID, None)
+        self.searchIndexes.pop(userID, None)
+        self.sortedNames.pop(userID, None)
+
+    async def downloadObjects(self, objectKeys: list[str]) -> dict[str, str]:
+        """Downloads the given objects from AWS and returns the paths of those that exist, keyed by object key."""
+        downloads = {}
+        for objectKey in objectKeys:
+            downloadFilepath = self.storage.getDownloadFilepath(objectKey)
+            if await self.s3Sync.downloadAsync(objectKey, downloadFilepath):
+                downloads[objectKey] = downloadFilepath
+        return downloads
+
+    async def uploadToAWS(self) -> None:
+        """Uploads the saved location data that changed since the last upload to AWS."""
+        snapshotFiles = await self.storage.exportSnapshot()
+        await self.s3Sync.uploadAllAsync(snapshotFiles)
 
 
 def setup(bot):
@@ -0,0 +1,135 @@
+import asyncio
+import os
+import time
+from logging import getLogger
+from typing import Optional
+
+import discord
+from discord.ext import commands
+
+from embeds import iconUrl, makeEmbed
+from metrics import Histogram, metrics
+
+logger = getLogger("main.stats")
+
+
+class Stats(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.lagSampler: Optional[asyncio.Task] = None
+        self.metricsServer: Optional[asyncio.AbstractServer] = None
+
+    def cog_unload(self):
+        if self.lagSampler is not None:
+            self.lagSampler.cancel()
+        if self.metricsServer is not None:
+            self.metricsServer.close()
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        if self.lagSampler is not None:
+            return
+
+        self.lagSampler = asyncio.create_task(metrics.sampleLoopLag())
+
+        port = os.environ.get('metrics_port')
+        if port:
+            self.metricsServer = await metrics.serve(os.environ.get('metrics_host', '127.0.0.1'), int(port))
+
+    def bot_check_once(self, ctx) -> bool:
+        """Timestamps every command as the bot starts invoking it, before its checks, hooks and callback run.
+
+        Listeners such as on_command run as separate tasks, so a start time taken there would miss the command's work
+        up to its first await.
+        """
+        ctx.startTime = time.perf_counter()
+        return True
+
+    @staticmethod
+    def observeDuration(ctx) -> None:
+        """Records how long a command took, including any time spent waiting on the user's replies."""
+        metrics.observe('command_duration_seconds', time.perf_counter() - ctx.startTime,
+                        command=ctx.command.qualified_name)
+
+    @commands.Cog.listener()
+    async def on_command_completion(self, ctx):
+        self.observeDuration(ctx)
+
+    @commands.Cog.listener()
+    async def on_command_error(self, ctx, error: commands.CommandError):
+        """Records failed commands, and logs the error unless the command or its cog handles it.
+
+        A listener replaces the bot's default handler, which would otherwise print the error.
+        """
+        if ctx.command is not None and hasattr(ctx, 'startTime'):
+            self.observeDuration(ctx)
+            metrics.increment('command_errors_total', command=ctx.command.qualified_name)
+
+        if ctx.command is not None and (ctx.command.has_error_handler() or ctx.cog and ctx.cog.has_error_handler()):
+            return
+        logger.error(f"Ignoring exception in command {ctx.command}:",
+                     exc_info=(type(error), error, error.__traceback__))
+
+    @commands.command()
+    @commands.is_owner()
+    async def stats(self, ctx):
+        await ctx.send(embed=self.makeStatsEmbed())
+
+    @staticmethod
+    def formatHistogram(histogram: Histogram) -> str:
+        percentile = histogram.getQuantile(0.95) * 1000
+        return f'{histogram.count} × · avg {histogram.mean * 1000:.1f} ms · p95 ≤ {percentile:g} ms'
+
+    @staticmethod
+    def formatBytes(byteCount: float) -> str:
+        for unit in ('B', 'KiB', 'MiB'):
+            if byteCount < 1024:
+                return f'{byteCount:.0f} {unit}'
+            byteCount /= 1024
+        return f'{byteCount:.1f} GiB'
+
+    def formatSeries(self, name: str, labelName: str) -> str:
+        """Returns a line summarizing each labelled series of a histogram, or 'None' if nothing has been recorded."""
+        series = sorted(
+            ((labels.get(labelName, ''), histogram) for labels, histogram in metrics.getHistogramSeries(name)),
+            key=lambda item: item[0]
+        )
+        if not series:
+            return 'None'
+        return '\n'.join(f'`{label}` {self.formatHistogram(histogram)}' for label, histogram in series)
+
+    def makeStatsEmbed(self) -> discord.Embed:
+        """Generates an embed summarizing command durations, event loop lag and location data transfers."""
+        embed = makeEmbed(iconUrl, 'Bot Statistics')
+        failedCommands = metrics.getCounterTotal('command_errors_total')
+        embed.add_field(name='Commands',
+                        value=f"{self.formatSeries('command_duration_seconds', 'command')}\n"
+                              f"{failedCommands:.0f} failed",
+                        inline=False)
+
+        loopLag = metrics.getHistogram('event_loop_lag_seconds')
+        embed.add_field(name='Event Loop Lag', value=self.formatHistogram(loopLag) if loopLag else 'None', inline=False)
+
+        writtenBytes = metrics.getCounterTotal('location_data_written_bytes_total')
+        mutations = metrics.getCounter('location_mutations_total')
+        flushes = metrics.getCounter('location_flushes_total')
+        embed.add_field(name='Location Data Writes',
+                        value=f"{self.formatSeries('location_data_write_seconds', 'store')}\n"
+                              f"{self.formatBytes(writtenBytes)} written, "
+                              f"{mutations:.0f} changes coalesced into {flushes:.0f} writes",
+                        inline=False)
+
+        uploadedBytes = metrics.getCounter('s3_transferred_bytes_total', direction='upload')
+        downloadedBytes = metrics.getCounter('s3_transferred_bytes_total', direction='download')
+        skippedUploads = metrics.getCounter('s3_uploads_skipped_total')
+        embed.add_field(name='AWS Transfers',
+                        value=f"{self.formatSeries('s3_transfer_seconds', 'direction')}\n"
+                              f"{self.formatBytes(uploadedBytes)} uploaded, {self.formatBytes(downloadedBytes)} "
+                              f"downloaded, {skippedUploads:.0f} unchanged uploads skipped",
+                        inline=False)
+
+        return embed
+
+
+def setup(bot):
+    bot.add_cog(Stats(bot))
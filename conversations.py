@@ -0,0 +1,122 @@
+import asyncio
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional
+
+import discord
+
+SessionKey = tuple[int, int]
+
+
+class ConversationCancelled(Exception):
+    """Raised when the user cancels a conversation, or starts another one in the same channel."""
+
+
+class ConversationTimedOut(Exception):
+    """Raised when the user does not reply to a conversation in time."""
+
+
+class Step:
+    """A question asked during a conversation.
+
+    `parse` turns a reply into the step's value, raising ValueError with a message for the user if the reply is invalid.
+    """
+
+    def __init__(self, prompt: discord.Embed, parse: Callable[..., Any]):
+        self.prompt = prompt
+        self.parse = parse
+
+
+def makeChoiceParser(options: dict[str, Any]) -> Callable[[str], Any]:
+    """Returns a parser mapping each option typed by the user, such as `1`, to its value."""
+    def parse(content: str) -> Any:
+        try:
+            return options[content.strip()]
+        except KeyError:
+            raise ValueError
+
+    return parse
+
+
+class Session:
+    """An open conversation with one user in one channel, fed with their messages by `Conversations.route`."""
+
+    def __init__(self, startMessage: discord.Message, makeErrorEmbed: Callable[[str], discord.Embed],
+                 timeout: float):
+        self.channel = startMessage.channel
+        self.startMessageID = startMessage.id
+        self.makeErrorEmbed = makeErrorEmbed
+        self.timeout = timeout
+        self.messages: asyncio.Queue[Optional[discord.Message]] = asyncio.Queue()
+
+    async def reply(self) -> str:
+        """Waits for the user's next message and returns its content."""
+        try:
+            message = await asyncio.wait_for(self.messages.get(), self.timeout)
+        except asyncio.TimeoutError:
+            raise ConversationTimedOut
+
+        if message is None or message.content.lower() == 'cancel':
+            raise ConversationCancelled
+        return message.content
+
+    async def ask(self, step: Step, *args, answer: Optional[str] = None) -> Any:
+        """Returns the value of the user's answer to the step, asking again until the answer is valid.
+
+        An answer given up front, such as in the command itself, is checked first instead of prompting for one.
+        """
+        if answer is None:
+            await self.channel.send(embed=step.prompt)
+            answer = await self.reply()
+
+        while True:
+            try:
+                return step.parse(answer, *args)
+            except ValueError as error:
+                await self.channel.send(embed=self.makeErrorEmbed(str(error)))
+            answer = await self.reply()
+
+
+class Conversations:
+    """Routes incoming messages to open conversations.
+
+    Sessions are keyed by channel and author, so each message costs a single dict lookup however many conversations
+    are open, instead of being checked against a listener per pending reply.
+    """
+
+    def __init__(self, timeout: float = 30):
+        self.timeout = timeout
+        self.sessions: dict[SessionKey, Session] = {}
+
+    @staticmethod
+    def getKey(message: discord.Message) -> SessionKey:
+        return message.channel.id, message.author.id
+
+    def route(self, message: discord.Message) -> bool:
+        """Hands the message to the author's conversation in its channel, if any. Returns whether it was handed on."""
+        session = self.sessions.get(self.getKey(message))
+        if session is None or message.id == session.startMessageID:
+            return False
+
+        session.messages.put_nowait(message)
+        return True
+
+    @contextmanager
+    def open(self, startMessage: discord.Message,
+             makeErrorEmbed: Callable[[str], discord.Embed]) -> Iterator[Session]:
+        """Opens a conversation with the author of the message, cancelling any they already have in the channel."""
+        key = self.getKey(startMessage)
+        previous = self.sessions.get(key)
+        if previous is not None:
+            previous.messages.put_nowait(None)
+
+        session = Session(startMessage, makeErrorEmbed, self.timeout)
+        self.sessions[key] = session
+        try:
+            yield session
+        finally:
+            if self.sessions.get(key) is session:
+                del self.sessions[key]
+
+    def cancelAll(self) -> None:
+        for session in self.sessions.values():
+            session.messages.put_nowait(None)
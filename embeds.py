@@ -0,0 +1,51 @@
+from typing import Hashable, Optional
+
+import discord
+
+embedColor = 0x52A435
+iconUrl = 'https://cdn.pixabay.com/photo/2013/07/12/19/25/minecraft-154749__480.png'
+promptFooter = 'Please enter a response within 30 seconds. Type "cancel" to cancel at any time.'
+
+
+def makeEmbed(iconUrl: str, author: str, description: Optional[str] = None,
+              footer: Optional[str] = None) -> discord.Embed:
+    """Generates an embed in the bot's colour with the given author, description and footer."""
+    embed = discord.Embed(color=embedColor)
+    if description is not None:
+        embed.description = description
+    embed.set_author(name=author, icon_url=iconUrl)
+    if footer is not None:
+        embed.set_footer(text=footer)
+
+    return embed
+
+
+class EmbedTemplates:
+    """A registry of embeds built once, when a cog loads.
+
+    Static responses are sent as the shared embed itself, which is never modified after it is registered. Responses
+    with dynamic content are built from the template's author and footer, which is cheaper than copying the embed.
+    """
+
+    def __init__(self, iconUrl: str):
+        self.iconUrl = iconUrl
+        self.templates: dict[Hashable, discord.Embed] = {}
+        self.arguments: dict[Hashable, tuple[str, Optional[str], Optional[str]]] = {}
+
+    def __getitem__(self, key: Hashable) -> discord.Embed:
+        return self.templates[key]
+
+    def register(self, key: Hashable, author: str, description: Optional[str] = None,
+                 footer: Optional[str] = None) -> discord.Embed:
+        embed = makeEmbed(self.iconUrl, author, description, footer)
+        self.templates[key] = embed
+        self.arguments[key] = (author, description, footer)
+        return embed
+
+    def fill(self, key: Hashable, description: Optional[str] = None) -> discord.Embed:
+        """Returns a new embed like the template, with the description replaced if one is given.
+
+        Fields added to the template after it was registered are not included.
+        """
+        author, templateDescription, footer = self.arguments[key]
+        return makeEmbed(self.iconUrl, author, templateDescription if description is None else description, footer)
@@ -0,0 +1,68 @@
+import csv
+import io
+import json
+from typing import Iterator
+
+from importer import fieldNames
+from location import Location
+from yamlio import dumpYaml
+
+exportFormats = ('csv', 'json', 'yaml')
+
+
+def iterRows(userLocations: dict, categoryLocationTypes: dict[str, str]) -> Iterator[dict]:
+    """Yields one row per location in the same layout the importer reads.
+
+    Each location is exported with the coordinates it was entered in: the overworld if known, otherwise the nether,
+    otherwise the end.
+    """
+    for category, categoryData in userLocations.items():
+        locationType = categoryLocationTypes[category]
+        for name, location in categoryData.items():
+            for dimension in Location.dimensions:
+                coordinates = getattr(location, dimension)
+                if coordinates is not None:
+                    x, z, y = coordinates
+                    yield {'name': name, 'type': locationType, 'dimension': dimension, 'x': x, 'z': z, 'y': y}
+                    break
+
+
+def writeCsv(rows: Iterator[dict], stream: io.TextIOBase) -> None:
+    writer = csv.DictWriter(stream, fieldnames=fieldNames)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+
+
+def writeJson(rows: Iterator[dict], stream: io.TextIOBase) -> None:
+    """Writes the rows as a JSON array, one element per line, without building the array in memory."""
+    stream.write('[')
+    separator = '\n'
+    for row in rows:
+        stream.write(separator + json.dumps(row))
+        separator = ',\n'
+    stream.write('\n]\n')
+
+
+def writeYaml(rows: Iterator[dict], stream: io.TextIOBase) -> None:
+    """Writes the rows as a YAML list with a single dumper, since setting one up costs far more than a row."""
+    dumpYaml(list(rows), stream)
+
+
+writers = {
+    'csv': writeCsv,
+    'json': writeJson,
+    'yaml': writeYaml,
+}
+
+
+def exportLocations(userLocations: dict, categoryLocationTypes: dict[str, str], exportFormat: str) -> io.BytesIO:
+    """Streams a user's locations into an in-memory file of the given format, ready to be attached to a message."""
+    buffer = io.BytesIO()
+    stream = io.TextIOWrapper(buffer, encoding='utf-8', newline='')
+    writers[exportFormat](iterRows(userLocations, categoryLocationTypes), stream)
+    stream.flush()
+    stream.detach()
+
+    buffer.seek(0)
+    return buffer
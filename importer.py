@@ -0,0 +1,111 @@
+import csv
+import io
+import json
+from pathlib import PurePath
+
+import yaml
+
+from location import Coordinates, Location, toNetherCoords, toOverworldCoords
+from yamlio import loadYaml
+
+fieldNames = ('name', 'type', 'dimension', 'x', 'z', 'y')
+
+
+def readRows(filename: str, content: bytes) -> list[dict]:
+    """Parses an uploaded CSV, JSON or YAML file into a list of location rows."""
+    try:
+        text = content.decode('utf-8-sig')
+        match PurePath(filename).suffix.lower():
+            case '.csv':
+                rows = list(csv.DictReader(io.StringIO(text)))
+            case '.json':
+                rows = json.loads(text)
+            case '.yaml' | '.yml':
+                rows = loadYaml(io.StringIO(text))
+            case _:
+                raise ValueError('The file must be a `.csv`, `.json` or `.yaml` file.')
+    except (csv.Error, yaml.YAMLError, UnicodeDecodeError, json.JSONDecodeError):
+        raise ValueError('The file could not be read.')
+
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        raise ValueError('The file must contain a list of locations.')
+    return rows
+
+
+def parseCoordinate(value) -> int:
+    """Returns a coordinate from a row, which may hold it as a number or as text, such as `-25` or `-25.0`.
+
+    Raises ValueError for anything other than a whole number, including booleans, which YAML reads from `yes` or `on`.
+    """
+    # Exact type checks, since booleans are ints.
+    if type(value) is str:
+        try:
+            return int(value)
+        except ValueError:
+            value = float(value)
+    if type(value) is int:
+        return value
+    if type(value) is float and value.is_integer():
+        return int(value)
+    raise ValueError
+
+
+def parseRow(row: dict, locationTypeCategories: dict[str, str], takenNames: set[str]) -> Coordinates:
+    """Returns the coordinates of a valid location row, or raises ValueError with why the row is invalid."""
+    missingFields = [field for field in fieldNames if row.get(field) in (None, '')]
+    if missingFields:
+        raise ValueError(f"missing {', '.join(missingFields)}")
+
+    if str(row['type']).lower() not in locationTypeCategories:
+        raise ValueError(f"invalid type `{row['type']}`")
+    if str(row['dimension']).lower() not in Location.dimensions:
+        raise ValueError(f"invalid dimension `{row['dimension']}`")
+
+    try:
+        coordinates = parseCoordinate(row['x']), parseCoordinate(row['z']), parseCoordinate(row['y'])
+    except ValueError:
+        raise ValueError('coordinates must be whole numbers')
+
+    if str(row['name']) in takenNames:
+        raise ValueError(f"the name `{row['name']}` is already used or reserved")
+    return coordinates
+
+
+def buildLocations(rows: list[dict], locationTypeCategories: dict[str, str],
+                   takenNames: set[str]) -> tuple[list[tuple[str, str, Location]], list[str]]:
+    """Validates location rows and converts them into (category, name, location) entries.
+
+    Rows are converted between the overworld and the nether in one batch per dimension. Returns the entries along
+    with a description of every invalid row; entries are only meaningful when there are no errors.
+    """
+    errors = []
+    takenNames = set(takenNames)
+    rowsByDimension = {dimension: [] for dimension in Location.dimensions}
+    for rowNumber, row in enumerate(rows, start=1):
+        try:
+            coordinates = parseRow(row, locationTypeCategories, takenNames)
+        except ValueError as e:
+            errors.append(f"Row {rowNumber}: {e}")
+        else:
+            takenNames.add(str(row['name']))
+            rowsByDimension[str(row['dimension']).lower()].append((row, coordinates))
+
+    if errors:
+        return [], errors
+
+    overworldRows = rowsByDimension['overworld']
+    netherRows = rowsByDimension['nether']
+    convertedOverworld = toNetherCoords([coordinates for _, coordinates in overworldRows])
+    convertedNether = toOverworldCoords([coordinates for _, coordinates in netherRows])
+
+    entries = []
+    for (row, coordinates), netherCoords in zip(overworldRows, convertedOverworld):
+        entries.append((row, Location(coordinates, netherCoords, None)))
+    for (row, coordinates), overworldCoords in zip(netherRows, convertedNether):
+        entries.append((row, Location(overworldCoords, coordinates, None)))
+    for row, coordinates in rowsByDimension['end']:
+        entries.append((row, Location(None, None, coordinates)))
+
+    return [
+        (locationTypeCategories[str(row['type']).lower()], str(row['name']), location) for row, location in entries
+    ], errors
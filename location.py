@@ -0,0 +1,123 @@
+import math
+import re
+from typing import Optional
+
+Coordinates = tuple[int, int, int]
+
+number = r"-?\d{1,9}(?:\.\d{1,9})?"
+separator = r"\s*[,/]\s*|\s+"
+userCoordsPattern = re.compile(
+    rf"""
+    ^\s*
+    (?:
+        (?P<teleport>/?execute\s+in\s+\S+\s+run\s+tp\s+@s\s+)    # F3 + C
+        | (?P<debug>(?:xyz|block|looking\s+at)\s*:\s*)           # F3 debug screen lines
+    )?
+    (?P<open>\()?\s*
+    (?P<first>{number})(?:{separator})(?P<second>{number})(?:{separator})(?P<third>{number})
+    \s*(?(open)\))
+    (?(teleport)(?:\s+{number}\s+{number})?)                        # F3 + C adds the player's rotation
+    \s*$
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
+
+
+def parseCoords(text: str) -> Optional[Coordinates]:
+    """Parses coordinates stored in the `(x, z, y)` string format, where `None` means they are absent."""
+    if text == 'None':
+        return None
+
+    x, z, y = (int(coord) for coord in text.strip('()').split(','))
+    return x, z, y
+
+
+def parseUserCoords(text: str) -> Optional[Coordinates]:
+    """Parses coordinates typed or pasted by a user in a single pass into the stored `(x, z, y)` order.
+
+    Accepts typed `(x, z, y)`, `x, z, y` and `x z y`, as well as lines copied from the F3 debug screen, such as
+    `XYZ: 1.5 / 64 / -3.2`, and the command copied with F3 + C, which Minecraft writes in x, y, z order. Decimal
+    coordinates are rounded down to the block they are in. Returns None if the text is not valid coordinates.
+    """
+    match = userCoordsPattern.match(text)
+    if match is None:
+        return None
+
+    first, second, third = match.group('first', 'second', 'third')
+    if '.' in first or '.' in second or '.' in third:
+        first, second, third = math.floor(float(first)), math.floor(float(second)), math.floor(float(third))
+    else:
+        first, second, third = int(first), int(second), int(third)
+    if match.group('teleport') or match.group('debug'):
+        return first, third, second
+    return first, second, third
+
+
+def toNetherCoords(overworldCoords: list[Coordinates]) -> list[Coordinates]:
+    """Converts a batch of overworld coordinates to nether coordinates."""
+    return [(round(x / 8), round(z / 8), round(y / 8)) for x, z, y in overworldCoords]
+
+
+def toOverworldCoords(netherCoords: list[Coordinates]) -> list[Coordinates]:
+    """Converts a batch of nether coordinates to overworld coordinates."""
+    return [(x * 8, z * 8, y * 8) for x, z, y in netherCoords]
+
+
+class Location:
+    """A saved location's integer coordinates in each dimension, any of which may be absent (None).
+
+    Locations are immutable, so they can be shared between the in-memory data and snapshots of it without copying.
+    """
+
+    __slots__ = ('overworld', 'nether', 'end')
+
+    dimensions = ('overworld', 'nether', 'end')
+
+    def __init__(self, overworld: Optional[Coordinates] = None, nether: Optional[Coordinates] = None,
+                 end: Optional[Coordinates] = None):
+        object.__setattr__(self, 'overworld', overworld)
+        object.__setattr__(self, 'nether', nether)
+        object.__setattr__(self, 'end', end)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Locations are immutable.")
+
+    def __copy__(self) -> 'Location':
+        return self
+
+    def __deepcopy__(self, memo: dict) -> 'Location':
+        return self
+
+    def __reduce__(self):
+        return Location, (self.overworld, self.nether, self.end)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Location):
+            return NotImplemented
+        return (self.overworld, self.nether, self.end) == (other.overworld, other.nether, other.end)
+
+    def __hash__(self) -> int:
+        return hash((self.overworld, self.nether, self.end))
+
+    def __repr__(self) -> str:
+        return f"Location(overworld={self.overworld}, nether={self.nether}, end={self.end})"
+
+    @classmethod
+    def inDimension(cls, dimension: str, coordinates: Coordinates) -> 'Location':
+        """Creates a location from coordinates entered in a dimension, filling in the overworld and nether pair."""
+        match dimension:
+            case 'overworld':
+                return cls(coordinates, toNetherCoords([coordinates])[0], None)
+            case 'nether':
+                return cls(toOverworldCoords([coordinates])[0], coordinates, None)
+            case _:
+                return cls(None, None, coordinates)
+
+    @classmethod
+    def fromRecord(cls, record: dict) -> 'Location':
+        """Creates a location from its stored form, a dict of `(x, z, y)` strings per dimension."""
+        return cls(parseCoords(record['overworld']), parseCoords(record['nether']), parseCoords(record['end']))
+
+    def toRecord(self) -> dict:
+        """Returns the location in its stored form, a dict of `(x, z, y)` strings per dimension."""
+        return {'overworld': str(self.overworld), 'nether': str(self.nether), 'end': str(self.end)}
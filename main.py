@@ -2,12 +2,18 @@ import logging
 import logging.config
 import os
 from pathlib import Path
+from typing import Optional
 
 import discord
-import yaml
 from discord.ext import commands
 from dotenv import load_dotenv
 
+from yamlio import getYamlImplementation, loadYaml
+
+logger = logging.getLogger("main")
+
+defaultIntents = ('guilds', 'guild_messages', 'dm_messages', 'guild_reactions', 'dm_reactions', 'message_content')
+
 
 def loadEnv() -> None:
     """Reads and loads the environment variables specified in the project directory."""
@@ -18,7 +24,7 @@ def getLoggingConfig() -> dict:
     """Returns the logging configurations from the project directory."""
     configPath = str(Path.cwd() / 'configurations' / 'logging.yaml')
     with open(configPath, "r") as f:
-        loggingConfig = yaml.safe_load(f)
+        loggingConfig = loadYaml(f)
     return loggingConfig
 
 
@@ -31,21 +37,72 @@ def createLogger() -> logging.Logger:
     return projectLogger
 
 
+def parseCommaSeparated(text: str) -> list[str]:
+    return [name.strip() for name in text.split(',') if name.strip()]
+
+
 def getIntents() -> discord.Intents:
-    """Returns all user-specified intents."""
-    intents = discord.Intents.all()
+    """Returns the intents named in the `bot_intents` variable, or only those the cogs need if it is unset.
+
+    `all` subscribes to every intent. Default intents missing from the installed discord.py version are skipped.
+    """
+    names = os.environ.get('bot_intents')
+    if names is None:
+        return discord.Intents(**{name: True for name in defaultIntents if name in discord.Intents.VALID_FLAGS})
+    if names.strip().lower() == 'all':
+        return discord.Intents.all()
+
+    intents = discord.Intents.none()
+    for name in parseCommaSeparated(names):
+        if name not in discord.Intents.VALID_FLAGS:
+            raise ValueError(f"Unknown intent {name!r} in bot_intents.")
+        setattr(intents, name, True)
 
     return intents
 
 
+def getMemberCacheFlags(intents: discord.Intents) -> discord.MemberCacheFlags:
+    """Returns the member cache flags named in the `member_cache` variable, caching no members if it is unset.
+
+    `auto` caches as much as the intents allow, which was the behaviour before the flags were configurable.
+    """
+    names = os.environ.get('member_cache', '')
+    if names.strip().lower() == 'auto':
+        return discord.MemberCacheFlags.from_intents(intents)
+
+    flags = discord.MemberCacheFlags.none()
+    for name in parseCommaSeparated(names):
+        if name not in discord.MemberCacheFlags.VALID_FLAGS:
+            raise ValueError(f"Unknown member cache flag {name!r} in member_cache.")
+        setattr(flags, name, True)
+
+    return flags
+
+
 def getBotToken() -> str:
     """Returns the main bot token."""
     return os.environ["bot_token"]
 
 
+def getShardOptions() -> dict:
+    """Returns the shards this process runs, as set by the cluster launcher, or nothing to run a single connection."""
+    shardCount = os.environ.get('shard_count')
+    if shardCount is None:
+        return {}
+
+    return {
+        'shard_count': int(shardCount),
+        'shard_ids': [int(shardID) for shardID in parseCommaSeparated(os.environ['shard_ids'])],
+    }
+
+
 def createBot() -> commands.Bot:
-    """Constructs and returns the main discord bot."""
-    return commands.Bot(command_prefix="*", intents=getIntents())
+    """Constructs and returns the main discord bot, sharded if the cluster launcher started it."""
+    intents = getIntents()
+    shardOptions = getShardOptions()
+    botClass = commands.AutoShardedBot if shardOptions else commands.Bot
+    return botClass(command_prefix="*", intents=intents, member_cache_flags=getMemberCacheFlags(intents),
+                    chunk_guilds_at_startup=intents.members, **shardOptions)
 
 
 def initializeBot() -> commands.Bot:
@@ -78,9 +135,10 @@ def getModulesInDotFormat() -> list[str]:
     return formattedModules
 
 
-def loadModules(discordBot: commands.Bot) -> None:
-    """Loads specified guild modules from the cog directory of the project onto the bot for testing."""
-    cogFiles = getModulesInDotFormat()
+def loadModules(discordBot: commands.Bot, cogFiles: Optional[list[str]] = None) -> None:
+    """Loads the given cog modules onto the bot, or every module in the project's cog directory if none are given."""
+    if cogFiles is None:
+        cogFiles = getModulesInDotFormat()
 
     logger.info(f"Loading cogs: {cogFiles}")
     for filename in cogFiles:
@@ -91,6 +149,7 @@ def loadModules(discordBot: commands.Bot) -> None:
 if __name__ == "__main__":
     loadEnv()
     logger = createLogger()
+    logger.info(f"Using the {getYamlImplementation()} YAML implementation.")
 
     token = getBotToken()
     bot = initializeBot()
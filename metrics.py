@@ -0,0 +1,171 @@
+import asyncio
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from logging import getLogger
+from typing import Iterator, Optional
+
+logger = getLogger("main.metrics")
+
+Labels = tuple[tuple[str, str], ...]
+
+
+class Histogram:
+    """Counts observations into cumulative buckets, the way Prometheus histograms do."""
+
+    defaultBuckets = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+    def __init__(self, buckets: tuple[float, ...] = defaultBuckets):
+        self.buckets = buckets
+        self.bucketCounts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.bucketCounts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def getQuantile(self, quantile: float) -> float:
+        """Returns the upper bound of the bucket holding the given quantile of the observations."""
+        rank = quantile * self.count
+        seen = 0
+        for bound, bucketCount in zip(self.buckets, self.bucketCounts):
+            seen += bucketCount
+            if seen >= rank:
+                return bound
+        return math.inf
+
+
+class Metrics:
+    """A registry of counters and histograms, rendered in the Prometheus text format.
+
+    Updates take a lock, so they can be recorded from worker threads as well as the event loop.
+    """
+
+    def __init__(self):
+        self.counters: dict[str, dict[Labels, float]] = {}
+        self.histograms: dict[str, dict[Labels, Histogram]] = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def makeLabels(labels: dict[str, str]) -> Labels:
+        return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def increment(self, name: str, amount: float = 1, **labels) -> None:
+        key = self.makeLabels(labels)
+        with self.lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = self.makeLabels(labels)
+        with self.lock:
+            series = self.histograms.setdefault(name, {})
+            try:
+                histogram = series[key]
+            except KeyError:
+                histogram = series[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def time(self, name: str, **labels) -> Iterator[None]:
+        """Observes how many seconds the block takes, whether or not it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def getCounter(self, name: str, **labels) -> float:
+        return self.counters.get(name, {}).get(self.makeLabels(labels), 0)
+
+    def getHistogram(self, name: str, **labels) -> Optional[Histogram]:
+        return self.histograms.get(name, {}).get(self.makeLabels(labels))
+
+    def getHistogramSeries(self, name: str) -> list[tuple[dict[str, str], Histogram]]:
+        """Returns the labels and histogram of every series recorded under the name."""
+        with self.lock:
+            return [(dict(labels), histogram) for labels, histogram in self.histograms.get(name, {}).items()]
+
+    def getCounterTotal(self, name: str) -> float:
+        """Returns the sum of every series recorded under the name."""
+        with self.lock:
+            return sum(self.counters.get(name, {}).values())
+
+    @staticmethod
+    def formatSeries(name: str, labels: Labels, value: float) -> str:
+        if labels:
+            labelText = ','.join(f'{key}="{labelValue}"' for key, labelValue in labels)
+            return f'{name}{{{labelText}}} {value}'
+        return f'{name} {value}'
+
+    def render(self) -> str:
+        """Returns every metric in the Prometheus text exposition format."""
+        lines = []
+        with self.lock:
+            for name, series in sorted(self.counters.items()):
+                lines.append(f'# TYPE {name} counter')
+                lines.extend(self.formatSeries(name, labels, value) for labels, value in sorted(series.items()))
+
+            for name, series in sorted(self.histograms.items()):
+                lines.append(f'# TYPE {name} histogram')
+                for labels, histogram in sorted(series.items()):
+                    cumulativeCount = 0
+                    for bound, bucketCount in zip(histogram.buckets + ('+Inf',), histogram.bucketCounts):
+                        cumulativeCount += bucketCount
+                        lines.append(self.formatSeries(f'{name}_bucket', labels + (('le', str(bound)),),
+                                                       cumulativeCount))
+                    lines.append(self.formatSeries(f'{name}_sum', labels, histogram.sum))
+                    lines.append(self.formatSeries(f'{name}_count', labels, histogram.count))
+
+        return '\n'.join(lines) + '\n'
+
+    async def sampleLoopLag(self, interval: float = 1.0) -> None:
+        """Records how late the event loop wakes up from a sleep, once per interval, until cancelled."""
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(interval)
+            self.observe('event_loop_lag_seconds', max(loop.time() - start - interval, 0.0))
+
+    @staticmethod
+    async def readRequestLine(reader: asyncio.StreamReader) -> bytes:
+        """Reads an HTTP request's first line, skipping its headers."""
+        requestLine = await reader.readline()
+        while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+            pass
+        return requestLine
+
+    async def handleRequest(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Answers a scrape of `/metrics` over plain HTTP, and anything else with a 404."""
+        try:
+            requestLine = await asyncio.wait_for(self.readRequestLine(reader), timeout=5)
+            parts = requestLine.decode('latin-1').split()
+            if len(parts) >= 2 and parts[0] == 'GET' and parts[1].split('?')[0] == '/metrics':
+                status, body = '200 OK', self.render().encode()
+            else:
+                status, body = '404 Not Found', b'Not Found\n'
+
+            writer.write(f'HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4\r\n'
+                         f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n'.encode() + body)
+            await writer.drain()
+        except (ConnectionError, asyncio.TimeoutError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str, port: int) -> asyncio.AbstractServer:
+        """Starts serving the metrics over HTTP for Prometheus to scrape."""
+        server = await asyncio.start_server(self.handleRequest, host, port)
+        logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+        return server
+
+
+metrics = Metrics()
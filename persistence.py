@@ -0,0 +1,312 @@
+import asyncio
+import copy
+import json
+import os
+import pickle
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from logging import getLogger
+from pathlib import Path
+from typing import IO, Callable, Iterator, Optional, TextIO
+
+from metrics import metrics
+from yamlio import dumpYaml, loadYaml
+
+logger = getLogger("main.persistence")
+
+syncFile = getattr(os, 'fdatasync', os.fsync)
+
+
+@contextmanager
+def atomicallyReplace(filepath: str, mode: str = 'w') -> Iterator[IO]:
+    """Yields a temporary file that replaces the given file once it has been written and synced to disk."""
+    tempFilepath = f"{filepath}.tmp"
+    with open(tempFilepath, mode) as f:
+        yield f
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tempFilepath, filepath)
+
+
+class AppendOnlyJournal:
+    """Durably appends JSON records, one per line, to a journal file."""
+
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+        self.file: Optional[TextIO] = None
+
+    def read(self) -> list[dict]:
+        """Returns every complete record in the journal, skipping a torn final line left by a crash."""
+        if not os.path.exists(self.filepath):
+            return []
+
+        records = []
+        with open(self.filepath, 'r') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping unreadable journal record in {self.filepath}.")
+        return records
+
+    def append(self, line: str) -> None:
+        """Appends an already serialized record and syncs it to disk."""
+        if self.file is None:
+            self.file = open(self.filepath, 'a')
+        self.file.write(line + '\n')
+        self.file.flush()
+        syncFile(self.file.fileno())
+
+    def truncate(self) -> None:
+        """Discards every record, e.g. once they have all been compacted into a snapshot."""
+        self.close()
+        with open(self.filepath, 'w') as f:
+            syncFile(f.fileno())
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class AsyncYamlStore:
+    """Reads and writes a YAML data file on a dedicated worker thread so the event loop is never blocked.
+
+    If a journal is given, records can be appended to it between snapshots; it is truncated each time a snapshot is
+    written, since the snapshot then contains all of its changes.
+
+    If a binary filepath is given, every snapshot is also written there as a pickle, which is much faster to load than
+    YAML. It is only loaded while it is at least as new as the YAML file, so the YAML file stays the source of truth
+    whenever it is edited or replaced by hand.
+
+    `serialize` converts the data into plain YAML-compatible values on the worker thread before it is written, and
+    `deserialize` converts it back after it is loaded from either format. `snapshot` copies the data on the loop before
+    it is handed to the worker thread, deeply unless a cheaper copy that is safe for the data is given.
+    """
+
+    def __init__(self, filepath: str, journal: Optional[AppendOnlyJournal] = None,
+                 binaryFilepath: Optional[str] = None, serialize: Optional[Callable[[dict], dict]] = None,
+                 deserialize: Optional[Callable[[dict], dict]] = None,
+                 snapshot: Optional[Callable[[dict], dict]] = None):
+        self.filepath = filepath
+        self.journal = journal
+        self.binaryFilepath = binaryFilepath
+        self.serialize = serialize or keepUnchanged
+        self.deserialize = deserialize or keepUnchanged
+        self.snapshot = snapshot or copy.deepcopy
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='persistence')
+
+    def load(self) -> dict:
+        """Returns the parsed contents of the data file, preferring an up-to-date binary snapshot."""
+        if self.isBinarySnapshotCurrent():
+            with open(self.binaryFilepath, 'rb') as f:
+                return self.deserialize(pickle.load(f))
+
+        with open(self.filepath, 'r') as f:
+            data = loadYaml(f)
+        return self.deserialize(data)
+
+    def isBinarySnapshotCurrent(self) -> bool:
+        """Determines if the binary snapshot exists and is at least as new as the YAML file."""
+        if self.binaryFilepath is None or not os.path.exists(self.binaryFilepath):
+            return False
+        return os.path.getmtime(self.binaryFilepath) >= os.path.getmtime(self.filepath)
+
+    def dump(self, data: dict) -> None:
+        """Atomically replaces the data file (and binary snapshot) with the serialized data."""
+        with metrics.time('location_data_write_seconds', store='yaml'):
+            with atomicallyReplace(self.filepath) as f:
+                dumpYaml(self.serialize(data), f)
+                writtenBytes = f.tell()
+
+            if self.binaryFilepath is not None:
+                with atomicallyReplace(self.binaryFilepath, 'wb') as f:
+                    pickle.dump(data, f, protocol=5)
+                    writtenBytes += f.tell()
+
+            if self.journal is not None:
+                self.journal.truncate()
+
+        metrics.increment('location_data_written_bytes_total', writtenBytes, store='yaml')
+
+    def appendToJournal(self, record: dict) -> None:
+        """Serializes a record on the loop and appends it to the journal on the worker thread.
+
+        Appends and snapshot writes share the worker, so a snapshot only truncates records that were queued before it.
+        """
+        future = self.executor.submit(self.journal.append, json.dumps(record))
+        future.add_done_callback(logFailedWrite)
+
+    async def loadAsync(self) -> dict:
+        """Parses the data file on the worker thread."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.load)
+
+    async def dumpAsync(self, data: dict) -> None:
+        """Snapshots the data on the loop, then serializes and writes it on the worker thread.
+
+        The single worker keeps writes ordered, so the file always ends up holding the latest snapshot.
+        """
+        snapshot = self.snapshot(data)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, self.dump, snapshot)
+
+    def close(self) -> None:
+        """Waits for any pending writes and stops the worker thread."""
+        logger.info("Waiting for pending location data writes...")
+        if self.journal is not None:
+            self.executor.submit(self.journal.close)
+        self.executor.shutdown(wait=True)
+
+
+class ShardedYamlStore(AsyncYamlStore):
+    """Reads and writes data split across YAML shard files, alongside a manifest file describing them.
+
+    Dumps only contain the shards that changed, so unchanged shards are never rewritten.
+    """
+
+    def __init__(self, manifestFilepath: str, serialize: Optional[Callable[[dict], dict]] = None,
+                 deserialize: Optional[Callable[[dict], dict]] = None,
+                 snapshot: Optional[Callable[[dict], dict]] = None):
+        super().__init__(manifestFilepath, serialize=serialize, deserialize=deserialize, snapshot=snapshot)
+        self.directory = Path(manifestFilepath).parent
+
+    def getShardFilepath(self, shard: int) -> str:
+        return str(self.directory / f"shard-{shard:03d}.yaml")
+
+    def load(self) -> Optional[dict]:
+        """Returns the manifest, or None if no shards have been written yet."""
+        if not os.path.exists(self.filepath):
+            return None
+
+        with open(self.filepath, 'r') as f:
+            return loadYaml(f)
+
+    def loadShard(self, shard: int) -> dict:
+        """Returns the data held by a shard."""
+        shardFilepath = self.getShardFilepath(shard)
+        if not os.path.exists(shardFilepath):
+            return {}
+
+        with open(shardFilepath, 'r') as f:
+            return self.deserialize(loadYaml(f) or {})
+
+    def dump(self, data: dict) -> None:
+        """Atomically replaces each given shard, then the manifest."""
+        with metrics.time('location_data_write_seconds', store='sharded'):
+            os.makedirs(self.directory, exist_ok=True)
+            writtenBytes = 0
+            for shard, shardData in data['shards'].items():
+                with atomicallyReplace(self.getShardFilepath(shard)) as f:
+                    dumpYaml(self.serialize(shardData), f)
+                    writtenBytes += f.tell()
+
+            with atomicallyReplace(self.filepath) as f:
+                dumpYaml(data['manifest'], f)
+                writtenBytes += f.tell()
+
+        metrics.increment('location_data_written_bytes_total', writtenBytes, store='sharded')
+
+
+def keepUnchanged(data: dict) -> dict:
+    return data
+
+
+def ignoreData(data: dict) -> None:
+    pass
+
+
+def logFailedWrite(future: Future) -> None:
+    """Logs the error of a failed background write."""
+    if future.exception() is not None:
+        logger.error(f"Failed to write location data: {future.exception()}")
+
+
+class WriteBehindWriter:
+    """Coalesces bursts of data mutations into a single write to an AsyncYamlStore.
+
+    Mutations only mark the data as dirty. A flush happens once the data has been dirty for `flushDelay` seconds or
+    once `maxPendingMutations` mutations have piled up, whichever comes first.
+
+    `onWritten` and `onWriteFailed` are called with the data returned by `getData` once a flush has written it or
+    failed to, so that only part of the data can be collected per flush and handed back if it was not written.
+    """
+
+    def __init__(self, store: AsyncYamlStore, getData: Callable[[], dict], flushDelay: float = 0.5,
+                 maxPendingMutations: int = 50, onWritten: Optional[Callable[[dict], None]] = None,
+                 onWriteFailed: Optional[Callable[[dict], None]] = None):
+        self.store = store
+        self.getData = getData
+        self.flushDelay = flushDelay
+        self.maxPendingMutations = maxPendingMutations
+        self.onWritten = onWritten or ignoreData
+        self.onWriteFailed = onWriteFailed or ignoreData
+
+        self.pendingMutations = 0
+        self.mutationsReceived = 0
+        self.flushesPerformed = 0
+
+        self.flushHandle: Optional[asyncio.TimerHandle] = None
+        self.flushTasks: set[asyncio.Task] = set()
+
+    def markDirty(self) -> None:
+        """Records a mutation and schedules a flush if one is not already pending."""
+        self.mutationsReceived += 1
+        self.pendingMutations += 1
+        metrics.increment('location_mutations_total')
+
+        if self.pendingMutations >= self.maxPendingMutations:
+            self.scheduleFlush(0)
+        elif self.flushHandle is None:
+            self.scheduleFlush(self.flushDelay)
+
+    def scheduleFlush(self, delay: float) -> None:
+        """Schedules a flush to run on the event loop after the given delay."""
+        self.cancelScheduledFlush()
+        loop = asyncio.get_running_loop()
+        self.flushHandle = loop.call_later(delay, self.startFlush)
+
+    def cancelScheduledFlush(self) -> None:
+        """Cancels the pending flush timer, if any."""
+        if self.flushHandle is not None:
+            self.flushHandle.cancel()
+            self.flushHandle = None
+
+    def startFlush(self) -> None:
+        """Starts a flush task and keeps a reference to it until it finishes."""
+        task = asyncio.ensure_future(self.flush())
+        self.flushTasks.add(task)
+        task.add_done_callback(self.flushTasks.discard)
+
+    async def flush(self) -> None:
+        """Writes the data to disk if any mutations are pending."""
+        self.cancelScheduledFlush()
+        if self.pendingMutations == 0:
+            return
+
+        self.pendingMutations = 0
+        self.flushesPerformed += 1
+        metrics.increment('location_flushes_total')
+        data = self.getData()
+        try:
+            await self.store.dumpAsync(data)
+        except Exception as e:
+            logger.error(f"Failed to write location data, retrying: {e}")
+            self.onWriteFailed(data)
+            self.pendingMutations += 1
+            self.scheduleFlush(self.flushDelay)
+        else:
+            self.onWritten(data)
+
+    def close(self) -> None:
+        """Synchronously writes any pending mutations and shuts down the underlying store."""
+        self.cancelScheduledFlush()
+        if self.pendingMutations > 0:
+            self.pendingMutations = 0
+            self.flushesPerformed += 1
+            metrics.increment('location_flushes_total')
+            future = self.store.executor.submit(self.store.dump, self.store.snapshot(self.getData()))
+            future.add_done_callback(logFailedWrite)
+
+        logger.info(f"Persisted {self.mutationsReceived} location mutations in {self.flushesPerformed} writes.")
+        self.store.close()
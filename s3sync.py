@@ -0,0 +1,134 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from logging import getLogger
+from typing import Optional
+
+from metrics import metrics
+from persistence import atomicallyReplace
+
+logger = getLogger("main.s3sync")
+
+
+class S3Sync:
+    """Mirrors local data files to gzip-compressed S3 objects without blocking the event loop.
+
+    Transfers run on a dedicated worker thread. Payloads are compressed deterministically, so the MD5 of an unchanged
+    file always matches the ETag of its last upload and the upload can be skipped.
+
+    If an ETags filepath is given, the ETags are kept there across restarts, so it can be told whether the objects in S3
+    are still the ones this machine last uploaded or downloaded. They are saved after each upload, and should be saved
+    once downloaded objects have been restored.
+    """
+
+    def __init__(self, client, bucket: str, eTagsFilepath: Optional[str] = None):
+        self.client = client
+        self.bucket = bucket
+        self.eTagsFilepath = eTagsFilepath
+        self.lastETags: dict[str, str] = self.loadETags()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='s3sync')
+
+    def loadETags(self) -> dict[str, str]:
+        if self.eTagsFilepath is None or not os.path.exists(self.eTagsFilepath):
+            return {}
+        with open(self.eTagsFilepath, 'r') as f:
+            return json.load(f)
+
+    def saveETags(self) -> None:
+        if self.eTagsFilepath is not None:
+            with atomicallyReplace(self.eTagsFilepath) as f:
+                json.dump(self.lastETags, f)
+
+    @staticmethod
+    def compress(content: bytes) -> bytes:
+        return gzip.compress(content, mtime=0)
+
+    @staticmethod
+    def getETag(payload: bytes) -> str:
+        """Returns the ETag S3 assigns to an object uploaded in a single part."""
+        return f'"{hashlib.md5(payload).hexdigest()}"'
+
+    def upload(self, objectKey: str, filepath: str) -> bool:
+        """Uploads the file unless it is unchanged since its last transfer. Returns whether it was uploaded."""
+        compressedObjectKey = f"{objectKey}.gz"
+        with open(filepath, 'rb') as f:
+            payload = self.compress(f.read())
+
+        eTag = self.getETag(payload)
+        if eTag == self.lastETags.get(compressedObjectKey):
+            metrics.increment('s3_uploads_skipped_total')
+            return False
+
+        with metrics.time('s3_transfer_seconds', direction='upload'):
+            response = self.client.put_object(Bucket=self.bucket, Key=compressedObjectKey, Body=payload,
+                                              ContentType='application/gzip')
+        metrics.increment('s3_transferred_bytes_total', len(payload), direction='upload')
+        self.lastETags[compressedObjectKey] = response.get('ETag', eTag)
+        self.saveETags()
+        logger.info(f"Uploaded {compressedObjectKey} ({len(payload)} bytes).")
+        return True
+
+    def uploadAll(self, files: dict[str, str]) -> int:
+        """Uploads every changed file, in order, and returns how many were uploaded."""
+        uploaded = sum(self.upload(objectKey, filepath) for objectKey, filepath in files.items())
+        logger.info(f"Uploaded {uploaded} of {len(files)} location data objects.")
+        return uploaded
+
+    def download(self, objectKey: str, filepath: str) -> bool:
+        """Downloads the object into the file, falling back to an uncompressed object from before compression was used.
+
+        Returns whether an object was found.
+        """
+        compressedObjectKey = f"{objectKey}.gz"
+        with metrics.time('s3_transfer_seconds', direction='download'):
+            try:
+                response = self.client.get_object(Bucket=self.bucket, Key=compressedObjectKey)
+                payload = response['Body'].read()
+                content = gzip.decompress(payload)
+                self.lastETags[compressedObjectKey] = response.get('ETag')
+            except self.client.exceptions.NoSuchKey:
+                try:
+                    response = self.client.get_object(Bucket=self.bucket, Key=objectKey)
+                    payload = content = response['Body'].read()
+                except self.client.exceptions.NoSuchKey:
+                    logger.warning(f"No {objectKey} object to download.")
+                    return False
+        metrics.increment('s3_transferred_bytes_total', len(payload), direction='download')
+
+        with atomicallyReplace(filepath, 'wb') as f:
+            f.write(content)
+
+        logger.info(f"Downloaded {objectKey} ({len(content)} bytes).")
+        return True
+
+    def isUnchangedSinceLastTransfer(self, objectKey: str) -> bool:
+        """Determines if S3 still holds the objects this machine last transferred, including the given one."""
+        if f"{objectKey}.gz" not in self.lastETags:
+            return False
+
+        for compressedObjectKey, eTag in self.lastETags.items():
+            try:
+                response = self.client.head_object(Bucket=self.bucket, Key=compressedObjectKey)
+            except self.client.exceptions.ClientError:
+                return False
+            if response.get('ETag') != eTag:
+                return False
+        return True
+
+    async def uploadAllAsync(self, files: dict[str, str]) -> int:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.uploadAll, files)
+
+    async def downloadAsync(self, objectKey: str, filepath: str) -> bool:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.download, objectKey, filepath)
+
+    async def isUnchangedSinceLastTransferAsync(self, objectKey: str) -> bool:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.isUnchangedSinceLastTransfer, objectKey)
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,113 @@
+from collections import Counter
+from typing import Iterable
+
+Trie = dict
+
+
+def getTrigrams(text: str) -> set[str]:
+    """Returns the case-insensitive trigrams of the text, padded so that its start and end count as well."""
+    padded = f"  {text.lower()} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class NameSearchIndex:
+    """An index of location names answering case-insensitive prefix and typo-tolerant searches.
+
+    Prefix searches walk a trie of the lowercased names. Fuzzy searches only score the names sharing a trigram with
+    the query, by the similarity of their trigram sets.
+    """
+
+    minimumSimilarity = 0.3
+
+    def __init__(self, names: Iterable[str] = ()):
+        self.trie: Trie = {}
+        self.nameTrigrams: dict[str, set[str]] = {}
+        self.postings: dict[str, set[str]] = {}
+        for name in names:
+            self.add(name)
+
+    def __len__(self) -> int:
+        return len(self.nameTrigrams)
+
+    def add(self, name: str) -> None:
+        if name in self.nameTrigrams:
+            return
+
+        node = self.trie
+        for char in name.lower():
+            node = node.setdefault(char, {})
+        node.setdefault(None, set()).add(name)
+
+        trigrams = getTrigrams(name)
+        self.nameTrigrams[name] = trigrams
+        for trigram in trigrams:
+            self.postings.setdefault(trigram, set()).add(name)
+
+    def remove(self, name: str) -> None:
+        trigrams = self.nameTrigrams.pop(name, None)
+        if trigrams is None:
+            return
+
+        for trigram in trigrams:
+            names = self.postings[trigram]
+            names.discard(name)
+            if not names:
+                del self.postings[trigram]
+
+        lowered = name.lower()
+        path = [self.trie]
+        for char in lowered:
+            path.append(path[-1][char])
+
+        names = path[-1][None]
+        names.discard(name)
+        if not names:
+            del path[-1][None]
+        for depth in range(len(lowered), 0, -1):
+            if path[depth]:
+                break
+            del path[depth - 1][lowered[depth - 1]]
+
+    def startingWith(self, prefix: str, limit: int = 10) -> list[str]:
+        """Returns up to `limit` names starting with the prefix, ignoring case, in alphabetical order."""
+        node = self.trie
+        for char in prefix.lower():
+            node = node.get(char)
+            if node is None:
+                return []
+
+        found = []
+        stack = [node]
+        while stack and len(found) < limit:
+            node = stack.pop()
+            found.extend(sorted(node.get(None, ())))
+            stack.extend(node[char] for char in sorted((char for char in node if char is not None), reverse=True))
+
+        return found[:limit]
+
+    def similarTo(self, query: str, limit: int = 10) -> list[str]:
+        """Returns up to `limit` names similar to the query, most similar first, tolerating typos and wrong case."""
+        queryTrigrams = getTrigrams(query)
+        sharedCounts = Counter()
+        for trigram in queryTrigrams:
+            sharedCounts.update(self.postings.get(trigram, ()))
+
+        scored = []
+        for name, shared in sharedCounts.items():
+            similarity = shared / (len(queryTrigrams) + len(self.nameTrigrams[name]) - shared)
+            if similarity >= self.minimumSimilarity:
+                scored.append((-similarity, name.lower(), name))
+
+        scored.sort()
+        return [name for _, _, name in scored[:limit]]
+
+    def search(self, query: str, limit: int = 10) -> list[str]:
+        """Returns up to `limit` names matching the query: those starting with it first, then similar ones."""
+        found = self.startingWith(query, limit)
+        for name in self.similarTo(query, limit):
+            if len(found) >= limit:
+                break
+            if name not in found:
+                found.append(name)
+
+        return found
@@ -0,0 +1,119 @@
+import math
+from itertools import product
+from typing import Hashable
+
+from location import Coordinates
+
+Cell = tuple[int, int, int]
+
+
+def getDistance(first: Coordinates, second: Coordinates) -> float:
+    return math.dist(first, second)
+
+
+class SpatialGrid:
+    """A uniform grid of cubic cells over 3D points, answering nearest-neighbour and radius queries.
+
+    Queries only visit the cells around the query point instead of scanning every point, and points can be inserted
+    and removed in constant time.
+    """
+
+    def __init__(self, cellSize: int = 128):
+        self.cellSize = cellSize
+        self.cells: dict[Cell, dict[Hashable, Coordinates]] = {}
+        self.points: dict[Hashable, Coordinates] = {}
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def getCell(self, point: tuple) -> Cell:
+        x, z, y = (int(coord // self.cellSize) for coord in point)
+        return x, z, y
+
+    def insert(self, key: Hashable, point: Coordinates) -> None:
+        """Adds a point, replacing any point previously stored under the same key."""
+        self.remove(key)
+        self.points[key] = point
+        self.cells.setdefault(self.getCell(point), {})[key] = point
+
+    def remove(self, key: Hashable) -> None:
+        """Removes the point stored under the key, if any."""
+        point = self.points.pop(key, None)
+        if point is None:
+            return
+
+        cell = self.getCell(point)
+        cellPoints = self.cells[cell]
+        cellPoints.pop(key)
+        if not cellPoints:
+            del self.cells[cell]
+
+    @staticmethod
+    def getCellDistance(cell: Cell, center: Cell) -> int:
+        """Returns how many shells of cells separate the cell from the center cell."""
+        return max(abs(coord - centerCoord) for coord, centerCoord in zip(cell, center))
+
+    def getShellCells(self, center: Cell, radius: int) -> list[Cell]:
+        """Returns the occupied cells exactly `radius` cells away from the center cell along some axis."""
+        offsets = range(-radius, radius + 1)
+        return [
+            cell for cell in (
+                (center[0] + dx, center[1] + dz, center[2] + dy) for dx, dz, dy in product(offsets, repeat=3)
+                if max(abs(dx), abs(dz), abs(dy)) == radius
+            )
+            if cell in self.cells
+        ]
+
+    def nearest(self, point: Coordinates, k: int = 1) -> list[tuple[float, Hashable]]:
+        """Returns the distances and keys of the k points closest to the given point, closest first.
+
+        Shells of cells are visited outwards from the point's cell. Every point beyond shell `r` is at least
+        `r * cellSize` away, so the search stops once k points closer than that have been found. Once a shell would
+        span more cells than are occupied, the remaining points are ranked in a single pass instead, so a query far
+        from every point costs one scan rather than one scan per shell.
+        """
+        center = self.getCell(point)
+        found: list[tuple[float, Hashable]] = []
+        visited = 0
+        radius = 0
+
+        while visited < len(self.points):
+            if (2 * radius + 1) ** 3 > len(self.cells):
+                for cell, cellPoints in self.cells.items():
+                    if self.getCellDistance(cell, center) >= radius:
+                        found.extend((getDistance(point, cellPoint), key) for key, cellPoint in cellPoints.items())
+
+                found.sort(key=lambda result: result[0])
+                return found[:k]
+
+            for cell in self.getShellCells(center, radius):
+                for key, cellPoint in self.cells[cell].items():
+                    found.append((getDistance(point, cellPoint), key))
+                    visited += 1
+
+            found.sort(key=lambda result: result[0])
+            del found[k:]
+            if len(found) == k and found[-1][0] <= radius * self.cellSize:
+                break
+            radius += 1
+
+        return found
+
+    def withinRadius(self, point: Coordinates, radius: float) -> list[tuple[float, Hashable]]:
+        """Returns the distances and keys of every point within the radius of the given point, closest first."""
+        low = self.getCell(tuple(coord - radius for coord in point))
+        high = self.getCell(tuple(coord + radius for coord in point))
+        if math.prod(highCoord - lowCoord + 1 for lowCoord, highCoord in zip(low, high)) > len(self.cells):
+            cells = [cell for cell in self.cells if all(lo <= coord <= hi for coord, lo, hi in zip(cell, low, high))]
+        else:
+            cells = product(*(range(lowCoord, highCoord + 1) for lowCoord, highCoord in zip(low, high)))
+
+        found = []
+        for cell in cells:
+            for key, cellPoint in self.cells.get(cell, {}).items():
+                distance = getDistance(point, cellPoint)
+                if distance <= radius:
+                    found.append((distance, key))
+
+        found.sort(key=lambda result: result[0])
+        return found
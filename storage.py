@@ -0,0 +1,737 @@
+import asyncio
+import os
+import sqlite3
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from logging import getLogger
+from pathlib import Path
+from typing import Callable, Optional
+
+from location import Location
+from metrics import metrics
+from persistence import AppendOnlyJournal, AsyncYamlStore, ShardedYamlStore, WriteBehindWriter, logFailedWrite
+
+logger = getLogger("main.storage")
+
+categories = ('homes', 'farms', 'other')
+
+
+def makeEmptyUserData() -> dict:
+    """Returns the data tree of a user without any saved locations."""
+    return {'locations': {category: {} for category in categories}}
+
+
+def serializeUsers(users: dict) -> dict:
+    """Returns a copy of users' data with every location converted to its stored form."""
+    return {
+        userID: {'locations': {
+            category: {name: location.toRecord() for name, location in categoryData.items()}
+            for category, categoryData in userData['locations'].items()
+        }}
+        for userID, userData in users.items()
+    }
+
+
+def deserializeUsers(users: dict) -> dict:
+    """Converts every stored location in users' data into a Location, in place."""
+    for userData in users.values():
+        for categoryData in userData['locations'].values():
+            for name, record in categoryData.items():
+                if not isinstance(record, Location):
+                    categoryData[name] = Location.fromRecord(record)
+    return users
+
+
+def snapshotUserData(userData: dict) -> dict:
+    """Returns a copy of a user's data that can be written while the original keeps changing.
+
+    Only the dicts are copied, since Location records are immutable and can be shared.
+    """
+    return {'locations': {category: dict(categoryData) for category, categoryData in userData['locations'].items()}}
+
+
+def snapshotShards(data: dict) -> dict:
+    return {
+        'manifest': data['manifest'],
+        'shards': {
+            shard: {userID: snapshotUserData(userData) for userID, userData in users.items()}
+            for shard, users in data['shards'].items()
+        },
+    }
+
+
+def serializeData(data: dict) -> dict:
+    return {'users': serializeUsers(data['users'])}
+
+
+def deserializeData(data: dict) -> dict:
+    deserializeUsers(data['users'])
+    return data
+
+
+class LocationStorage:
+    """Interface between the Locations cog and the place its data is persisted.
+
+    The cog keeps the full data tree in memory for reads and reports every mutation to its storage, which decides how
+    (and how cheaply) to persist it.
+    """
+
+    objectKey = ''
+    legacyObjectKey: Optional[str] = None
+
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+
+    def load(self) -> dict:
+        """Returns the saved location data for all users."""
+        raise NotImplementedError
+
+    def putLocation(self, userID: int, category: str, name: str, location: Location) -> None:
+        """Persists a newly added or changed location."""
+        raise NotImplementedError
+
+    def putLocations(self, userID: int, entries: list[tuple[str, str, Location]]) -> None:
+        """Persists many newly added (category, name, location) entries of a user at once."""
+        for category, name, location in entries:
+            self.putLocation(userID, category, name, location)
+
+    def deleteLocation(self, userID: int, category: str, name: str) -> None:
+        """Persists the removal of a location."""
+        raise NotImplementedError
+
+    def renameLocation(self, userID: int, category: str, name: str, newName: str) -> None:
+        """Persists the renaming of a location."""
+        raise NotImplementedError
+
+    async def flush(self) -> None:
+        """Waits until every reported mutation has been written to the storage file."""
+        raise NotImplementedError
+
+    async def loadExternalChanges(self) -> Optional[dict]:
+        """Returns the saved data of the users another process changed since they were last loaded, or `None` if it
+        changed nothing.
+
+        The changed users' data is under `users`, including users left without locations. `replaced` is true if the
+        data was replaced as a whole, e.g. restored from a download, in which case `users` holds every user. Only
+        storages that can be shared between processes ever find changes.
+        """
+        return None
+
+    async def exportSnapshot(self) -> dict[str, str]:
+        """Returns the paths of a consistent copy of all persisted data, keyed by their object keys for uploading.
+
+        The object at `objectKey` is always last, so it is only uploaded once everything it refers to has been.
+        """
+        raise NotImplementedError
+
+    def getDependentObjectKeys(self, filepath: str) -> list[str]:
+        """Returns the keys of the other objects the downloaded object at `objectKey` refers to."""
+        return []
+
+    def getDownloadFilepath(self, objectKey: str) -> str:
+        """Returns the path an object should be downloaded to before it is restored."""
+        return str(Path(self.filepath).parent / f"{Path(objectKey).name}.download")
+
+    def restoreSnapshot(self, files: dict[str, str]) -> dict:
+        """Replaces the persisted data with downloaded snapshot files and returns the data they hold."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Writes any pending mutations and releases the storage's resources."""
+        raise NotImplementedError
+
+
+def applyJournalRecord(data: dict, record: dict) -> None:
+    """Replays a single journaled mutation onto a data tree.
+
+    Replaying is idempotent, since a crash between writing a snapshot and truncating the journal leaves records behind
+    that the snapshot already contains.
+    """
+    userData = data['users'].setdefault(record['user'], makeEmptyUserData())
+    categoryData = userData['locations'].get(record.get('category'))
+
+    match record['op']:
+        case 'put':
+            categoryData[record['name']] = Location.fromRecord(record['record'])
+        case 'putMany':
+            for category, name, locationRecord in record['entries']:
+                userData['locations'][category][name] = Location.fromRecord(locationRecord)
+        case 'delete':
+            categoryData.pop(record['name'], None)
+        case 'rename':
+            if record['name'] in categoryData:
+                categoryData[record['newName']] = categoryData.pop(record['name'])
+        case _:
+            logger.warning(f"Skipping unknown journal record: {record}")
+
+
+class YamlLocationStorage(LocationStorage):
+    """Stores all users' locations in a YAML snapshot plus an append-only journal of the changes made since.
+
+    Each mutation appends a single fsync'd journal record. The journal is compacted into a new snapshot once enough
+    records have piled up, after a quiet period, and whenever the data is flushed for upload. Every snapshot is also
+    written in a binary format that is loaded instead of the YAML file at startup while it is current.
+
+    Snapshots reuse the previous snapshot's copy of every user whose locations have not changed since, so taking one
+    on the loop only copies the changed users.
+    """
+
+    objectKey = 'locations.yaml'
+
+    compactionDelay = 300
+    compactionThreshold = 1000
+
+    def __init__(self, filepath: str):
+        super().__init__(filepath)
+        self.data = {'users': {}}
+        self.journal = AppendOnlyJournal(str(Path(filepath).with_suffix('.journal')))
+        self.store = AsyncYamlStore(filepath, self.journal, str(Path(filepath).with_suffix('.pickle')), serializeData,
+                                    deserializeData, self.snapshotData)
+        self.writer = WriteBehindWriter(self.store, lambda: self.data, self.compactionDelay, self.compactionThreshold)
+        self.userSnapshots: dict[int, dict] = {}
+        self.changedUsers: set[int] = set()
+
+    def load(self) -> dict:
+        self.data = self.store.load()
+        self.userSnapshots = {}
+        records = self.journal.read()
+        for record in records:
+            applyJournalRecord(self.data, record)
+
+        if records:
+            logger.info(f"Replayed {len(records)} journaled location changes.")
+        return self.data
+
+    def journalMutation(self, record: dict) -> None:
+        self.changedUsers.add(record['user'])
+        self.store.appendToJournal(record)
+        self.writer.markDirty()
+
+    def snapshotData(self, data: dict) -> dict:
+        """Returns a copy of the data to write, sharing the previous snapshot's copies of the unchanged users.
+
+        Previous snapshots are never modified, since the worker thread may still be writing them.
+        """
+        previous, changedUsers = self.userSnapshots, self.changedUsers
+        self.changedUsers = set()
+        self.userSnapshots = {
+            userID: snapshotUserData(userData) if userID in changedUsers or userID not in previous else previous[userID]
+            for userID, userData in data['users'].items()
+        }
+        return {'users': self.userSnapshots}
+
+    def putLocation(self, userID: int, category: str, name: str, location: Location) -> None:
+        self.journalMutation({
+            'op': 'put', 'user': userID, 'category': category, 'name': name, 'record': location.toRecord()
+        })
+
+    def putLocations(self, userID: int, entries: list[tuple[str, str, Location]]) -> None:
+        self.journalMutation({
+            'op': 'putMany', 'user': userID,
+            'entries': [(category, name, location.toRecord()) for category, name, location in entries]
+        })
+
+    def deleteLocation(self, userID: int, category: str, name: str) -> None:
+        self.journalMutation({'op': 'delete', 'user': userID, 'category': category, 'name': name})
+
+    def renameLocation(self, userID: int, category: str, name: str, newName: str) -> None:
+        self.journalMutation({'op': 'rename', 'user': userID, 'category': category, 'name': name, 'newName': newName})
+
+    async def flush(self) -> None:
+        await self.writer.flush()
+
+    async def exportSnapshot(self) -> dict[str, str]:
+        await self.flush()
+        return {self.objectKey: self.filepath}
+
+    def replaceSnapshot(self, filepath: str) -> None:
+        """Replaces the snapshot, discarding the journal and binary snapshot, which hold the replaced data."""
+        os.replace(filepath, self.filepath)
+        self.journal.truncate()
+        if os.path.exists(self.store.binaryFilepath):
+            os.remove(self.store.binaryFilepath)
+
+    def restoreSnapshot(self, files: dict[str, str]) -> dict:
+        # Runs on the store's worker, after any queued journal appends and compactions of the replaced data.
+        self.store.executor.submit(self.replaceSnapshot, files[self.objectKey]).result()
+        return self.load()
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class SqliteLocationStorage(LocationStorage):
+    """Stores one row per location in a SQLite database, so each mutation only touches the affected row.
+
+    The connection is owned by a single worker thread, which keeps writes ordered and off the event loop. Several
+    processes may share the database, since SQLite locks it for each write and every reader sees committed rows.
+
+    Triggers give each user a sequence number in `location_changes` that increases whenever one of their rows
+    changes, so other processes only reload the users changed since they last looked. `PRAGMA user_version` counts
+    the times the whole database was replaced, after which they reload everything.
+    """
+
+    objectKey = 'locations.db'
+
+    schema = """
+        CREATE TABLE IF NOT EXISTS locations (
+            user_id INTEGER NOT NULL,
+            category TEXT NOT NULL,
+            name TEXT NOT NULL,
+            overworld_coords TEXT NOT NULL,
+            nether_coords TEXT NOT NULL,
+            end_coords TEXT NOT NULL,
+            PRIMARY KEY (user_id, name)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS locations_by_category ON locations (user_id, category, name);
+        CREATE TABLE IF NOT EXISTS location_changes (
+            user_id INTEGER PRIMARY KEY,
+            seq INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS location_changes_by_seq ON location_changes (seq);
+        CREATE TRIGGER IF NOT EXISTS record_location_insert AFTER INSERT ON locations BEGIN
+            INSERT OR REPLACE INTO location_changes
+            VALUES (NEW.user_id, (SELECT IFNULL(MAX(seq), 0) + 1 FROM location_changes));
+        END;
+        CREATE TRIGGER IF NOT EXISTS record_location_update AFTER UPDATE ON locations BEGIN
+            INSERT OR REPLACE INTO location_changes
+            VALUES (NEW.user_id, (SELECT IFNULL(MAX(seq), 0) + 1 FROM location_changes));
+        END;
+        CREATE TRIGGER IF NOT EXISTS record_location_delete AFTER DELETE ON locations BEGIN
+            INSERT OR REPLACE INTO location_changes
+            VALUES (OLD.user_id, (SELECT IFNULL(MAX(seq), 0) + 1 FROM location_changes));
+        END;
+    """
+
+    busyTimeout = 30
+
+    def __init__(self, filepath: str):
+        super().__init__(filepath)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sqlite')
+        self.connection = self.executor.submit(self.connect).result()
+        self.dataVersion: Optional[int] = None
+        self.replacementCount: Optional[int] = None
+        self.changeSeq = 0
+        self.exportedVersion: Optional[tuple[int, int]] = None
+
+    def connect(self) -> sqlite3.Connection:
+        """Opens the database in WAL mode and creates the schema if needed.
+
+        Writes wait up to `busyTimeout` seconds for another process to release its lock on the database.
+        """
+        connection = sqlite3.connect(self.filepath, timeout=self.busyTimeout, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.executescript(self.schema)
+        return connection
+
+    def load(self) -> dict:
+        return self.executor.submit(self.readAll).result()
+
+    def readAll(self) -> dict:
+        """Builds the data tree of all users from the database."""
+        self.dataVersion = self.readDataVersion()
+        self.replacementCount = self.readReplacementCount()
+        self.changeSeq = self.readChangeSeq()
+        users = {}
+        rows = self.connection.execute(
+            "SELECT user_id, category, name, overworld_coords, nether_coords, end_coords FROM locations"
+        )
+        self.addRows(users, rows)
+        return {'users': users}
+
+    def readChangedUsers(self) -> dict:
+        """Returns the data of the users whose rows changed since the last read, including users left without any."""
+        rows = self.connection.execute(
+            "SELECT user_id, seq FROM location_changes WHERE seq > ?", (self.changeSeq,)
+        ).fetchall()
+        if not rows:
+            return {}
+
+        # Rows committed after the changes were read are read again next time, which is harmless.
+        users = {userID: makeEmptyUserData() for userID, _ in rows}
+        locationRows = self.connection.execute(
+            "SELECT user_id, category, name, overworld_coords, nether_coords, end_coords FROM locations "
+            "WHERE user_id IN (SELECT user_id FROM location_changes WHERE seq > ?)", (self.changeSeq,)
+        )
+        self.addRows(users, locationRows)
+        self.changeSeq = max(seq for _, seq in rows)
+        return users
+
+    @staticmethod
+    def addRows(users: dict, rows) -> None:
+        for userID, category, name, overworld, nether, end in rows:
+            userData = users.setdefault(userID, makeEmptyUserData())
+            userData['locations'][category][name] = Location.fromRecord(
+                {'overworld': overworld, 'nether': nether, 'end': end}
+            )
+
+    def readDataVersion(self) -> int:
+        """Returns a number that changes whenever another connection commits to the database."""
+        return self.connection.execute("PRAGMA data_version").fetchone()[0]
+
+    def readReplacementCount(self) -> int:
+        return self.connection.execute("PRAGMA user_version").fetchone()[0]
+
+    def readChangeSeq(self) -> int:
+        return self.connection.execute("SELECT IFNULL(MAX(seq), 0) FROM location_changes").fetchone()[0]
+
+    def readChangeVersion(self) -> tuple[int, int]:
+        """Returns a version that changes whenever this or any other connection commits to the database."""
+        return self.connection.total_changes, self.readDataVersion()
+
+    def readExternalChanges(self) -> Optional[dict]:
+        dataVersion = self.readDataVersion()
+        if dataVersion == self.dataVersion:
+            return None
+        if self.readReplacementCount() != self.replacementCount:
+            return {'users': self.readAll()['users'], 'replaced': True}
+
+        self.dataVersion = dataVersion
+        users = self.readChangedUsers()
+        return {'users': users, 'replaced': False} if users else None
+
+    async def loadExternalChanges(self) -> Optional[dict]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.readExternalChanges)
+
+    def putLocation(self, userID: int, category: str, name: str, location: Location) -> None:
+        self.submitWrite(self.upsertRow, userID, category, name, location.toRecord())
+
+    def putLocations(self, userID: int, entries: list[tuple[str, str, Location]]) -> None:
+        rows = [(userID, category, name, location.toRecord()) for category, name, location in entries]
+        self.submitWrite(self.upsertRows, rows)
+
+    def deleteLocation(self, userID: int, category: str, name: str) -> None:
+        self.submitWrite(self.deleteRow, userID, name)
+
+    def renameLocation(self, userID: int, category: str, name: str, newName: str) -> None:
+        self.submitWrite(self.renameRow, userID, name, newName)
+
+    def submitWrite(self, function, *args) -> None:
+        """Queues a write on the worker thread and logs it if it fails."""
+        future = self.executor.submit(self.write, function, *args)
+        future.add_done_callback(logFailedWrite)
+
+    def write(self, function, *args) -> None:
+        """Runs a write, then skips its own changes when looking for other processes' ones if none committed since."""
+        function(*args)
+        if self.readDataVersion() == self.dataVersion:
+            self.changeSeq = self.readChangeSeq()
+
+    def upsertRow(self, userID: int, category: str, name: str, record: dict) -> None:
+        self.upsertRows([(userID, category, name, record)])
+
+    def upsertRows(self, rows: list[tuple[int, str, str, dict]]) -> None:
+        """Inserts or replaces many rows in a single transaction."""
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO locations VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (userID, category, name, record['overworld'], record['nether'], record['end'])
+                    for userID, category, name, record in rows
+                ]
+            )
+
+    def deleteRow(self, userID: int, name: str) -> None:
+        with self.connection:
+            self.connection.execute("DELETE FROM locations WHERE user_id = ? AND name = ?", (userID, name))
+
+    def renameRow(self, userID: int, name: str, newName: str) -> None:
+        """Renames a row, replacing any row another process saved under the new name in the meantime."""
+        with self.connection:
+            self.connection.execute(
+                "UPDATE OR REPLACE locations SET name = ? WHERE user_id = ? AND name = ?", (newName, userID, name)
+            )
+
+    def checkpoint(self) -> None:
+        """Moves the WAL contents into the main database file so it can be copied on its own."""
+        self.connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    async def flush(self) -> None:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, self.checkpoint)
+
+    def backup(self) -> str:
+        """Copies the database into a standalone export file and returns its path.
+
+        The previous export is kept if nothing was committed since, since every copy differs in its header and would be
+        uploaded again.
+        """
+        exportFilepath = f"{self.filepath}.export"
+        version = self.readChangeVersion()
+        if version == self.exportedVersion and os.path.exists(exportFilepath):
+            return exportFilepath
+
+        with metrics.time('location_data_write_seconds', store='sqlite'):
+            exportConnection = sqlite3.connect(exportFilepath)
+            try:
+                self.connection.backup(exportConnection)
+            finally:
+                exportConnection.close()
+
+        metrics.increment('location_data_written_bytes_total', os.path.getsize(exportFilepath), store='sqlite')
+        self.exportedVersion = version
+        return exportFilepath
+
+    async def exportSnapshot(self) -> dict[str, str]:
+        loop = asyncio.get_running_loop()
+        return {self.objectKey: await loop.run_in_executor(self.executor, self.backup)}
+
+    def replaceDatabase(self, filepath: str) -> None:
+        """Copies a database file over the contents of the database.
+
+        The copy goes through the open connection rather than replacing the file, so other processes sharing the
+        database see the new contents instead of keeping the old file open. Copies exported before the change triggers
+        existed get them back.
+        """
+        replacementCount = self.readReplacementCount()
+        downloadConnection = sqlite3.connect(filepath)
+        try:
+            downloadConnection.backup(self.connection)
+        finally:
+            downloadConnection.close()
+        self.connection.executescript(self.schema)
+        self.connection.execute(f"PRAGMA user_version = {replacementCount + 1}")
+        os.remove(filepath)
+        self.exportedVersion = None
+
+    def restoreSnapshot(self, files: dict[str, str]) -> dict:
+        self.executor.submit(self.replaceDatabase, files[self.objectKey]).result()
+        return self.load()
+
+    def close(self) -> None:
+        self.executor.submit(self.checkpoint)
+        self.executor.submit(self.connection.close)
+        self.executor.shutdown(wait=True)
+
+
+def getShard(userID: int, shardCount: int) -> int:
+    """Returns the shard a user's data is stored in."""
+    return userID % shardCount
+
+
+class LazyShardedUsers(dict):
+    """All users' data, loading each shard from disk the first time one of its users is looked up."""
+
+    def __init__(self, loadShard: Callable[[int], dict], shardCount: int):
+        super().__init__()
+        self.loadShard = loadShard
+        self.shardCount = shardCount
+        self.loadedShards: set[int] = set()
+
+    def ensureShardLoaded(self, userID: int) -> None:
+        shard = getShard(userID, self.shardCount)
+        if shard in self.loadedShards:
+            return
+
+        self.loadedShards.add(shard)
+        for shardUserID, userData in self.loadShard(shard).items():
+            super().setdefault(shardUserID, userData)
+
+    def loadAllShards(self) -> None:
+        """Loads every shard, e.g. before iterating over all users."""
+        for shard in range(self.shardCount):
+            self.ensureShardLoaded(shard)
+
+    def __contains__(self, userID) -> bool:
+        self.ensureShardLoaded(userID)
+        return super().__contains__(userID)
+
+    def __missing__(self, userID):
+        self.ensureShardLoaded(userID)
+        if super().__contains__(userID):
+            return super().__getitem__(userID)
+        raise KeyError(userID)
+
+
+class ShardedLocationStorage(LocationStorage):
+    """Splits users across YAML shard files by a hash of their ID, listed in a manifest.
+
+    Only the shards touched since the last flush are rewritten and, since unchanged shards keep their content hash,
+    only those are uploaded again. Shards are loaded lazily, the first time one of their users is looked up.
+    """
+
+    objectKey = 'locations/manifest.yaml'
+    legacyObjectKey = 'locations.yaml'
+
+    defaultShardCount = 64
+
+    def __init__(self, filepath: str):
+        super().__init__(filepath)
+        self.legacyFilepath = str(Path(filepath).parent.with_suffix('.yaml'))
+        self.store = ShardedYamlStore(filepath, serializeUsers, deserializeUsers, snapshotShards)
+        self.writer = WriteBehindWriter(self.store, self.collectDirtyShards, onWritten=self.markShardsStored,
+                                        onWriteFailed=self.markShardsDirty)
+        self.shardCount = self.defaultShardCount
+        self.users = LazyShardedUsers(self.store.loadShard, self.shardCount)
+        self.storedShards: set[int] = set()
+        self.dirtyShards: set[int] = set()
+
+    def load(self) -> dict:
+        manifest = self.store.load()
+        if manifest is None and os.path.exists(self.legacyFilepath):
+            logger.info(f"Migrating {self.legacyFilepath} into shards...")
+            manifest = self.migrateLegacyFile()
+
+        if manifest is not None:
+            self.shardCount = manifest['shardCount']
+            self.storedShards = set(manifest['shards'])
+
+        self.users = LazyShardedUsers(self.store.loadShard, self.shardCount)
+        return {'users': self.users}
+
+    def migrateLegacyFile(self) -> dict:
+        """Splits the single-file data into shards and returns the new manifest."""
+        legacyData = AsyncYamlStore(self.legacyFilepath, deserialize=deserializeData).load()
+        shards = {}
+        for userID, userData in legacyData['users'].items():
+            shards.setdefault(getShard(userID, self.shardCount), {})[userID] = userData
+
+        manifest = {'shardCount': self.shardCount, 'shards': sorted(shards)}
+        self.store.dump({'manifest': manifest, 'shards': shards})
+        return manifest
+
+    def collectDirtyShards(self) -> dict:
+        """Returns the data of every shard changed since the last flush, along with the updated manifest.
+
+        The shards are no longer dirty from here on, so changes made while they are written mark them dirty again.
+        """
+        shards = {shard: {} for shard in self.dirtyShards}
+        for userID, userData in dict.items(self.users):
+            shard = getShard(userID, self.shardCount)
+            if shard in shards:
+                shards[shard][userID] = userData
+
+        self.dirtyShards = set()
+        manifest = {'shardCount': self.shardCount, 'shards': sorted(self.storedShards | set(shards))}
+        return {'manifest': manifest, 'shards': shards}
+
+    def markShardsStored(self, data: dict) -> None:
+        """Lists the written shards in the manifest from now on, so they are also exported."""
+        self.storedShards |= set(data['shards'])
+
+    def markShardsDirty(self, data: dict) -> None:
+        """Hands the shards of a failed write back, so the retry writes them."""
+        self.dirtyShards |= set(data['shards'])
+
+    def markUserDirty(self, userID: int) -> None:
+        self.dirtyShards.add(getShard(userID, self.shardCount))
+        self.writer.markDirty()
+
+    def putLocation(self, userID: int, category: str, name: str, location: Location) -> None:
+        self.markUserDirty(userID)
+
+    def putLocations(self, userID: int, entries: list[tuple[str, str, Location]]) -> None:
+        self.markUserDirty(userID)
+
+    def deleteLocation(self, userID: int, category: str, name: str) -> None:
+        self.markUserDirty(userID)
+
+    def renameLocation(self, userID: int, category: str, name: str, newName: str) -> None:
+        self.markUserDirty(userID)
+
+    async def flush(self) -> None:
+        await self.writer.flush()
+
+    def getShardObjectKey(self, shard: int) -> str:
+        return f"locations/{Path(self.store.getShardFilepath(shard)).name}"
+
+    async def exportSnapshot(self) -> dict[str, str]:
+        await self.flush()
+        files = {
+            self.getShardObjectKey(shard): self.store.getShardFilepath(shard) for shard in sorted(self.storedShards)
+        }
+        files[self.objectKey] = self.filepath
+        return files
+
+    def getDependentObjectKeys(self, filepath: str) -> list[str]:
+        manifest = AsyncYamlStore(filepath).load()
+        return [self.getShardObjectKey(shard) for shard in manifest['shards']]
+
+    def replaceShards(self, files: dict[str, str]) -> None:
+        """Replaces the manifest and shards with downloaded ones, or the legacy file if the download is one."""
+        if self.objectKey not in files:
+            os.replace(files[self.legacyObjectKey], self.legacyFilepath)
+            if os.path.exists(self.filepath):
+                os.remove(self.filepath)
+            return
+
+        manifest = AsyncYamlStore(files[self.objectKey]).load()
+        for shard in manifest['shards']:
+            os.replace(files[self.getShardObjectKey(shard)], self.store.getShardFilepath(shard))
+        os.replace(files[self.objectKey], self.filepath)
+
+    def restoreSnapshot(self, files: dict[str, str]) -> dict:
+        # Runs on the store's worker, after any queued writes of the replaced data.
+        self.store.executor.submit(self.replaceShards, files).result()
+        self.dirtyShards = set()
+        return self.load()
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+storageBackends = {
+    'yaml': (YamlLocationStorage, 'locations.yaml'),
+    'sqlite': (SqliteLocationStorage, 'locations.db'),
+    'sharded': (ShardedLocationStorage, 'locations/manifest.yaml'),
+}
+
+
+def createLocationStorage(backend: str, dataDirectory: Path) -> LocationStorage:
+    """Returns the location storage for the given backend name."""
+    try:
+        storageClass, filename = storageBackends[backend]
+    except KeyError:
+        raise ValueError(f"Unknown location storage backend: {backend}")
+
+    logger.info(f"Using the {backend} location storage backend.")
+    filepath = dataDirectory / filename
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    return storageClass(str(filepath))
+
+
+def migrateYamlToSqlite(yamlFilepath: str, sqliteFilepath: str) -> int:
+    """Imports every location of a YAML data file into a SQLite database and returns the number imported."""
+    data = AsyncYamlStore(yamlFilepath).load()
+    rows = [
+        (userID, category, name, record['overworld'], record['nether'], record['end'])
+        for userID, userData in data['users'].items()
+        for category, categoryData in userData['locations'].items()
+        for name, record in categoryData.items()
+    ]
+
+    storage = SqliteLocationStorage(sqliteFilepath)
+    try:
+        with storage.connection:
+            storage.connection.executemany("INSERT OR REPLACE INTO locations VALUES (?, ?, ?, ?, ?, ?)", rows)
+    finally:
+        storage.close()
+
+    return len(rows)
+
+
+def migrateYamlToShards(yamlFilepath: str, manifestFilepath: str) -> int:
+    """Splits a YAML data file into shards and returns the number of users migrated."""
+    storage = ShardedLocationStorage(manifestFilepath)
+    storage.legacyFilepath = yamlFilepath
+    try:
+        storage.load()
+    finally:
+        storage.close()
+
+    return len(AsyncYamlStore(yamlFilepath).load()['users'])
+
+
+if __name__ == "__main__":
+    migrations = {
+        'sqlite': (migrateYamlToSqlite, 'locations'),
+        'sharded': (migrateYamlToShards, 'users'),
+    }
+    if len(sys.argv) != 4 or sys.argv[1] not in migrations:
+        sys.exit("Usage: python storage.py <sqlite|sharded> <locations.yaml> <destination>")
+
+    migrate, unit = migrations[sys.argv[1]]
+    imported = migrate(sys.argv[2], sys.argv[3])
+    print(f"Imported {imported} {unit} into {sys.argv[3]}.")
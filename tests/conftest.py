@@ -0,0 +1,15 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture
+def botDirectory(tmp_path, monkeypatch):
+    """Runs the test in an empty directory, where the bot keeps its locations in a new SQLite database."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('location_backend', 'sqlite')
+    monkeypatch.delenv('cluster_worker_index', raising=False)
+    return tmp_path
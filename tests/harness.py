@@ -0,0 +1,247 @@
+"""An offline stand-in for Discord and AWS that drives the bot's real command pipeline.
+
+`FakeDiscord` builds messages the way the gateway would deliver them and answers the bot's HTTP requests in memory,
+recording everything the bot sends so tests and benchmarks can wait on and inspect its replies.
+"""
+import asyncio
+import datetime
+import hashlib
+import io
+import itertools
+import sys
+import types
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional, Union
+
+import discord
+from discord.ext import commands
+
+import main
+
+Channel = Union[discord.DMChannel, discord.TextChannel]
+
+
+class FakeS3Client:
+    """Keeps S3 objects in memory, answering the calls S3Sync makes."""
+
+    class exceptions:
+        class ClientError(Exception):
+            pass
+
+        class NoSuchKey(ClientError):
+            pass
+
+    def __init__(self):
+        self.objects: dict[str, bytes] = {}
+        self.putCount = 0
+
+    @staticmethod
+    def getETag(body: bytes) -> str:
+        return f'"{hashlib.md5(body).hexdigest()}"'
+
+    def put_object(self, Bucket: str, Key: str, Body: bytes, **kwargs) -> dict:
+        self.objects[Key] = Body
+        self.putCount += 1
+        return {'ETag': self.getETag(Body)}
+
+    def get_object(self, Bucket: str, Key: str) -> dict:
+        try:
+            body = self.objects[Key]
+        except KeyError:
+            raise self.exceptions.NoSuchKey(Key)
+        return {'Body': io.BytesIO(body), 'ETag': self.getETag(body)}
+
+    def head_object(self, Bucket: str, Key: str) -> dict:
+        try:
+            return {'ETag': self.getETag(self.objects[Key])}
+        except KeyError:
+            raise self.exceptions.ClientError(f'404 {Key}')
+
+
+def installFakeAws(client: Optional[FakeS3Client] = None) -> FakeS3Client:
+    """Replaces the `aws` module with one holding an in-memory client, so no credentials or boto3 are needed."""
+    client = client or FakeS3Client()
+    sys.modules['aws'] = types.SimpleNamespace(s3=client, BUCKET_NAME='minecraft-bot-test')
+    return client
+
+
+class FakeHTTP:
+    """Answers the bot's REST calls in memory, recording each message it sends."""
+
+    def __init__(self, discordFake: 'FakeDiscord'):
+        self.discordFake = discordFake
+        self.sent: dict[int, list[dict]] = {}
+        self.newMessages: dict[int, asyncio.Queue] = {}
+        self.attachments: dict[str, bytes] = {}
+        self.requestCount = 0
+
+    def getQueue(self, channelID: int) -> asyncio.Queue:
+        return self.newMessages.setdefault(channelID, asyncio.Queue())
+
+    def recordMessage(self, channelID: int, content: Optional[str], embed: Optional[dict],
+                      attachments: list[dict]) -> dict:
+        self.requestCount += 1
+        payload = self.discordFake.makeMessagePayload(channelID, self.discordFake.botUser, content or '',
+                                                      embeds=[embed] if embed else [], attachments=attachments)
+        self.sent.setdefault(channelID, []).append(payload)
+        self.getQueue(channelID).put_nowait(payload)
+        return payload
+
+    async def send_message(self, channel_id, content, *, embed=None, **kwargs) -> dict:
+        return self.recordMessage(int(channel_id), content, embed, [])
+
+    async def send_files(self, channel_id, *, files, content=None, embed=None, **kwargs) -> dict:
+        attachments = []
+        for file in files:
+            url = f'https://cdn.example/{next(self.discordFake.ids)}/{file.filename}'
+            self.attachments[url] = file.fp.read()
+            attachments.append(self.discordFake.makeAttachmentPayload(file.filename, url, len(self.attachments[url])))
+        return self.recordMessage(int(channel_id), content, embed, attachments)
+
+    async def edit_message(self, channel_id, message_id, **fields) -> dict:
+        self.requestCount += 1
+        return {'id': message_id, 'channel_id': channel_id, **fields}
+
+    async def add_reaction(self, channel_id, message_id, emoji) -> None:
+        self.requestCount += 1
+
+    async def remove_reaction(self, channel_id, message_id, emoji, member_id) -> None:
+        self.requestCount += 1
+
+    async def clear_reactions(self, channel_id, message_id) -> None:
+        self.requestCount += 1
+
+    async def get_from_cdn(self, url) -> bytes:
+        return self.attachments[url]
+
+
+class FakeDiscord:
+    """Delivers synthetic messages to a bot as if they came from the gateway, and fakes its HTTP layer."""
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.state = bot._connection
+        self.ids = itertools.count(100000000000000000)
+        self.http = FakeHTTP(self)
+        bot.http = self.state.http = self.http
+
+        self.botUser = self.makeUserPayload('Locations Bot', bot=True)
+        self.state.user = discord.ClientUser(state=self.state, data=self.botUser)
+        self.dmChannels: dict[int, discord.DMChannel] = {}
+        self.errors: list[Exception] = []
+        bot.add_listener(self.recordError, 'on_command_error')
+
+    async def recordError(self, ctx, error: Exception) -> None:
+        self.errors.append(error)
+
+    def makeUserPayload(self, name: str, bot: bool = False) -> dict:
+        return {'id': str(next(self.ids)), 'username': name, 'discriminator': '0001', 'avatar': None, 'bot': bot}
+
+    @staticmethod
+    def makeAttachmentPayload(filename: str, url: str, size: int) -> dict:
+        return {'id': url.split('/')[-2], 'filename': filename, 'size': size, 'url': url, 'proxy_url': url}
+
+    def makeMessagePayload(self, channelID: int, author: dict, content: str, embeds: list[dict] = (),
+                           attachments: list[dict] = ()) -> dict:
+        return {
+            'id': str(next(self.ids)), 'channel_id': str(channelID), 'author': author, 'content': content,
+            'embeds': list(embeds), 'attachments': list(attachments), 'mentions': [], 'mention_roles': [],
+            'mention_everyone': False, 'pinned': False, 'tts': False, 'type': 0,
+            'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(), 'edited_timestamp': None,
+        }
+
+    def getDMChannel(self, user: dict) -> discord.DMChannel:
+        """Returns the direct message channel between the bot and the user."""
+        userID = int(user['id'])
+        if userID not in self.dmChannels:
+            data = {'id': str(next(self.ids)), 'recipients': [user]}
+            self.dmChannels[userID] = discord.DMChannel(me=self.state.user, state=self.state, data=data)
+        return self.dmChannels[userID]
+
+    def makeGuild(self, name: str, members: list[dict], channelCount: int = 1) -> discord.Guild:
+        """Adds a guild with text channels that the given users can talk in."""
+        guildID = str(next(self.ids))
+        data = {
+            'id': guildID, 'name': name, 'owner_id': members[0]['id'], 'member_count': len(members),
+            'roles': [{'id': guildID, 'name': '@everyone', 'permissions': str(discord.Permissions.general().value)}],
+            'channels': [{'id': str(next(self.ids)), 'type': 0, 'name': f'channel-{i}', 'position': i}
+                         for i in range(channelCount)],
+            'members': [{'user': member, 'roles': [], 'joined_at': None, 'deaf': False, 'mute': False}
+                        for member in members],
+        }
+        guild = discord.Guild(data=data, state=self.state)
+        self.state._add_guild(guild)
+        return guild
+
+    def makeMessage(self, author: dict, content: str, channel: Optional[Channel] = None,
+                    attachments: list[tuple[str, bytes]] = ()) -> discord.Message:
+        """Builds a message from the user, in their direct messages unless a guild channel is given."""
+        if channel is None:
+            channel = self.getDMChannel(author)
+
+        attachmentPayloads = []
+        for filename, fileContent in attachments:
+            url = f'https://cdn.example/{next(self.ids)}/{filename}'
+            self.http.attachments[url] = fileContent
+            attachmentPayloads.append(self.makeAttachmentPayload(filename, url, len(fileContent)))
+
+        data = self.makeMessagePayload(channel.id, author, content, attachments=attachmentPayloads)
+        if isinstance(channel, discord.TextChannel):
+            data['guild_id'] = str(channel.guild.id)
+            data['member'] = {'roles': [], 'joined_at': None, 'deaf': False, 'mute': False}
+        return discord.Message(state=self.state, channel=channel, data=data)
+
+    async def invoke(self, author: dict, content: str, channel: Optional[Channel] = None,
+                     attachments: list[tuple[str, bytes]] = ()) -> discord.Message:
+        """Runs a command message through the bot's command pipeline and waits until the command finishes.
+
+        Raises the error if the command failed.
+        """
+        message = self.makeMessage(author, content, channel, attachments)
+        ctx = await self.bot.get_context(message)
+        await self.bot.invoke(ctx)
+
+        await asyncio.sleep(0)
+        if self.errors:
+            raise self.errors.pop(0)
+        return message
+
+    async def reply(self, author: dict, content: str, channel: Optional[Channel] = None) -> discord.Message:
+        """Sends a plain message, such as an answer to a dialog, and lets the bot's listeners see it."""
+        message = self.makeMessage(author, content, channel)
+        self.bot.dispatch('message', message)
+        await asyncio.sleep(0)
+        return message
+
+    async def nextMessage(self, channel: Channel, timeout: float = 5) -> dict:
+        """Waits for the next message the bot sends in the channel and returns its payload."""
+        return await asyncio.wait_for(self.http.getQueue(channel.id).get(), timeout)
+
+    def getSent(self, channel: Channel) -> list[dict]:
+        return self.http.sent.get(channel.id, [])
+
+
+def getDescription(payload: dict) -> str:
+    """Returns the description of the embed in a message the bot sent."""
+    return payload['embeds'][0].get('description', '') if payload['embeds'] else ''
+
+
+@asynccontextmanager
+async def openFakeBot(s3Client: Optional[FakeS3Client] = None,
+                      cogFiles: tuple[str, ...] = ('cogs.locations',)) -> AsyncIterator[tuple[commands.Bot, FakeDiscord]]:
+    """Builds the bot with `main.createBot`, loads the Locations cog, along with any other given cogs, onto it with
+    `main.loadModules`, and connects it to a fake Discord, unloading the cogs again afterwards.
+
+    The cog's storage is created in the working directory as usual, and its AWS client is an in-memory fake, or the
+    given one, e.g. to keep the same objects across restarts.
+    """
+    installFakeAws(s3Client)
+    bot = main.initializeBot()
+    discordFake = FakeDiscord(bot)
+    main.loadModules(bot, list(cogFiles))
+    bot.get_cog('Locations').pageTurnTimeout = 0.01
+    try:
+        yield bot, discordFake
+    finally:
+        for cogFile in cogFiles:
+            bot.unload_extension(cogFile)
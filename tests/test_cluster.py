@@ -0,0 +1,244 @@
+import asyncio
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from location import Location
+from storage import SqliteLocationStorage, makeEmptyUserData
+
+repositoryDirectory = Path(__file__).resolve().parent.parent
+userID = 42
+
+# Each worker waits for the start file so both write at the same time, then saves its own locations, keeps
+# overwriting a shared one, and finally renames one of its locations onto a name the other worker also renames onto.
+workerScript = """
+import os, sys, time
+from location import Location
+from storage import SqliteLocationStorage
+
+databaseFilepath, startFilepath, worker = sys.argv[1], sys.argv[2], sys.argv[3]
+storage = SqliteLocationStorage(databaseFilepath)
+storage.load()
+while not os.path.exists(startFilepath):
+    time.sleep(0.001)
+
+for i in range(300):
+    storage.putLocation({userID}, 'homes', f'{{worker}} {{i}}', Location(overworld=(i, int(worker), 64)))
+    storage.putLocation({userID}, 'other', 'Shared', Location(overworld=(i, int(worker), 64)))
+storage.renameLocation({userID}, 'homes', f'{{worker}} 0', 'Renamed')
+storage.close()
+""".format(userID=userID)
+
+
+def startWorkers(databaseFilepath: Path, startFilepath: Path) -> list[subprocess.Popen]:
+    return [
+        subprocess.Popen([sys.executable, '-c', workerScript, str(databaseFilepath), str(startFilepath), str(worker)],
+                         cwd=repositoryDirectory, stderr=subprocess.PIPE, text=True)
+        for worker in (1, 2)
+    ]
+
+
+def testTwoProcessesShareOneStore(tmp_path):
+    databaseFilepath = tmp_path / 'locations.db'
+    startFilepath = tmp_path / 'start'
+    storage = SqliteLocationStorage(str(databaseFilepath))
+    storage.load()
+
+    workers = startWorkers(databaseFilepath, startFilepath)
+    time.sleep(0.5)
+    startFilepath.touch()
+    for worker in workers:
+        _, errors = worker.communicate(timeout=60)
+        assert worker.returncode == 0, errors
+        assert 'Traceback' not in errors and 'Failed' not in errors, errors
+
+    try:
+        data = asyncio.run(storage.loadExternalChanges())
+        assert data is not None
+        locations = data['users'][userID]['locations']
+        expectedHomes = {f'{worker} {i}' for worker in (1, 2) for i in range(1, 300)}
+        assert set(locations['homes']) == expectedHomes | {'Renamed'}
+        assert locations['homes']['Renamed'].overworld in ((0, 1, 64), (0, 2, 64))
+        assert locations['other']['Shared'].overworld in ((299, 1, 64), (299, 2, 64))
+
+        assert asyncio.run(storage.loadExternalChanges()) is None
+        storage.putLocation(userID, 'farms', 'Own write', Location(overworld=(1, 2, 3)))
+        asyncio.run(storage.flush())
+        assert asyncio.run(storage.loadExternalChanges()) is None
+    finally:
+        storage.close()
+
+
+def testRenameReplacesALocationSavedByAnotherProcess(tmp_path):
+    databaseFilepath = str(tmp_path / 'locations.db')
+    first = SqliteLocationStorage(databaseFilepath)
+    second = SqliteLocationStorage(databaseFilepath)
+    try:
+        first.putLocation(userID, 'homes', 'Base', Location(overworld=(1, 1, 1)))
+        second.putLocation(userID, 'farms', 'Farm', Location(overworld=(2, 2, 2)))
+        asyncio.run(second.flush())
+        first.renameLocation(userID, 'homes', 'Base', 'Farm')
+        asyncio.run(first.flush())
+
+        locations = second.load()['users'][userID]['locations']
+        assert locations['homes'] == {'Farm': Location(overworld=(1, 1, 1))}
+        assert locations['farms'] == {}
+    finally:
+        first.close()
+        second.close()
+
+
+def testOnlyUsersChangedByAnotherProcessAreReloaded(tmp_path):
+    databaseFilepath = str(tmp_path / 'locations.db')
+    first = SqliteLocationStorage(databaseFilepath)
+    second = SqliteLocationStorage(databaseFilepath)
+    try:
+        for owner in (1, 2, 3):
+            first.putLocation(owner, 'homes', 'Base', Location(overworld=(owner, owner, 64)))
+        asyncio.run(first.flush())
+        second.load()
+
+        first.putLocation(1, 'farms', 'Farm', Location(overworld=(5, 5, 64)))
+        first.deleteLocation(2, 'homes', 'Base')
+        asyncio.run(first.flush())
+        changes = asyncio.run(second.loadExternalChanges())
+        assert changes['replaced'] is False
+        assert set(changes['users']) == {1, 2}
+        assert set(changes['users'][1]['locations']['farms']) == {'Farm'}
+        assert changes['users'][2] == makeEmptyUserData()
+        assert asyncio.run(second.loadExternalChanges()) is None
+
+        # A user this process changed in the meantime is only reloaded along with another process's changes.
+        second.putLocation(3, 'farms', 'Farm', Location(overworld=(6, 6, 64)))
+        first.renameLocation(1, 'farms', 'Farm', 'Fields')
+        asyncio.run(first.flush())
+        asyncio.run(second.flush())
+        changes = asyncio.run(second.loadExternalChanges())
+        assert set(changes['users']) >= {1} and set(changes['users'][1]['locations']['farms']) == {'Fields'}
+    finally:
+        first.close()
+        second.close()
+
+
+def testRestoringTheDatabaseReloadsEveryUser(tmp_path):
+    databaseFilepath = str(tmp_path / 'locations.db')
+    first = SqliteLocationStorage(databaseFilepath)
+    second = SqliteLocationStorage(databaseFilepath)
+    try:
+        first.putLocation(1, 'homes', 'Base', Location(overworld=(1, 1, 64)))
+        exportFilepath = asyncio.run(first.exportSnapshot())[first.objectKey]
+        downloadFilepath = str(tmp_path / 'locations.db.download')
+        Path(downloadFilepath).write_bytes(Path(exportFilepath).read_bytes())
+        first.putLocation(2, 'homes', 'Base', Location(overworld=(2, 2, 64)))
+        asyncio.run(first.flush())
+        second.load()
+
+        first.restoreSnapshot({first.objectKey: downloadFilepath})
+        changes = asyncio.run(second.loadExternalChanges())
+        assert changes['replaced'] is True
+        assert set(changes['users']) == {1}
+    finally:
+        first.close()
+        second.close()
+
+
+def testEditsOnlyConflictWithExternalChangesToTheirLocation(botDirectory):
+    pytest.importorskip('discord')
+    from tests.harness import getDescription, openFakeBot
+
+    async def editCoordinates(discordFake, steve: dict, alex: dict, changeExternally) -> str:
+        channel = discordFake.getDMChannel(steve)
+        command = asyncio.create_task(discordFake.invoke(steve, '*edit Base'))
+        for answer in ('2', '1'):
+            await discordFake.nextMessage(channel)
+            await discordFake.reply(steve, answer)
+        await discordFake.nextMessage(channel)
+
+        await changeExternally()
+        await discordFake.invoke(alex, '*view all')
+        await discordFake.reply(steve, '(7, 7, 64)')
+        response = await discordFake.nextMessage(channel)
+        await command
+        return getDescription(response)
+
+    async def scenario():
+        async with openFakeBot() as (bot, discordFake):
+            cog = bot.get_cog('Locations')
+            steve, alex = discordFake.makeUserPayload('Steve'), discordFake.makeUserPayload('Alex')
+            steveID = int(steve['id'])
+            await discordFake.invoke(steve, '*add home Base overworld (1, 1, 64)')
+            await discordFake.nextMessage(discordFake.getDMChannel(steve))
+            await discordFake.invoke(alex, '*add home Base overworld (2, 2, 64)')
+            await cog.storage.flush()
+
+            otherProcess = SqliteLocationStorage(cog.storage.filepath)
+            try:
+                async def addFarm():
+                    otherProcess.putLocation(steveID, 'farms', 'Farm', Location(overworld=(3, 3, 64)))
+                    await otherProcess.flush()
+
+                assert await editCoordinates(discordFake, steve, alex, addFarm) == \
+                       cog.embeds['coordinatesChanged'].description
+                locations = cog.data['users'][steveID]['locations']
+                assert locations['farms']['Farm'].overworld == (3, 3, 64)
+                assert locations['homes']['Base'].overworld == (7, 7, 64)
+
+                async def moveBase():
+                    otherProcess.putLocation(steveID, 'homes', 'Base', Location(overworld=(4, 4, 64)))
+                    await otherProcess.flush()
+
+                assert await editCoordinates(discordFake, steve, alex, moveBase) == \
+                       cog.embeds['editConflict'].description
+                assert cog.data['users'][steveID]['locations']['homes']['Base'].overworld == (4, 4, 64)
+            finally:
+                otherProcess.close()
+
+    asyncio.run(scenario())
+
+
+def testWorkersRunDisjointShardsCoveringEveryShard():
+    pytest.importorskip('discord')
+    import cluster
+
+    shardIDs = [
+        [int(shardID) for shardID in cluster.getWorkerEnvironment(worker, 3, 8)['shard_ids'].split(',')]
+        for worker in range(3)
+    ]
+    assert sorted(shardID for workerShardIDs in shardIDs for shardID in workerShardIDs) == list(range(8))
+    assert cluster.getWorkerEnvironment(2, 3, 8)['cluster_worker_index'] == '2'
+
+
+def testClusterStopsEveryWorkerWhenOneExits():
+    pytest.importorskip('discord')
+    import cluster
+
+    workers = [
+        subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)']),
+        subprocess.Popen([sys.executable, '-c', 'import sys; sys.exit(3)']),
+    ]
+    assert cluster.superviseWorkers(workers) == 3
+    assert all(worker.poll() is not None for worker in workers)
+
+
+def testExportIsOnlyRedoneAfterAWrite(tmp_path):
+    databaseFilepath = str(tmp_path / 'locations.db')
+    first = SqliteLocationStorage(databaseFilepath)
+    second = SqliteLocationStorage(databaseFilepath)
+    try:
+        first.load()
+        first.putLocation(userID, 'homes', 'Base', Location(overworld=(1, 1, 1)))
+        exportFilepath = Path(asyncio.run(first.exportSnapshot())[first.objectKey])
+        exported = exportFilepath.read_bytes()
+        asyncio.run(first.exportSnapshot())
+        assert exportFilepath.read_bytes() == exported
+
+        second.putLocation(userID, 'farms', 'Farm', Location(overworld=(2, 2, 2)))
+        asyncio.run(second.flush())
+        asyncio.run(first.exportSnapshot())
+        assert exportFilepath.read_bytes() != exported
+    finally:
+        first.close()
+        second.close()
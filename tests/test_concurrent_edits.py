@@ -0,0 +1,132 @@
+import asyncio
+import random
+
+import pytest
+
+pytest.importorskip('discord')
+
+from embeds import promptFooter
+from tests.harness import getDescription, openFakeBot
+
+names = [f'Spot {i}' for i in range(12)]
+
+
+def makeOperation(generator: random.Random) -> tuple[str, str, str, list[str], str]:
+    """Returns a random command against one of the shared names, the answers to give if it opens a dialog, and the
+    coordinates it saves.
+    """
+    name = generator.choice(names)
+    coordinates = f'({generator.randint(-999, 999)}, {generator.randint(-999, 999)}, 64)'
+    match generator.choice(('add', 'add', 'remove', 'rename', 'move')):
+        case 'add':
+            return 'add', name, f'*server add home {name} overworld {coordinates}', [], coordinates
+        case 'remove':
+            return 'remove', name, f'*server remove {name}', [], coordinates
+        case 'rename':
+            return 'rename', name, f'*server edit {name}', ['1', generator.choice(names)], coordinates
+        case 'move':
+            return 'move', name, f'*server edit {name}', ['2', '1', coordinates], coordinates
+
+
+async def runOperation(discordFake, member: dict, channel, command: str, answers: list[str],
+                       generator: random.Random) -> tuple[int, dict]:
+    """Runs a command, answering each prompt in turn and cancelling once out of answers.
+
+    Returns the id of the first message the bot sent for it, and the final response.
+    """
+    task = asyncio.create_task(discordFake.invoke(member, command, channel))
+    answers = iter(answers)
+    firstMessageID = None
+    while True:
+        message = await discordFake.nextMessage(channel)
+        firstMessageID = firstMessageID or int(message['id'])
+        if message['embeds'][0].get('footer', {}).get('text') != promptFooter:
+            break
+        await asyncio.sleep(generator.random() / 1000)
+        await discordFake.reply(member, next(answers, 'cancel'), channel)
+
+    await task
+    return firstMessageID, message
+
+
+def getTouchedNames(kind: str, name: str, answers: list[str]) -> set[str]:
+    """Returns the names of the locations a successful command changes."""
+    return {name, answers[1]} if kind == 'rename' else {name}
+
+
+def testInterleavedAddEditRemoveKeepLocationsConsistent(botDirectory):
+    generator = random.Random(20)
+
+    async def scenario():
+        async with openFakeBot() as (bot, discordFake):
+            cog = bot.get_cog('Locations')
+            members = [discordFake.makeUserPayload(f'Member {i}') for i in range(40)]
+            guild = discordFake.makeGuild('Server', members, channelCount=len(members))
+            results = []
+
+            async def runMember(member: dict, channel) -> None:
+                for _ in range(10):
+                    kind, name, command, answers, coordinates = makeOperation(generator)
+                    firstMessageID, response = await runOperation(discordFake, member, channel, command, answers,
+                                                                  generator)
+                    results.append((kind, name, answers, coordinates, firstMessageID, response))
+
+            await asyncio.gather(*(runMember(member, channel) for member, channel in zip(members, guild.text_channels)))
+
+            succeeded = {
+                'add': cog.embeds['added'].description,
+                'remove': cog.embeds['removed'].description,
+                'rename': cog.embeds['renamed'].description,
+                'move': cog.embeds['coordinatesChanged'].description,
+            }
+            committed = sorted(
+                (int(response['id']), firstMessageID, kind, name, answers, coordinates)
+                for kind, name, answers, coordinates, firstMessageID, response in results
+                if getDescription(response) == succeeded[kind]
+            )
+            conflicts = [
+                (int(response['id']), firstMessageID, name)
+                for kind, name, answers, coordinates, firstMessageID, response in results
+                if getDescription(response) == cog.embeds['editConflict'].description
+            ]
+            assert len(results) == 400 and committed and conflicts
+
+            # Replaying the successful commands in the order they were answered must be valid at every step.
+            model = {}
+            for _, _, kind, name, answers, coordinates in committed:
+                match kind:
+                    case 'add':
+                        assert name not in model
+                        model[name] = coordinates
+                    case 'remove':
+                        assert model.pop(name, None) is not None
+                    case 'rename':
+                        assert name in model and answers[1] not in model
+                        model[answers[1]] = model.pop(name)
+                    case 'move':
+                        assert name in model
+                        model[name] = coordinates
+
+            # An edit is only saved if nothing else changed its location while its dialog was open, and is only
+            # rejected if something did.
+            def isTouchedBetween(locationName: str, start: int, end: int) -> bool:
+                return any(start < committedID < end and locationName in getTouchedNames(kind, name, answers)
+                           for committedID, _, kind, name, answers, _ in committed)
+
+            for committedID, firstMessageID, kind, name, answers, _ in committed:
+                if kind in ('rename', 'move'):
+                    assert not isTouchedBetween(name, firstMessageID, committedID)
+            for responseID, firstMessageID, name in conflicts:
+                assert isTouchedBetween(name, firstMessageID, responseID)
+
+            locations = {name: location for name, (_, location) in cog.getNameIndex(guild).items()}
+            assert {name: str(location.overworld).replace(' ', '') for name, location in locations.items()} == \
+                   {name: coordinates.replace(' ', '') for name, coordinates in model.items()}
+            assert set(cog.getSearchIndex(guild).nameTrigrams) == set(model)
+            assert set(cog.getSpatialIndex(guild, 'overworld').points) == set(model)
+
+            await cog.storage.flush()
+            stored = cog.storage.load()['users'][guild.id]['locations']
+            assert {name for category in stored.values() for name in category} == set(model)
+
+    asyncio.run(scenario())
@@ -0,0 +1,126 @@
+import asyncio
+import itertools
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('discord')
+
+from conversations import ConversationCancelled, ConversationTimedOut, Conversations, Step, makeChoiceParser
+
+messageIDs = itertools.count(1)
+
+
+class FakeChannel:
+    def __init__(self, channelID: int):
+        self.id = channelID
+        self.sent = []
+
+    async def send(self, embed=None):
+        self.sent.append(embed)
+
+
+def makeMessage(channel: FakeChannel, authorID: int, content: str = '') -> SimpleNamespace:
+    return SimpleNamespace(id=next(messageIDs), channel=channel, author=SimpleNamespace(id=authorID), content=content)
+
+
+steps = [
+    Step('name?', lambda content: content),
+    Step('dimension?', makeChoiceParser({'1': 'overworld', '2': 'nether', '3': 'end'})),
+    Step('count?', int),
+]
+
+
+async def converse(conversations: Conversations, startMessage) -> list:
+    with conversations.open(startMessage, lambda reason: f'invalid {reason}') as session:
+        return [await session.ask(step) for step in steps]
+
+
+async def waitUntilOpen(conversations: Conversations, message) -> None:
+    while conversations.getKey(message) not in conversations.sessions:
+        await asyncio.sleep(0)
+
+
+def testHundredsOfConcurrentDialogs():
+    dialogCount = 500
+
+    async def scenario():
+        conversations = Conversations(timeout=5)
+        starts = [makeMessage(FakeChannel(i % 50), authorID=i) for i in range(dialogCount)]
+        dialogs = [asyncio.create_task(converse(conversations, start)) for start in starts]
+        for start in starts:
+            await waitUntilOpen(conversations, start)
+        assert len(conversations.sessions) == dialogCount
+
+        startTime = time.perf_counter()
+        # Every seventh user first picks an invalid dimension and has to answer again.
+        replies = [
+            [f'Base {i}', *(['nine'] if i % 7 == 0 else []), str(i % 3 + 1), str(i)]
+            for i in range(dialogCount)
+        ]
+        for replyIndex in range(4):
+            for start, answers in zip(starts, replies):
+                if replyIndex < len(answers):
+                    assert conversations.route(makeMessage(start.channel, start.author.id, answers[replyIndex]))
+            await asyncio.sleep(0)
+
+        results = await asyncio.gather(*dialogs)
+        elapsed = time.perf_counter() - startTime
+
+        for i, result in enumerate(results):
+            assert result == [f'Base {i}', ('overworld', 'nether', 'end')[i % 3], i]
+        assert conversations.sessions == {}
+        assert elapsed < 2
+
+    asyncio.run(scenario())
+
+
+def testRouteIgnoresOtherAuthorsAndTheStartMessage():
+    async def scenario():
+        conversations = Conversations(timeout=5)
+        channel = FakeChannel(1)
+        start = makeMessage(channel, authorID=1)
+        dialog = asyncio.create_task(converse(conversations, start))
+        await waitUntilOpen(conversations, start)
+
+        assert not conversations.route(start)
+        assert not conversations.route(makeMessage(channel, authorID=2, content='intruder'))
+        assert not conversations.route(makeMessage(FakeChannel(2), authorID=1, content='elsewhere'))
+        for content in ('Base', '2', '7'):
+            assert conversations.route(makeMessage(channel, authorID=1, content=content))
+
+        assert await dialog == ['Base', 'nether', 7]
+
+    asyncio.run(scenario())
+
+
+def testNewDialogCancelsThePreviousOneInTheChannel():
+    async def scenario():
+        conversations = Conversations(timeout=5)
+        channel = FakeChannel(1)
+        first = makeMessage(channel, authorID=1)
+        firstDialog = asyncio.create_task(converse(conversations, first))
+        await waitUntilOpen(conversations, first)
+
+        second = makeMessage(channel, authorID=1)
+        secondDialog = asyncio.create_task(converse(conversations, second))
+        with pytest.raises(ConversationCancelled):
+            await firstDialog
+
+        conversations.route(makeMessage(channel, authorID=1, content='cancel'))
+        with pytest.raises(ConversationCancelled):
+            await secondDialog
+        assert conversations.sessions == {}
+
+    asyncio.run(scenario())
+
+
+def testUnansweredDialogTimesOut():
+    async def scenario():
+        conversations = Conversations(timeout=0.01)
+        with pytest.raises(ConversationTimedOut):
+            await converse(conversations, makeMessage(FakeChannel(1), authorID=1))
+        assert conversations.sessions == {}
+
+    asyncio.run(scenario())
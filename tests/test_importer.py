@@ -0,0 +1,32 @@
+import pytest
+
+from importer import buildLocations, readRows
+from location import Location
+
+locationTypeCategories = {'home': 'homes', 'farm': 'farms', 'other': 'other'}
+
+
+def makeRow(x, z=0, y=64, dimension='overworld') -> dict:
+    return {'name': 'Base', 'type': 'home', 'dimension': dimension, 'x': x, 'z': z, 'y': y}
+
+
+@pytest.mark.parametrize('x', [1.5, '1.5', True, False, 'nan', 'inf', '1e400', [1], 'one'])
+def testRowsWithoutWholeNumberCoordinatesAreRejected(x):
+    assert buildLocations([makeRow(x)], locationTypeCategories, set()) == \
+           ([], ['Row 1: coordinates must be whole numbers'])
+
+
+@pytest.mark.parametrize('x', [-25, -25.0, '-25', ' -25 ', '-25.0'])
+def testWholeNumberCoordinatesAreAcceptedInAnyForm(x):
+    entries, errors = buildLocations([makeRow(x)], locationTypeCategories, set())
+    assert errors == [] and entries[0][2].overworld == (-25, 0, 64)
+
+
+def testCsvAndJsonRowsConvertTheSameWay():
+    csvRows = readRows('locations.csv', b'name,type,dimension,x,z,y\nBase,home,nether,-3.0,4,64\n')
+    jsonRows = readRows('locations.json', b'[{"name": "Base", "type": "home", "dimension": "nether", '
+                                          b'"x": -3.0, "z": 4, "y": 64}]')
+    expected = [('homes', 'Base', Location.inDimension('nether', (-3, 4, 64)))]
+    assert buildLocations(csvRows, locationTypeCategories, set()) == (expected, [])
+    assert buildLocations(jsonRows, locationTypeCategories, set()) == (expected, [])
+    assert expected[0][2] == Location((-24, 32, 512), (-3, 4, 64), None)
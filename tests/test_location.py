@@ -0,0 +1,112 @@
+import math
+import random
+import re
+import string
+
+import pytest
+
+from location import Location, parseCoords, parseUserCoords
+
+# The pattern coordinates were validated and extracted with, in two passes, before parseUserCoords.
+legacyCoordsPattern = re.compile(r"^\(\s*(-?\d*)\s*,\s*(-?\d*)\s*,\s*(-?\d*)\s*\)$")
+
+
+def makeCoordinates(generator: random.Random) -> tuple[int, int, int]:
+    return tuple(generator.randint(-999999999, 999999999) for _ in range(3))
+
+
+def makeWhitespace(generator: random.Random, minimum: int = 0) -> str:
+    return ''.join(generator.choice(' \t') for _ in range(generator.randint(minimum, 3)))
+
+
+def formatTyped(generator: random.Random, coordinates: tuple[int, int, int]) -> str:
+    """Formats coordinates in one of the ways users type them, with random spacing."""
+    separator = generator.choice([
+        lambda: f'{makeWhitespace(generator)},{makeWhitespace(generator)}',
+        lambda: makeWhitespace(generator, minimum=1),
+    ])
+    text = separator().join(str(coord) for coord in coordinates)
+    if generator.random() < 0.5:
+        text = f'({makeWhitespace(generator)}{text}{makeWhitespace(generator)})'
+    return f'{makeWhitespace(generator)}{text}{makeWhitespace(generator)}'
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('(-25, 300, 69)', (-25, 300, 69)),
+    ('-25, 300, 69', (-25, 300, 69)),
+    ('-25 300 69', (-25, 300, 69)),
+    ('XYZ: 1.5 / 64 / -3.2', (1, -4, 64)),
+    ('Block: 1 64 -4', (1, -4, 64)),
+    ('Looking at: 10 70 20', (10, 20, 70)),
+    ('/execute in minecraft:overworld run tp @s 1.50 64.00 -3.20 90.0 12.5', (1, -4, 64)),
+])
+def testParseUserCoordsReturnsStoredOrder(text, expected):
+    assert parseUserCoords(text) == expected
+
+
+@pytest.mark.parametrize('text', ['', '(1, 2, 3', '1, 2', 'XYZ: 1 / 2', '1' * 20 + ' 2 3', 'one two three'])
+def testParseUserCoordsRejectsInvalidText(text):
+    assert parseUserCoords(text) is None
+
+
+def testPastedCoordinatesRoundTripThroughRecords():
+    location = Location(overworld=parseUserCoords('XYZ: 1.5 / 64 / -3.2'))
+    record = location.toRecord()
+    assert parseCoords(record['overworld']) == (1, -4, 64)
+    assert Location.fromRecord(record) == location
+
+
+def testTypedCoordinatesRoundTrip():
+    generator = random.Random(0)
+    for _ in range(5000):
+        coordinates = makeCoordinates(generator)
+        text = formatTyped(generator, coordinates)
+        assert parseUserCoords(text) == coordinates, text
+
+
+def testPastedCoordinatesRoundTrip():
+    generator = random.Random(1)
+    for _ in range(5000):
+        x, y, z = (f'{generator.uniform(-30000000, 30000000):.{generator.randint(0, 5)}f}' for _ in range(3))
+        expected = (math.floor(float(x)), math.floor(float(z)), math.floor(float(y)))
+        assert parseUserCoords(f'XYZ: {x} / {y} / {z}') == expected
+        assert parseUserCoords(f'/execute in minecraft:the_nether run tp @s {x} {y} {z} '
+                               f'{generator.uniform(-180, 180):.2f} {generator.uniform(-90, 90):.2f}') == expected
+
+
+def testAgreesWithTheLegacyParserOnItsFormat():
+    generator = random.Random(2)
+    for _ in range(5000):
+        text = formatTyped(generator, makeCoordinates(generator))
+        match = legacyCoordsPattern.search(text)
+        if match is not None:
+            assert parseUserCoords(text) == tuple(int(group) for group in match.groups()), text
+
+
+def testArbitraryTextNeverRaises():
+    generator = random.Random(3)
+    alphabet = string.digits * 3 + ' ,/()-.:~@\t\n' + 'xyzXYZ' + 'é漢🙂 \x00'
+    samples = ['', '(,,)', '( , , )', '-', '--1 2 3', '1e5 2 3', '1. 2 3', '.5 2 3', '1 2 3)', '(1 2 3']
+    samples += [''.join(generator.choice(alphabet) for _ in range(generator.randint(0, 40))) for _ in range(5000)]
+    for _ in range(5000):
+        text = list(formatTyped(generator, makeCoordinates(generator)))
+        for _ in range(generator.randint(1, 3)):
+            position = generator.randrange(len(text) + 1)
+            if generator.random() < 0.5 and position < len(text):
+                del text[position]
+            else:
+                text.insert(position, generator.choice(alphabet))
+        samples.append(''.join(text))
+
+    for text in samples:
+        result = parseUserCoords(text)
+        assert result is None or (len(result) == 3 and all(type(coord) is int for coord in result)), text
+
+
+@pytest.mark.parametrize('dimension, coordinates, expected', [
+    ('overworld', (-25, 300, 69), Location((-25, 300, 69), (-3, 38, 9), None)),
+    ('nether', (-3, 38, 9), Location((-24, 304, 72), (-3, 38, 9), None)),
+    ('end', (1, 2, 3), Location(None, None, (1, 2, 3))),
+])
+def testLocationInDimensionFillsInTheOverworldAndNetherPair(dimension, coordinates, expected):
+    assert Location.inDimension(dimension, coordinates) == expected
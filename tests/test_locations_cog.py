@@ -0,0 +1,224 @@
+import asyncio
+import csv
+import io
+
+import pytest
+
+import importer
+
+pytest.importorskip('discord')
+
+from tests.harness import FakeS3Client, getDescription, openFakeBot
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def testAddInOneMessageThenView(botDirectory):
+    async def scenario():
+        async with openFakeBot() as (bot, discordFake):
+            steve = discordFake.makeUserPayload('Steve')
+            channel = discordFake.getDMChannel(steve)
+
+            await discordFake.invoke(steve, '*add home Base overworld (-25, 300, 69)')
+            assert getDescription(discordFake.getSent(channel)[-1]) == 'Location added!'
+
+            await discordFake.invoke(steve, '*view Base')
+            fields = discordFake.getSent(channel)[-1]['embeds'][0]['fields']
+            assert fields[0] == {'inline': True, 'name': 'Overworld', 'value': '(-25, 300, 69)'}
+
+    run(scenario())
+
+
+def testAddDialog(botDirectory):
+    async def scenario():
+        async with openFakeBot() as (bot, discordFake):
+            steve = discordFake.makeUserPayload('Steve')
+            channel = discordFake.getDMChannel(steve)
+
+            command = asyncio.create_task(discordFake.invoke(steve, '*add farm Wheat'))
+            assert 'coordinates' in getDescription(await discordFake.nextMessage(channel))
+            await discordFake.reply(steve, '4')
+            assert 'Invalid input' in getDescription(await discordFake.nextMessage(channel))
+            await discordFake.reply(steve, '1')
+            assert 'F3' in getDescription(await discordFake.nextMessage(channel))
+            await discordFake.reply(steve, 'XYZ: 10.5 / 64 / -20.5')
+            assert getDescription(await discordFake.nextMessage(channel)) == 'Location added!'
+            await command
+
+            cog = bot.get_cog('Locations')
+            assert cog.data['users'][int(steve['id'])]['locations']['farms']['Wheat'].overworld == (10, -21, 64)
+
+    run(scenario())
+
+
+def testCancelledDialogSavesNothing(botDirectory):
+    async def scenario():
+        async with openFakeBot() as (bot, discordFake):
+            steve = discordFake.makeUserPayload('Steve')
+            channel = discordFake.getDMChannel(steve)
+
+            command = asyncio.create_task(discordFake.invoke(steve, '*add home Base'))
+            await discordFake.nextMessage(channel)
+            await discordFake.reply(steve, 'cancel')
+            assert getDescription(await discordFake.nextMessage(channel)) == 'Cancelled. Have a nice day!'
+            await command
+
+            await discordFake.invoke(steve, '*view Base')
+            assert 'does not exist' in getDescription(discordFake.getSent(channel)[-1])
+
+    run(scenario())
+
+
+def testServerLocationsAreSharedBetweenMembers(botDirectory):
+    async def scenario():
+        async with openFakeBot() as (bot, discordFake):
+            steve = discordFake.makeUserPayload('Steve')
+            alex = discordFake.makeUserPayload('Alex')
+            channel = discordFake.makeGuild('Server', [steve, alex]).text_channels[0]
+
+            await discordFake.invoke(steve, '*server add farm Melons nether (1, 2, 3)', channel)
+            await discordFake.invoke(alex, '*server view Melons', channel)
+            assert discordFake.getSent(channel)[-1]['embeds'][0]['author']['name'] == 'Coordinates for Melons'
+
+            await discordFake.invoke(alex, '*view Melons')
+            assert 'does not exist' in getDescription(discordFake.getSent(discordFake.getDMChannel(alex))[-1])
+
+    run(scenario())
+
+
+def testExportThenImportIntoAnotherUser(botDirectory):
+    async def scenario():
+        async with openFakeBot() as (bot, discordFake):
+            steve = discordFake.makeUserPayload('Steve')
+            alex = discordFake.makeUserPayload('Alex')
+            steveChannel = discordFake.getDMChannel(steve)
+
+            for i in range(30):
+                await discordFake.invoke(steve, f'*add home Home {i} overworld ({i}, {i * 2}, 64)')
+            await discordFake.invoke(steve, '*export csv')
+            attachment = discordFake.getSent(steveChannel)[-1]['attachments'][0]
+            exported = discordFake.http.attachments[attachment['url']]
+            assert len(list(csv.DictReader(io.StringIO(exported.decode())))) == 30
+
+            await discordFake.invoke(alex, '*import', attachments=[('locations.csv', exported)])
+            cog = bot.get_cog('Locations')
+            assert len(cog.data['users'][int(alex['id'])]['locations']['homes']) == 30
+
+            await discordFake.invoke(alex, '*view all')
+            assert discordFake.http.requestCount > 0
+
+    run(scenario())
+
+
+def testNearestFarFromEveryLocation(botDirectory):
+    async def scenario():
+        async with openFakeBot() as (bot, discordFake):
+            steve = discordFake.makeUserPayload('Steve')
+            channel = discordFake.getDMChannel(steve)
+            for i in range(50):
+                await discordFake.invoke(steve, f'*add other Spot {i} overworld ({i * 300}, {i * -300}, 64)')
+
+            await asyncio.wait_for(discordFake.invoke(steve, '*nearest overworld 999999999 0 0 3'), timeout=2)
+            assert 'Spot 49' in str(discordFake.getSent(channel)[-1]['embeds'])
+
+    run(scenario())
+
+
+def getSavedNames(bot, user: dict) -> set[str]:
+    userData = bot.get_cog('Locations').data['users'].get(int(user['id']))
+    return set() if userData is None else {name for category in userData['locations'].values() for name in category}
+
+
+def testRestartKeepsChangesMadeSinceTheLastUpload(botDirectory):
+    s3Client = FakeS3Client()
+
+    async def scenario():
+        async with openFakeBot(s3Client) as (bot, discordFake):
+            steve = discordFake.makeUserPayload('Steve')
+            await discordFake.invoke(steve, '*add home Base overworld (1, 2, 3)')
+            await bot.get_cog('Locations').uploadToAWS()
+            await discordFake.invoke(steve, '*add farm Wheat overworld (4, 5, 6)')
+
+        async with openFakeBot(s3Client) as (bot, discordFake):
+            steve = discordFake.makeUserPayload('Steve')
+            await bot.get_cog('Locations').downloadFromAWS()
+            assert getSavedNames(bot, steve) == {'Base', 'Wheat'}
+
+    run(scenario())
+
+
+def testRestartLoadsNewerDataUploadedElsewhere(botDirectory, monkeypatch):
+    s3Client = FakeS3Client()
+    firstDirectory, secondDirectory = botDirectory / 'first', botDirectory / 'second'
+
+    async def scenario():
+        for directory in (firstDirectory, secondDirectory):
+            directory.mkdir()
+            monkeypatch.chdir(directory)
+            async with openFakeBot(s3Client) as (bot, discordFake):
+                steve = discordFake.makeUserPayload('Steve')
+                await bot.get_cog('Locations').downloadFromAWS()
+                await discordFake.invoke(steve, f'*add other {directory.name} overworld (1, 2, 3)')
+                await bot.get_cog('Locations').uploadToAWS()
+
+        monkeypatch.chdir(firstDirectory)
+        async with openFakeBot(s3Client) as (bot, discordFake):
+            steve = discordFake.makeUserPayload('Steve')
+            await bot.get_cog('Locations').downloadFromAWS()
+            assert getSavedNames(bot, steve) == {'first', 'second'}
+
+    run(scenario())
+
+
+def testUnchangedDataIsNotUploadedAgain(botDirectory):
+    s3Client = FakeS3Client()
+
+    async def scenario():
+        async with openFakeBot(s3Client) as (bot, discordFake):
+            steve = discordFake.makeUserPayload('Steve')
+            cog = bot.get_cog('Locations')
+            await discordFake.invoke(steve, '*add home Base overworld (1, 2, 3)')
+            await cog.uploadToAWS()
+            assert s3Client.putCount == 1
+
+            await cog.uploadToAWS()
+            assert s3Client.putCount == 1
+
+            await discordFake.invoke(steve, '*add farm Wheat overworld (4, 5, 6)')
+            await cog.uploadToAWS()
+            assert s3Client.putCount == 2
+
+    run(scenario())
+
+
+def testExportYamlThenImport(botDirectory):
+    async def scenario():
+        async with openFakeBot() as (bot, discordFake):
+            steve = discordFake.makeUserPayload('Steve')
+            alex = discordFake.makeUserPayload('Alex')
+            steveChannel = discordFake.getDMChannel(steve)
+            alexChannel = discordFake.getDMChannel(alex)
+
+            await discordFake.invoke(alex, '*export yaml')
+            attachment = discordFake.getSent(alexChannel)[-1]['attachments'][0]
+            assert importer.readRows('locations.yaml', discordFake.http.attachments[attachment['url']]) == []
+
+            await discordFake.invoke(steve, '*add home Base: 2 overworld (-25, 300, 69)')
+            await discordFake.invoke(steve, "*add farm Steve's \"Farm\" nether (8, 16, 32)")
+            await discordFake.invoke(steve, '*add other - yes end (1, 2, 3)')
+            await discordFake.invoke(steve, '*export yaml')
+            attachment = discordFake.getSent(steveChannel)[-1]['attachments'][0]
+            exported = discordFake.http.attachments[attachment['url']]
+            assert importer.readRows('locations.yaml', exported) == [
+                {'name': 'Base: 2', 'type': 'home', 'dimension': 'overworld', 'x': -25, 'z': 300, 'y': 69},
+                {'name': 'Steve\'s "Farm"', 'type': 'farm', 'dimension': 'overworld', 'x': 64, 'z': 128, 'y': 256},
+                {'name': '- yes', 'type': 'other', 'dimension': 'end', 'x': 1, 'z': 2, 'y': 3},
+            ]
+
+            await discordFake.invoke(alex, '*import', attachments=[('locations.yaml', exported)])
+            users = bot.get_cog('Locations').data['users']
+            assert users[int(alex['id'])]['locations'] == users[int(steve['id'])]['locations']
+
+    run(scenario())
@@ -0,0 +1,110 @@
+import asyncio
+from pathlib import Path
+
+from location import Location
+from metrics import metrics
+from persistence import AsyncYamlStore, WriteBehindWriter
+from storage import ShardedLocationStorage, YamlLocationStorage, makeEmptyUserData, serializeData
+from yamlio import loadYaml
+
+
+def testBurstOfMutationsIsCoalescedIntoOneWrite(tmp_path):
+    filepath = tmp_path / 'locations.yaml'
+    data = {'users': {}}
+    mutationsBefore = metrics.getCounter('location_mutations_total')
+    flushesBefore = metrics.getCounter('location_flushes_total')
+
+    async def scenario():
+        writer = WriteBehindWriter(AsyncYamlStore(str(filepath)), lambda: data, flushDelay=0.01,
+                                   maxPendingMutations=1000)
+        for i in range(100):
+            data['users'][i] = {'name': f'User {i}'}
+            writer.markDirty()
+        await asyncio.sleep(0.05)
+        await asyncio.gather(*writer.flushTasks)
+        writer.close()
+
+    asyncio.run(scenario())
+
+    assert metrics.getCounter('location_mutations_total') - mutationsBefore == 100
+    assert metrics.getCounter('location_flushes_total') - flushesBefore == 1
+    with open(filepath) as f:
+        assert len(loadYaml(f)['users']) == 100
+
+
+def testRestoredSnapshotDiscardsTheJournal(tmp_path):
+    filepath = tmp_path / 'locations.yaml'
+    filepath.write_text('users: {}\n')
+    downloadFilepath = tmp_path / 'locations.yaml.download'
+    downloaded = {'users': {1: makeEmptyUserData()}}
+    downloaded['users'][1]['locations']['homes']['Downloaded'] = Location(overworld=(1, 2, 3))
+    AsyncYamlStore(str(downloadFilepath), serialize=serializeData).dump(downloaded)
+
+    async def scenario():
+        storage = YamlLocationStorage(str(filepath))
+        storage.load()
+        storage.putLocation(1, 'farms', 'Local', Location(overworld=(4, 5, 6)))
+        data = storage.restoreSnapshot({storage.objectKey: str(downloadFilepath)})
+        storage.close()
+        return data
+
+    assert asyncio.run(scenario()) == downloaded
+
+    storage = YamlLocationStorage(str(filepath))
+    assert storage.load() == downloaded
+    storage.close()
+
+
+def testFailedShardWriteIsRetried(tmp_path):
+    manifestFilepath = tmp_path / 'locations' / 'manifest.yaml'
+
+    async def scenario():
+        storage = ShardedLocationStorage(str(manifestFilepath))
+        data = storage.load()
+        dump = storage.store.dump
+        failures = []
+
+        def failOnce(dumpData: dict) -> None:
+            if not failures:
+                failures.append(dumpData)
+                raise OSError('No space left on device')
+            dump(dumpData)
+
+        storage.store.dump = failOnce
+        data['users'][1] = makeEmptyUserData()
+        data['users'][1]['locations']['homes']['Base'] = Location(overworld=(1, 2, 3))
+        storage.putLocation(1, 'homes', 'Base', Location(overworld=(1, 2, 3)))
+        await storage.flush()
+        assert failures and not manifestFilepath.exists()
+        await storage.flush()
+        files = await storage.exportSnapshot()
+        storage.close()
+        return files
+
+    files = asyncio.run(scenario())
+    assert all(Path(filepath).exists() for filepath in files.values())
+
+    storage = ShardedLocationStorage(str(manifestFilepath))
+    assert storage.load()['users'][1]['locations']['homes'] == {'Base': Location(overworld=(1, 2, 3))}
+    storage.close()
+
+
+def testSnapshotsOnlyCopyChangedUsers(tmp_path):
+    filepath = tmp_path / 'locations.yaml'
+    AsyncYamlStore(str(filepath)).dump({'users': {1: makeEmptyUserData(), 2: makeEmptyUserData()}})
+
+    async def scenario():
+        storage = YamlLocationStorage(str(filepath))
+        data = storage.load()
+        first = storage.store.snapshot(data)
+        data['users'][1]['locations']['homes']['Base'] = Location(overworld=(1, 2, 3))
+        storage.putLocation(1, 'homes', 'Base', Location(overworld=(1, 2, 3)))
+        second = storage.store.snapshot(data)
+        storage.close()
+        return data, first, second
+
+    data, first, second = asyncio.run(scenario())
+    assert first['users'][1]['locations']['homes'] == {}
+    assert second['users'][1]['locations']['homes'] == {'Base': Location(overworld=(1, 2, 3))}
+    assert second['users'][1]['locations']['homes'] is not data['users'][1]['locations']['homes']
+    assert second['users'][2] is first['users'][2]
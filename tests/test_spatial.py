@@ -0,0 +1,53 @@
+import math
+import random
+import time
+
+from spatial import SpatialGrid
+
+
+def makeGrid(pointCount: int, seed: int = 0) -> SpatialGrid:
+    generator = random.Random(seed)
+    grid = SpatialGrid()
+    for i in range(pointCount):
+        grid.insert(f'point{i}', (generator.randint(-5000, 5000), generator.randint(-5000, 5000),
+                                  generator.randint(0, 256)))
+    return grid
+
+
+def bruteForceNearest(grid: SpatialGrid, point, k: int) -> list:
+    return sorted((math.dist(point, other), key) for key, other in grid.points.items())[:k]
+
+
+def testNearestMatchesBruteForce():
+    grid = makeGrid(500)
+    generator = random.Random(1)
+    for _ in range(200):
+        point = (generator.randint(-8000, 8000), generator.randint(-8000, 8000), generator.randint(-64, 320))
+        k = generator.randint(1, 10)
+        assert [distance for distance, _ in grid.nearest(point, k)] == \
+               [distance for distance, _ in bruteForceNearest(grid, point, k)]
+
+
+def testNearestFarFromEveryPointReturnsQuickly():
+    grid = makeGrid(200)
+    for point in ((1000000, 0, 0), (999999999, 0, 0), (-999999999, 999999999, -999999999)):
+        start = time.perf_counter()
+        results = grid.nearest(point, 3)
+        assert time.perf_counter() - start < 1
+        assert [distance for distance, _ in results] == \
+               [distance for distance, _ in bruteForceNearest(grid, point, 3)]
+
+
+def testNearestOnEmptyAndSmallGrids():
+    grid = SpatialGrid()
+    assert grid.nearest((0, 0, 0)) == []
+
+    grid.insert('home', (10, 20, 64))
+    assert grid.nearest((999999999, 0, 0), 5) == [(math.dist((999999999, 0, 0), (10, 20, 64)), 'home')]
+
+
+def testWithinRadius():
+    grid = makeGrid(300)
+    point = (100, -200, 64)
+    expected = sorted((distance, key) for distance, key in bruteForceNearest(grid, point, 300) if distance <= 1500)
+    assert grid.withinRadius(point, 1500) == expected
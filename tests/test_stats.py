@@ -0,0 +1,51 @@
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip('discord')
+
+from discord.ext import commands
+
+from metrics import metrics
+from tests.harness import openFakeBot
+
+
+def getRecordedDuration(command: str) -> tuple[int, float]:
+    histogram = metrics.getHistogram('command_duration_seconds', command=command)
+    return (0, 0.0) if histogram is None else (histogram.count, histogram.sum)
+
+
+def testCommandDurationIncludesWorkBeforeTheFirstAwait(botDirectory):
+    async def scenario():
+        async with openFakeBot(cogFiles=('cogs.locations', 'cogs.stats')) as (bot, discordFake):
+            storage = bot.get_cog('Locations').storage
+
+            async def loadExternalChangesSlowly():
+                time.sleep(0.05)
+
+            storage.loadExternalChanges = loadExternalChangesSlowly
+            countBefore, sumBefore = getRecordedDuration('search')
+            await discordFake.invoke(discordFake.makeUserPayload('Steve'), '*search foo')
+            await asyncio.sleep(0)
+
+            count, total = getRecordedDuration('search')
+            assert count == countBefore + 1
+            assert total - sumBefore >= 0.05
+
+    asyncio.run(scenario())
+
+
+def testFailedCommandsAreRecorded(botDirectory):
+    async def scenario():
+        async with openFakeBot(cogFiles=('cogs.locations', 'cogs.stats')) as (bot, discordFake):
+            countBefore, _ = getRecordedDuration('view')
+            errorsBefore = metrics.getCounter('command_errors_total', command='view')
+            with pytest.raises(commands.MissingRequiredArgument):
+                await discordFake.invoke(discordFake.makeUserPayload('Steve'), '*view')
+            await asyncio.sleep(0)
+
+            assert getRecordedDuration('view')[0] == countBefore + 1
+            assert metrics.getCounter('command_errors_total', command='view') == errorsBefore + 1
+
+    asyncio.run(scenario())
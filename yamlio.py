@@ -0,0 +1,25 @@
+from typing import IO
+
+import yaml
+
+try:
+    from yaml import CSafeDumper as SafeDumper, CSafeLoader as SafeLoader
+    usingLibyaml = True
+except ImportError:
+    from yaml import SafeDumper, SafeLoader
+    usingLibyaml = False
+
+
+def getYamlImplementation() -> str:
+    """Returns the name of the YAML implementation used for all of the project's YAML I/O."""
+    return 'libyaml' if usingLibyaml else 'pure Python'
+
+
+def loadYaml(stream: IO) -> dict:
+    """Parses a YAML document, using the libyaml C loader when it is available."""
+    return yaml.load(stream, Loader=SafeLoader)
+
+
+def dumpYaml(data: dict, stream: IO) -> None:
+    """Serializes data as a YAML document, using the libyaml C dumper when it is available."""
+    yaml.dump(data, stream, Dumper=SafeDumper)